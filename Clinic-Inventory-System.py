@@ -1,21 +1,26 @@
 # clinic_inventory_list.py - Using Basic List Data Structures
-from datetime import datetime
+from datetime import datetime, timedelta, date
 import customtkinter as ctk
+import tkinter as tk
 from tkinter import ttk, messagebox
+import array
 import collections
+import collections.abc
+import bisect
+import heapq
+import math
+import operator
+import itertools
+import functools
+import contextlib
+import threading
+import re
+import sys
 
 # ---------------- APP CONFIG ----------------
 ctk.set_appearance_mode("system")
 ctk.set_default_color_theme("blue")
 
-# Using Multidimensional Array Data Structures for storing inventory data
-# Each row represents a record, each column represents a field
-# medicines[row][column] where columns are: [id, name, packs, items_per_pack, total_qty, expiry]
-medicines = []  # 2D array: medicines[row][0]=id, medicines[row][1]=name, etc.
-
-# equipment[row][column] where columns are: [id, name, stock, status]  
-equipment = []  # 2D array: equipment[row][0]=id, equipment[row][1]=name, etc.
-
 # Column indices for medicines array
 MED_ID = 0
 MED_NAME = 1
@@ -23,6 +28,7 @@ MED_PACKS = 2
 MED_ITEMS_PER_PACK = 3
 MED_TOTAL_QTY = 4
 MED_EXPIRY = 5
+MED_EXPIRY_ORD = 6  # expiry parsed once into a day ordinal (None if not a valid date)
 
 # Column indices for equipment array
 EQ_ID = 0
@@ -30,7 +36,1945 @@ EQ_NAME = 1
 EQ_STOCK = 2
 EQ_STATUS = 3
 
+# -------------------------
+# Ordered Row Store (blocked positions + id map)
+# -------------------------
+class RowBlock(list):
+    """One chunk of a BlockedList; no is its index in the chunk list, ranks its key -> offset table"""
+    __slots__ = ("no", "ranks")
+
+class BlockedList(collections.abc.MutableSequence):
+    """A list kept as chunks of at most 2*LOAD items; an edit touches one chunk, offsets are refreshed lazily"""
+    # With a key, key(item) -> chunk is tracked so position() and remove() skip
+    # the scan; sorted lists use insort(), remove_sorted() and bisect_left() instead.
+    LOAD = 512
+
+    def __init__(self, key=None, items=()):
+        self.key = key
+        self.blocks = []   # RowBlock chunks in order
+        self.starts = []   # starts[b] = index of blocks[b][0], correct for b < fresh
+        self.fresh = 0
+        self.size = 0
+        self.where = {}    # key(item) -> the chunk holding it (only with a key)
+        self.cache_lock = threading.Lock()  # readers refresh the offsets and rank tables concurrently
+        self.extend(items)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.blocks)
+
+    def _offsets(self):
+        """Bring the stale tail of the start offsets up to date"""
+        starts, blocks = self.starts, self.blocks
+        if self.fresh >= len(blocks):
+            return starts
+        with self.cache_lock:
+            if self.fresh == 0 and starts:
+                starts[0] = 0
+            b = max(self.fresh, 1)
+            if b < len(blocks):
+                starts[b:] = itertools.accumulate(map(len, blocks[b:-1]), initial=starts[b - 1] + len(blocks[b - 1]))
+            self.fresh = len(blocks)
+        return starts
+
+    def _locate(self, index):
+        if index < 0:
+            index += self.size
+        if not 0 <= index < self.size:
+            raise IndexError("BlockedList index out of range")
+        if index < len(self.blocks[0]):
+            return 0, index  # the first chunk needs no offsets
+        starts = self._offsets()
+        b = bisect.bisect_right(starts, index) - 1
+        return b, index - starts[b]
+
+    def _renumber(self, b):
+        for j in range(b, len(self.blocks)):
+            self.blocks[j].no = j
+
+    def _track(self, items, block):
+        if self.key is not None:
+            for item in items:
+                self.where[self.key(item)] = block
+
+    def _new_block(self, b, items):
+        block = RowBlock(items)
+        block.ranks = None
+        self.blocks.insert(b, block)
+        self.starts.insert(b, 0)
+        self.fresh = min(self.fresh, b)
+        self._renumber(b)
+        self._track(block, block)
+        return block
+
+    def _grown(self, b):
+        """Book-keeping after blocks[b] gained an item: stale offsets, split when full"""
+        self.size += 1
+        self.fresh = min(self.fresh, b + 1)
+        block = self.blocks[b]
+        block.ranks = None
+        if len(block) > 2 * self.LOAD:
+            self._new_block(b + 1, block[self.LOAD:])
+            del block[self.LOAD:]
+
+    def _shrunk(self, b):
+        """Book-keeping after blocks[b] lost an item: stale offsets, drop it when empty"""
+        self.size -= 1
+        self.fresh = min(self.fresh, b + 1)
+        self.blocks[b].ranks = None
+        if not self.blocks[b]:
+            del self.blocks[b]
+            del self.starts[b]
+            self.fresh = min(self.fresh, b)
+            self._renumber(b)
+
+    def iter_range(self, start, stop):
+        """Yield items[start:stop] (0 <= start) chunk by chunk, without copying the list"""
+        stop = min(stop, self.size)
+        if start >= stop:
+            return
+        b, offset = self._locate(start)
+        remaining = stop - start
+        for block in itertools.islice(self.blocks, b, None):
+            chunk = block[offset:offset + remaining]
+            yield from chunk
+            remaining -= len(chunk)
+            if not remaining:
+                return
+            offset = 0
+
+    def compress(self, selectors):
+        """List the items whose selector byte is 1 (one byte per item), in order"""
+        items, start = [], 0
+        for block in self.blocks:
+            stop = start + len(block)
+            if selectors.count(1, start, stop) * 16 < len(block):  # a few hits: jump to each one
+                i = selectors.find(1, start, stop)
+                while i != -1:
+                    items.append(block[i - start])
+                    i = selectors.find(1, i + 1, stop)
+            else:
+                items.extend(itertools.compress(block, selectors[start:stop]))
+            start = stop
+        return items
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.size)
+            if step == 1:
+                return list(self.iter_range(start, stop))
+            return [self[i] for i in range(start, stop, step)]
+        b, offset = self._locate(index)
+        return self.blocks[b][offset]
+
+    def __setitem__(self, index, item):
+        if isinstance(index, slice):
+            items = list(self)
+            items[index] = item
+            self.clear()
+            self.extend(items)
+            return
+        b, offset = self._locate(index)
+        block = self.blocks[b]
+        if self.key is not None:
+            del self.where[self.key(block[offset])]
+        block[offset] = item
+        block.ranks = None
+        self._track((item,), block)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            items = list(self)
+            del items[index]
+            self.clear()
+            self.extend(items)
+            return
+        self.pop(index)
+
+    def insert(self, index, item):
+        if index < 0:
+            index = max(index + self.size, 0)
+        if not self.blocks:
+            self._new_block(0, ())
+        if index >= self.size:
+            b = len(self.blocks) - 1
+            offset = len(self.blocks[b])
+        else:
+            b, offset = self._locate(index)
+        self.blocks[b].insert(offset, item)
+        self._track((item,), self.blocks[b])
+        self._grown(b)
+
+    def extend(self, items):
+        """Append items: top up the last chunk to LOAD, then add whole chunks (no per-item lookups)"""
+        items = list(items)
+        if self.blocks and len(self.blocks[-1]) < self.LOAD:
+            b = len(self.blocks) - 1
+            block = self.blocks[b]
+            head, items = items[:self.LOAD - len(block)], items[self.LOAD - len(block):]
+            block.extend(head)
+            block.ranks = None
+            self._track(head, block)
+            self.size += len(head)
+            self.fresh = min(self.fresh, b + 1)
+        for i in range(0, len(items), self.LOAD):
+            self._new_block(len(self.blocks), items[i:i + self.LOAD])
+        self.size += len(items)
+
+    def pop(self, index=-1):
+        b, offset = self._locate(index)
+        item = self.blocks[b].pop(offset)
+        if self.key is not None:
+            del self.where[self.key(item)]
+        self._shrunk(b)
+        return item
+
+    def position(self, item):
+        """Return the index of item (found through its chunk; needs a key)"""
+        key = self.key(item)
+        block = self.where[key]
+        return self._offsets()[block.no] + self._ranks(block)[key]
+
+    def _ranks(self, block):
+        ranks = block.ranks
+        if ranks is None:
+            with self.cache_lock:
+                ranks = block.ranks
+                if ranks is None:
+                    ranks = block.ranks = {self.key(x): i for i, x in enumerate(block)}
+        return ranks
+
+    def sorted_by_position(self, items, limit=None):
+        """Return items (all in the list) sorted by their index, only the first limit if given; needs a key"""
+        key, where, starts = self.key, self.where, self._offsets()
+
+        def index(item):
+            k = key(item)
+            block = where[k]
+            return starts[block.no] + self._ranks(block)[k]
+        if limit is not None:
+            return heapq.nsmallest(limit, items, key=index)
+        return sorted(items, key=index)
+
+    def remove(self, item):
+        """Remove item (found through its chunk; needs a key)"""
+        block = self.where.pop(self.key(item))
+        del block[block.index(item)]
+        self._shrunk(block.no)
+
+    def _chunk_for(self, item):
+        """First chunk whose last item is >= item (sorted lists only)"""
+        blocks = self.blocks
+        lo, hi = 0, len(blocks)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if blocks[mid][-1] < item:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def bisect_left(self, item):
+        """Index where item would be inserted to keep a sorted list sorted"""
+        b = self._chunk_for(item)
+        if b == len(self.blocks):
+            return self.size
+        return self._offsets()[b] + bisect.bisect_left(self.blocks[b], item)
+
+    def insort(self, item):
+        """Insert item into a sorted list, keeping it sorted (O(log n) plus one chunk edit)"""
+        if not self.blocks:
+            self._new_block(0, ())
+            b = 0
+        else:
+            b = min(self._chunk_for(item), len(self.blocks) - 1)
+        bisect.insort(self.blocks[b], item)
+        self._track((item,), self.blocks[b])
+        self._grown(b)
+
+    def remove_sorted(self, item):
+        """Remove item from a sorted list if present; return whether it was there"""
+        b = self._chunk_for(item)
+        if b == len(self.blocks):
+            return False
+        block = self.blocks[b]
+        i = bisect.bisect_left(block, item)
+        if i == len(block) or block[i] != item:
+            return False
+        del block[i]
+        if self.key is not None:
+            del self.where[self.key(item)]
+        self._shrunk(b)
+        return True
+
+    def clear(self):
+        self.blocks = []
+        self.starts = []
+        self.fresh = 0
+        self.size = 0
+        self.where = {}
+
+class RowStore(collections.abc.MutableSequence):
+    """The rows of one array in display order (a BlockedList) plus an id -> row dict"""
+
+    def __init__(self, id_col, rows=()):
+        self.id_col = id_col
+        self.rows_by_id = {}  # id -> row (the same list object stored in the array)
+        self.order = BlockedList(operator.itemgetter(id_col))  # rows by position
+        self.extend(rows)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return iter(self.order)
+
+    def __getitem__(self, index):
+        return self.order[index]
+
+    def __setitem__(self, index, row):
+        if isinstance(index, slice):
+            rows = list(self)
+            rows[index] = row
+            self.clear()
+            self.extend(rows)
+            return
+        old_id = self.order[index][self.id_col]
+        if row[self.id_col] != old_id and row[self.id_col] in self.rows_by_id:
+            raise ValueError(f"duplicate row id {row[self.id_col]!r}")
+        del self.rows_by_id[old_id]
+        self.rows_by_id[row[self.id_col]] = row
+        self.order[index] = row
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            rows = list(self)
+            del rows[index]
+            self.clear()
+            self.extend(rows)
+            return
+        self.pop(index)
+
+    def insert(self, index, row):
+        row_id = row[self.id_col]
+        if row_id in self.rows_by_id:
+            raise ValueError(f"duplicate row id {row_id!r}")
+        self.order.insert(index, row)
+        self.rows_by_id[row_id] = row
+
+    def extend(self, rows):
+        """Append rows with one id check and one BlockedList extend"""
+        rows = list(rows)
+        ids = [row[self.id_col] for row in rows]
+        if len(set(ids)) != len(ids) or not self.rows_by_id.keys().isdisjoint(ids):
+            raise ValueError("duplicate row id")
+        self.order.extend(rows)
+        self.rows_by_id.update(zip(ids, rows))
+
+    def pop(self, index=-1):
+        row = self.order.pop(index)
+        del self.rows_by_id[row[self.id_col]]
+        return row
+
+    def get(self, row_id):
+        """Return the row with this id, or None"""
+        return self.rows_by_id.get(row_id)
+
+    def position(self, row_id):
+        """Return the array index of the row with this id, or -1"""
+        row = self.rows_by_id.get(row_id)
+        return -1 if row is None else self.order.position(row)
+
+    def clear(self):
+        self.rows_by_id.clear()
+        self.order.clear()
+
+# Using Multidimensional Array Data Structures for storing inventory data
+# Each row represents a record, each column represents a field
+# medicines[row][column] where columns are: [id, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal]
+medicines = RowStore(MED_ID)  # 2D array: medicines[row][0]=id, medicines[row][1]=name, etc.
+
+# equipment[row][column] where columns are: [id, name, stock, status]  
+equipment = RowStore(EQ_ID)  # 2D array: equipment[row][0]=id, equipment[row][1]=name, etc.
+
+# -------------------------
+# Record Views
+# -------------------------
+class RowView(collections.abc.Mapping):
+    """Read-only, dict-style view over one array row (nothing copied); use dict(rec) for a snapshot"""
+    __slots__ = ("_row",)
+    FIELDS = {}  # key -> column index, set by subclasses
+
+    def __init__(self, row):
+        self._row = row
+
+    def __getitem__(self, key):
+        return self._row[self.FIELDS[key]]
+
+    def __iter__(self):
+        return iter(self.FIELDS)
+
+    def __len__(self):
+        return len(self.FIELDS)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self)!r})"
+
+class MedicineRecord(RowView):
+    """View of a medicines row with keys id, name, packs, items_per_pack, total_qty, expiry"""
+    __slots__ = ()
+    FIELDS = {"id": MED_ID, "name": MED_NAME, "packs": MED_PACKS, "items_per_pack": MED_ITEMS_PER_PACK,
+              "total_qty": MED_TOTAL_QTY, "expiry": MED_EXPIRY}
+
+class EquipmentRecord(RowView):
+    """View of an equipment row with keys id, name, stock, status"""
+    __slots__ = ()
+    FIELDS = {"id": EQ_ID, "name": EQ_NAME, "stock": EQ_STOCK, "status": EQ_STATUS}
+
+# -------------------------
+# Trigram Index (substring search)
+# -------------------------
+class TrigramIndex:
+    """Inverted index from every 3-character substring of a key to the keys containing it"""
+
+    def __init__(self):
+        self.postings = {}  # trigram -> set of keys
+
+    @staticmethod
+    def grams(text):
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def add(self, key):
+        for gram in self.grams(key):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def discard(self, key):
+        for gram in self.grams(key):
+            keys = self.postings.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[gram]
+
+    def estimate(self, pattern):
+        """Upper bound on matching keys: the shortest posting list of the pattern's trigrams"""
+        return min((len(self.postings.get(g, ())) for g in self.grams(pattern)), default=0)
+
+    def keys_containing(self, pattern):
+        """Keys that contain pattern (len(pattern) >= 3): intersect postings, then verify"""
+        postings = sorted((self.postings.get(g, set()) for g in self.grams(pattern)), key=len)
+        if not postings or not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for keys in postings[1:]:
+            candidates &= keys
+            if not candidates:
+                return []
+        # Sharing every trigram does not guarantee the pattern occurs contiguously
+        return [key for key in candidates if pattern in key]
+
+    def clear(self):
+        self.postings.clear()
+
+# -------------------------
+# Prefix Trie (type-ahead completion)
+# -------------------------
+class TrieNode:
+    """Node of the name trie: one child per next character"""
+    __slots__ = ("children", "display")
+
+    def __init__(self):
+        self.children = {}
+        self.display = None  # the name as typed, if a name ends at this node
+
+class NameTrie:
+    """Prefix tree over distinct case-folded names; completion cost depends on the prefix, not the inventory"""
+
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, key, display):
+        node = self.root
+        for ch in key:
+            node = node.children.setdefault(ch, TrieNode())
+        node.display = display
+
+    def remove(self, key):
+        """Unmark key and prune nodes that no longer lead to any name"""
+        path = [self.root]
+        for ch in key:
+            node = path[-1].children.get(ch)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].display = None
+        for i in range(len(key), 0, -1):
+            node = path[i]
+            if node.display is not None or node.children:
+                break
+            del path[i - 1].children[key[i - 1]]
+
+    def complete(self, prefix, limit=10):
+        """Return up to limit names starting with prefix (case-insensitive), alphabetically"""
+        node = self.root
+        for ch in prefix.casefold():
+            node = node.children.get(ch)
+            if node is None:
+                return []
+        result = []
+        stack = [node]
+        while stack and len(result) < limit:
+            node = stack.pop()
+            if node.display is not None:
+                result.append(node.display)
+            stack.extend(node.children[ch] for ch in sorted(node.children, reverse=True))
+        return result
+
+    def clear(self):
+        self.root = TrieNode()
+
+# -------------------------
+# Fuzzy Name Lookup (BK-tree over edit distance)
+# -------------------------
+def edit_distance(a, b):
+    """Levenshtein distance: insertions, deletions and substitutions each cost 1"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+class BKNode:
+    """BK-tree node: children are keyed by their edit distance to this node's term"""
+    __slots__ = ("term", "children")
+
+    def __init__(self, term):
+        self.term = term
+        self.children = {}
+
+class BKTree:
+    """Burkhard-Keller tree: only children within d-k..d+k of a node can hold matches (triangle inequality)"""
+
+    def __init__(self, terms=()):
+        self.root = None
+        for term in terms:
+            self.add(term)
+
+    def add(self, term):
+        if self.root is None:
+            self.root = BKNode(term)
+            return
+        node = self.root
+        while True:
+            d = edit_distance(term, node.term)
+            if d == 0:
+                return
+            child = node.children.get(d)
+            if child is None:
+                node.children[d] = BKNode(term)
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        """Return (distance, term) pairs with distance <= max_distance"""
+        result, stack = [], [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            d = edit_distance(query, node.term)
+            if d <= max_distance:
+                result.append((d, node.term))
+            for dist, child in node.children.items():
+                if d - max_distance <= dist <= d + max_distance:
+                    stack.append(child)
+        return result
+
+class FuzzyNameIndex:
+    """Typo-tolerant lookup over distinct names: each full name and each word of 3+ letters is a BK-tree term"""
+
+    def __init__(self):
+        self.names_by_term = {}  # term -> set of case-folded names it came from
+        # The BK-tree costs an edit distance per visited node on every insert, so writes
+        # only queue terms; the tree catches up on the next search.
+        self.tree = None         # BKTree, or None until the first search
+        self.pending = set()     # terms added since the tree was brought up to date
+        self.removed = set()     # terms still in the tree that no name uses any more
+        self.lock = threading.Lock()  # searches run under the read lock, possibly several at once
+
+    @staticmethod
+    def terms(key):
+        return {key} | {word for word in key.split() if len(word) >= 3}
+
+    def add(self, key):
+        for term in self.terms(key):
+            names = self.names_by_term.get(term)
+            if names is None:
+                names = self.names_by_term[term] = set()
+                self.pending.add(term)
+                self.removed.discard(term)
+            names.add(key)
+
+    def discard(self, key):
+        for term in self.terms(key):
+            names = self.names_by_term.get(term)
+            if names is not None:
+                names.discard(key)
+                if not names:
+                    del self.names_by_term[term]
+                    if term in self.pending:
+                        self.pending.discard(term)
+                    else:
+                        self.removed.add(term)
+
+    def _refresh(self):
+        """Bring the tree up to date: add the queued terms, or rebuild once dead terms outnumber live ones"""
+        with self.lock:
+            if self.tree is None or len(self.removed) > len(self.names_by_term):
+                self.tree = BKTree(self.names_by_term)
+                self.removed.clear()
+            else:
+                for term in self.pending:
+                    self.tree.add(term)
+            self.pending.clear()
+
+    def search(self, query, max_distance=2):
+        """Return [(distance, name)] for names matching query within max_distance edits, closest first"""
+        if self.tree is None or self.pending or len(self.removed) > len(self.names_by_term):
+            self._refresh()
+        best = {}
+        for d, term in self.tree.search(query.casefold(), max_distance):
+            for key in self.names_by_term.get(term, ()):  # terms in self.removed have no names
+                if d < best.get(key, max_distance + 1):
+                    best[key] = d
+        return sorted((d, key) for key, d in best.items())
+
+    def clear(self):
+        self.names_by_term.clear()
+        self.tree = None
+        self.pending.clear()
+        self.removed.clear()
+
+# -------------------------
+# Name Index (case-folded name -> ids)
+# -------------------------
+_DIGIT_RUNS = re.compile(r"(\d+)")
+
+def natural_sort_key(name):
+    """Collation key for name: case-folded, with digit runs compared as numbers ("200mg" < "1000mg")"""
+    parts = _DIGIT_RUNS.split(name.casefold())
+    # split() alternates text, digits, text, ... so positions never mix str and int
+    parts[1::2] = [int(digits) for digits in parts[1::2]]
+    return tuple(parts)
+
+class NameIndex:
+    """Case-folded name -> ids, with the distinct names also in a trigram index, a prefix trie and a fuzzy index"""
+
+    def __init__(self):
+        self.ids_by_name = {}
+        self.display_names = {}  # case-folded name -> the name as first entered
+        self.trigrams = TrigramIndex()
+        self.prefixes = NameTrie()
+        self.fuzzy = FuzzyNameIndex()
+        self.sort_keys = {}  # id -> natural_sort_key of its name, kept for sorting by name
+        self.size = 0  # number of (name, id) entries
+
+    def add(self, name, row_id):
+        """Record that row_id is named name"""
+        key = name.casefold()
+        ids = self.ids_by_name.get(key)
+        if ids is None:
+            ids = self.ids_by_name[key] = set()
+            self.display_names[key] = name
+            self.trigrams.add(key)
+            self.prefixes.insert(key, name)
+            self.fuzzy.add(key)
+        if row_id not in ids:
+            # The collation key depends only on the case-folded name: share it between its rows
+            self.sort_keys[row_id] = self.sort_keys[next(iter(ids))] if ids else natural_sort_key(name)
+            ids.add(row_id)
+            self.size += 1
+
+    def discard(self, name, row_id):
+        """Forget that row_id is named name"""
+        key = name.casefold()
+        ids = self.ids_by_name.get(key)
+        if ids is not None and row_id in ids:
+            ids.remove(row_id)
+            del self.sort_keys[row_id]
+            self.size -= 1
+            if not ids:
+                del self.ids_by_name[key]
+                del self.display_names[key]
+                self.trigrams.discard(key)
+                self.prefixes.remove(key)
+                self.fuzzy.discard(key)
+
+    def names_containing(self, pattern):
+        """Case-folded names containing pattern; patterns under 3 characters scan the distinct names"""
+        pattern = pattern.casefold()
+        if len(pattern) < 3:
+            return [key for key in self.ids_by_name if pattern in key]
+        return self.trigrams.keys_containing(pattern)
+
+    def ids_containing(self, pattern):
+        """Ids of rows whose name contains pattern (case-insensitive)"""
+        return [row_id for key in self.names_containing(pattern) for row_id in self.ids_by_name[key]]
+
+    def estimate_containing(self, pattern):
+        """Rough cost of ids_containing(): names examined times average rows per name"""
+        pattern = pattern.casefold()
+        if not self.ids_by_name:
+            return 0
+        names = len(self.ids_by_name) if len(pattern) < 3 else self.trigrams.estimate(pattern)
+        rows_per_name = self.size / len(self.ids_by_name)
+        return names * max(1.0, rows_per_name)
+
+    def similar_names(self, name, max_distance=2, limit=5):
+        """Distinct names within max_distance edits of name (or of one of its words), closest first"""
+        return [self.display_names[key] for _, key in self.fuzzy.search(name, max_distance)[:limit]]
+
+    def ids(self, name):
+        """Return the ids with this name (case-insensitive); do not mutate the result"""
+        return self.ids_by_name.get(name.casefold(), frozenset())
+
+    def count(self, name):
+        """Return how many rows carry this name (case-insensitive)"""
+        return len(self.ids(name))
+
+    def clear(self):
+        """Drop every entry"""
+        self.ids_by_name.clear()
+        self.display_names.clear()
+        self.trigrams.clear()
+        self.prefixes.clear()
+        self.fuzzy.clear()
+        self.sort_keys.clear()
+        self.size = 0
+
+medicine_names = NameIndex()
+equipment_names = NameIndex()
+
+# -------------------------
+# Expiry Dates and Sorted Value Indexes
+# -------------------------
+def parse_expiry(expiry):
+    """Parse a YYYY-MM-DD string into a day ordinal, or None if it is not a valid date"""
+    try:
+        return datetime.strptime(expiry, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return None
+
+def format_expiry(ordinal):
+    """Render a day ordinal as a YYYY-MM-DD string for display"""
+    return date.fromordinal(ordinal).isoformat()
+
+def normalize_expiry(expiry, ordinal=None):
+    """Return (display string, day ordinal) for an expiry, parsing only when no ordinal is given"""
+    if ordinal is None:
+        ordinal = parse_expiry(expiry)
+    if ordinal is None:
+        return expiry, None  # not a date: keep the text, leave it out of date queries
+    return format_expiry(ordinal), ordinal
+
+class ValueIndex:
+    """(integer value, id) pairs kept sorted in a BlockedList, answering range queries with bisect"""
+
+    # Reading one (value, id) pair off the chunks costs about 3 rows tested by a full scan
+    WALK_COST = 3
+
+    def __init__(self):
+        self.keys = BlockedList()
+
+    def add(self, value, row_id):
+        """Insert an entry; None values (e.g. no valid date) are not indexed"""
+        if value is not None:
+            self.keys.insort((value, row_id))
+
+    def discard(self, value, row_id):
+        """Remove an entry if present"""
+        if value is not None:
+            self.keys.remove_sorted((value, row_id))
+
+    # A batch bigger than 1/MERGE_RATIO of the index is merged in one sort and
+    # rebuild (about 0.3 us per entry) instead of one insort each (about 15 us).
+    MERGE_RATIO = 50
+
+    def add_many(self, entries):
+        """Insert (value, id) entries, merging a large batch in one pass"""
+        entries = [entry for entry in entries if entry[0] is not None]
+        if len(entries) * self.MERGE_RATIO < len(self.keys):
+            for entry in entries:
+                self.keys.insort(entry)
+        elif entries:
+            self.keys = BlockedList(items=sorted(itertools.chain(self.keys, entries)))
+
+    def discard_many(self, entries):
+        """Remove (value, id) entries, filtering a large batch out in one pass"""
+        entries = [entry for entry in entries if entry[0] is not None]
+        if len(entries) * self.MERGE_RATIO < len(self.keys):
+            for entry in entries:
+                self.keys.remove_sorted(entry)
+        elif entries:
+            doomed = {row_id for _, row_id in entries}  # an id has one entry: match on the cheaper int
+            self.keys = BlockedList(items=[key for key in self.keys if key[1] not in doomed])
+
+    def _bounds(self, first, last):
+        lo = 0 if first is None else self.keys.bisect_left((first,))
+        # (last, inf) sorts after every (last, id) and before anything above last, float or not
+        hi = len(self.keys) if last is None else self.keys.bisect_left((last, math.inf))
+        return lo, hi
+
+    def range_ids(self, first=None, last=None):
+        """Return ids with first <= value <= last (None = unbounded), smallest value first"""
+        lo, hi = self._bounds(first, last)
+        return [row_id for _, row_id in self.keys.iter_range(lo, hi)]
+
+    def first_ids(self, count):
+        """Return the ids of the count smallest values"""
+        return [row_id for _, row_id in self.keys.iter_range(0, count)]
+
+    def count_range(self, first=None, last=None):
+        """Count entries in the range with two binary searches (the planner's row estimate)"""
+        lo, hi = self._bounds(first, last)
+        return max(0, hi - lo)
+
+    def clear(self):
+        """Drop every entry"""
+        self.keys.clear()
+
+medicine_expiry = ValueIndex()
+medicine_packs = ValueIndex()
+medicine_total_qty = ValueIndex()
+equipment_stock = ValueIndex()
+
+class ExpiryHeap:
+    """Indexed binary min-heap of [ordinal, id] entries; pos maps id -> heap slot for O(log n) delete"""
+
+    def __init__(self):
+        self.heap = []
+        self.pos = {}
+
+    def __len__(self):
+        return len(self.heap)
+
+    def _swap(self, i, j):
+        heap = self.heap
+        heap[i], heap[j] = heap[j], heap[i]
+        self.pos[heap[i][1]] = i
+        self.pos[heap[j][1]] = j
+
+    def _sift_up(self, i):
+        heap = self.heap
+        while i > 0:
+            parent = (i - 1) // 2
+            if heap[i] >= heap[parent]:
+                break
+            self._swap(i, parent)
+            i = parent
+
+    def _sift_down(self, i):
+        heap = self.heap
+        n = len(heap)
+        while True:
+            child = 2 * i + 1
+            if child >= n:
+                break
+            if child + 1 < n and heap[child + 1] < heap[child]:
+                child += 1
+            if heap[i] <= heap[child]:
+                break
+            self._swap(i, child)
+            i = child
+
+    def push(self, ordinal, row_id):
+        """Add an entry, or move it if the id is already queued (decrease/increase key)"""
+        if row_id in self.pos:
+            self.remove(row_id)
+        self.heap.append([ordinal, row_id])
+        self.pos[row_id] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def remove(self, row_id):
+        """Delete the entry for row_id if present"""
+        i = self.pos.pop(row_id, None)
+        if i is None:
+            return
+        last = self.heap.pop()
+        if i < len(self.heap):
+            self.heap[i] = last
+            self.pos[last[1]] = i
+            self._sift_up(i)
+            self._sift_down(self.pos[last[1]])
+
+    def peek(self):
+        """Return the id expiring soonest, or None when empty"""
+        return self.heap[0][1] if self.heap else None
+
+    def clear(self):
+        self.heap.clear()
+        self.pos.clear()
+
+class LotQueues:
+    """One ExpiryHeap per medicine name (casefolded): which lot of a drug to dispense first"""
+
+    def __init__(self):
+        self.queues = {}
+
+    def add(self, name, ordinal, row_id):
+        """Queue a lot; lots without a valid date can't be ranked and are left out"""
+        if ordinal is not None:
+            self.queues.setdefault(name.casefold(), ExpiryHeap()).push(ordinal, row_id)
+
+    def discard(self, name, row_id):
+        key = name.casefold()
+        queue = self.queues.get(key)
+        if queue is not None:
+            queue.remove(row_id)
+            if not queue:
+                del self.queues[key]
+
+    def soonest(self, name):
+        """Return the id of the lot of name expiring soonest, or None"""
+        queue = self.queues.get(name.casefold())
+        return queue.peek() if queue is not None else None
+
+    def clear(self):
+        self.queues.clear()
+
+medicine_lots = LotQueues()
+
+# -------------------------
+# Cached Sorted Views
+# -------------------------
+class SortedViews:
+    """Cached sort orders of one array, (column, ascending) -> rows, dropped when rows move or the column changes"""
+
+    def __init__(self, sort_keys, missing=None):
+        self.sort_keys = sort_keys    # column -> key function over a row
+        self.missing = missing or {}  # column -> row test; those rows go last in both directions
+        self.views = {}
+        self.lock = threading.Lock()  # readers fill the cache concurrently
+
+    def get(self, rows, column, ascending=True):
+        """Return the cached view, sorting rows once if it isn't cached"""
+        view = self.views.get((column, ascending))
+        if view is None:
+            with self.lock:
+                view = self.views.get((column, ascending))
+                if view is None:
+                    key, missing = self.sort_keys[column], self.missing.get(column)
+                    if missing is None:
+                        view = sorted(rows, key=key, reverse=not ascending)
+                    else:
+                        view = sorted((row for row in rows if not missing(row)), key=key, reverse=not ascending)
+                        view += [row for row in rows if missing(row)]
+                    self.views[(column, ascending)] = view
+        return view
+
+    def row_changed(self, old_row, row):
+        """Drop the views sorted on any column whose value differs between old_row and row"""
+        if not self.views:
+            return
+        for column in self.sort_keys:
+            if old_row[column] != row[column]:
+                self.views.pop((column, True), None)
+                self.views.pop((column, False), None)
+
+    def clear(self):
+        self.views.clear()
+
+medicine_views = SortedViews({
+    MED_NAME: lambda row: medicine_names.sort_keys[row[MED_ID]],
+    MED_EXPIRY_ORD: lambda row: row[MED_EXPIRY_ORD],  # compare the stored ordinals (ints)
+    MED_TOTAL_QTY: lambda row: row[MED_TOTAL_QTY],
+    MED_PACKS: lambda row: row[MED_PACKS],
+}, missing={MED_EXPIRY_ORD: lambda row: row[MED_EXPIRY_ORD] is None})  # no valid date: last either way
+equipment_views = SortedViews({
+    EQ_NAME: lambda row: equipment_names.sort_keys[row[EQ_ID]],
+    EQ_STOCK: lambda row: row[EQ_STOCK],
+    EQ_STATUS: lambda row: row[EQ_STATUS].lower(),
+})
+
+# -------------------------
+# Running Inventory Statistics
+# -------------------------
+class InventoryStats:
+    """Counters behind get_array_statistics(), adjusted in O(1) as rows are indexed/unindexed"""
+
+    LOW_STOCK_MEDICINE = 5   # same defaults as get_low_stock_medicines / get_low_stock_equipment
+    LOW_STOCK_EQUIPMENT = 3
+    EXPIRY_WINDOW_DAYS = 30  # same default as get_expiring_medicines
+
+    def __init__(self):
+        self.low_stock_medicines = 0
+        self.expiring_medicines = 0
+        self.low_stock_equipment = 0
+        self.status_counts = collections.Counter()
+        # Last expiry ordinal inside the window; rows expiring on or before it count as expiring
+        self.window_end = self.window_end_on(date.today())
+
+    def add_medicine(self, row):
+        if row[MED_TOTAL_QTY] <= self.LOW_STOCK_MEDICINE:
+            self.low_stock_medicines += 1
+        if row[MED_EXPIRY_ORD] is not None and row[MED_EXPIRY_ORD] <= self.window_end:
+            self.expiring_medicines += 1
+
+    def remove_medicine(self, row):
+        if row[MED_TOTAL_QTY] <= self.LOW_STOCK_MEDICINE:
+            self.low_stock_medicines -= 1
+        if row[MED_EXPIRY_ORD] is not None and row[MED_EXPIRY_ORD] <= self.window_end:
+            self.expiring_medicines -= 1
+
+    def add_equipment(self, row):
+        if row[EQ_STOCK] <= self.LOW_STOCK_EQUIPMENT:
+            self.low_stock_equipment += 1
+        self.status_counts[row[EQ_STATUS]] += 1
+
+    def remove_equipment(self, row):
+        if row[EQ_STOCK] <= self.LOW_STOCK_EQUIPMENT:
+            self.low_stock_equipment -= 1
+        self.status_counts[row[EQ_STATUS]] -= 1
+        if self.status_counts[row[EQ_STATUS]] <= 0:
+            del self.status_counts[row[EQ_STATUS]]
+
+    def reset_medicines(self):
+        self.low_stock_medicines = 0
+        self.expiring_medicines = 0
+
+    def reset_equipment(self):
+        self.low_stock_equipment = 0
+        self.status_counts.clear()
+
+    def window_end_on(self, today):
+        return today.toordinal() + self.EXPIRY_WINDOW_DAYS
+
+    def roll_expiry_window(self, today):
+        """Move the expiring window to today, counting only the days it moved over (O(log n), under the write lock)"""
+        window_end = self.window_end_on(today)
+        if window_end > self.window_end:
+            self.expiring_medicines += medicine_expiry.count_range(self.window_end + 1, window_end)
+        elif window_end < self.window_end:
+            self.expiring_medicines -= medicine_expiry.count_range(window_end + 1, self.window_end)
+        self.window_end = window_end
+
+inventory_stats = InventoryStats()
+
+# -------------------------
+# Equipment Status Bitmaps
+# -------------------------
+def _insert_bit(bits, index, value):
+    """Return bits with a new bit (0 or 1) inserted at index, shifting higher bits up"""
+    low = bits & ((1 << index) - 1)
+    return low | ((bits >> index) << (index + 1)) | (value << index)
+
+def _delete_bit(bits, index):
+    """Return bits with the bit at index removed, shifting higher bits down"""
+    return (bits & ((1 << index) - 1)) | ((bits >> (index + 1)) << index)
+
+def _bits_from_positions(positions, size):
+    """Bitset with exactly the given positions set, built in one pass"""
+    digits = bytearray(b"0" * (size + 1))
+    for i in positions:
+        digits[i] = ord("1")
+    return int(digits[::-1], 2)
+
+def bit_positions(bits):
+    """Positions of the set bits, ascending (one C-level find per set bit)"""
+    digits = bin(bits)[:1:-1]  # least significant bit first
+    positions = []
+    i = digits.find("1")
+    while i != -1:
+        positions.append(i)
+        i = digits.find("1", i + 1)
+    return positions
+
+class EquipmentBitmaps:
+    """Dictionary-encoded equipment status plus int bitsets over array positions (bit i = equipment[i])"""
+
+    FLAGS = {
+        "low_stock": InventoryStats.LOW_STOCK_EQUIPMENT,  # stock <= 3, as in get_low_stock_equipment
+        "critical": 2,                                    # stock <= 2, the table's red highlight
+    }
+
+    def __init__(self):
+        self.codes = {}        # status -> code
+        self.statuses = []     # code -> status
+        self.status_bits = []  # code -> bitset of positions with that status
+        self.flag_bits = dict.fromkeys(self.FLAGS, 0)
+        self.size = 0
+
+    def _code(self, status):
+        code = self.codes.get(status)
+        if code is None:
+            code = self.codes[status] = len(self.statuses)
+            self.statuses.append(status)
+            self.status_bits.append(0)
+        return code
+
+    def _set(self, index, row):
+        self.status_bits[self._code(row[EQ_STATUS])] |= 1 << index
+        for flag, threshold in self.FLAGS.items():
+            if row[EQ_STOCK] <= threshold:
+                self.flag_bits[flag] |= 1 << index
+
+    def _clear(self, index, row):
+        mask = ~(1 << index)
+        self.status_bits[self.codes[row[EQ_STATUS]]] &= mask
+        for flag in self.flag_bits:
+            self.flag_bits[flag] &= mask
+
+    def inserted(self, index, row):
+        """Record that row was inserted at index"""
+        if index < self.size:
+            self.status_bits = [_insert_bit(bits, index, 0) for bits in self.status_bits]
+            for flag, bits in self.flag_bits.items():
+                self.flag_bits[flag] = _insert_bit(bits, index, 0)
+        self.size += 1
+        self._set(index, row)
+
+    def removed(self, index, row):
+        """Record that row was removed from index"""
+        self._clear(index, row)
+        if index < self.size - 1:
+            self.status_bits = [_delete_bit(bits, index) for bits in self.status_bits]
+            for flag, bits in self.flag_bits.items():
+                self.flag_bits[flag] = _delete_bit(bits, index)
+        self.size -= 1
+
+    def updated(self, index, old_row, row):
+        """Record that the row at index changed from old_row's values"""
+        self._clear(index, old_row)
+        self._set(index, row)
+
+    def extended(self, rows):
+        """Record rows appended at the end, OR-ing each bitset once with the new positions"""
+        status_positions = collections.defaultdict(list)
+        flag_positions = {flag: [] for flag in self.FLAGS}
+        for i, row in enumerate(rows, self.size):
+            status_positions[self._code(row[EQ_STATUS])].append(i)
+            for flag, threshold in self.FLAGS.items():
+                if row[EQ_STOCK] <= threshold:
+                    flag_positions[flag].append(i)
+        self.size += len(rows)
+        for code, positions in status_positions.items():
+            self.status_bits[code] |= _bits_from_positions(positions, self.size)
+        for flag, positions in flag_positions.items():
+            if positions:
+                self.flag_bits[flag] |= _bits_from_positions(positions, self.size)
+
+    def rebuild(self, rows):
+        """Re-encode every row, building each bitset once from its positions"""
+        self.codes.clear()
+        self.statuses.clear()
+        self.status_bits.clear()
+        self.flag_bits = dict.fromkeys(self.FLAGS, 0)
+        self.size = 0
+        self.extended(rows)
+
+    def all_bits(self):
+        return (1 << self.size) - 1
+
+    def status_matching(self, test):
+        """OR of the bitsets of every distinct status passing test (one test per status, not per row)"""
+        bits = 0
+        for code, status in enumerate(self.statuses):
+            if test(status):
+                bits |= self.status_bits[code]
+        return bits
+
+equipment_bitmaps = EquipmentBitmaps()
+
+# -------------------------
+# Bit-Sliced Medicine Columns
+# -------------------------
+# Comparing a value per row costs an interpreted step per row, even over an
+# array.array (each item is boxed on the way out). Stored bit-sliced, a range
+# test is a few int operations per bit of the value, each covering a whole chunk.
+_BIT_DIGITS = [bytes(ord("1") if b >> k & 1 else ord("0") for b in range(256)) for k in range(8)]  # byte -> its bit k
+_SELECTOR_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+def _transpose(values, width):
+    """Bit-slice values: slices[j] has bit i set iff values[i] has bit j set (two's complement)"""
+    if not values:
+        return [0] * width
+    if width <= 64:
+        raw = array.array("q", values)
+        if sys.byteorder == "big":
+            raw.byteswap()
+        raw = raw.tobytes()  # 8 little-endian bytes per value: bit j is in every 8th byte from j // 8
+        planes = [raw[j // 8::8].translate(_BIT_DIGITS[j % 8]) for j in range(width)]
+    else:  # wider than a C long long: go through text
+        mask = (1 << width) - 1
+        text = "".join([format(value & mask, f"0{width}b") for value in values])
+        planes = [text[width - 1 - j::width] for j in range(width)]
+    return [int(plane[::-1], 2) for plane in planes]  # reversed: values[0] is the least significant bit
+
+class SlicedColumn:
+    """Integers in array order, kept in chunks that each hold one bitset per bit of their values"""
+    CHUNK = 4096  # rows per chunk on bulk loads; a chunk is split in two past 2 * CHUNK rows
+
+    def __init__(self):
+        self.width = 1    # bits per value, two's complement: the top one is the sign
+        self.chunks = []  # [row count, [bitset of bit 0, ..., bitset of bit width-1]]
+        self.starts = []  # starts[c] = position of the first row of chunks[c]
+        self.size = 0
+
+    def _fit(self, values):
+        """Sign-extend every chunk until values fit"""
+        width = max(value.bit_length() + 1 for value in values)
+        if width > self.width:
+            for _, slices in self.chunks:
+                slices.extend([slices[-1]] * (width - self.width))
+            self.width = width
+
+    def _edited(self, delta):
+        self.size += delta
+        self.starts = list(itertools.accumulate((count for count, _ in self.chunks[:-1]), initial=0)) \
+            if self.chunks else []
+
+    def _locate(self, index):
+        """Chunk number and offset for index (index == size appends to the last chunk)"""
+        c = max(0, bisect.bisect_right(self.starts, index) - 1)
+        return c, index - self.starts[c]
+
+    def inserted(self, index, value):
+        self._fit((value,))
+        if not self.chunks:
+            self.chunks.append([0, [0] * self.width])
+            self.starts = [0]
+        c, offset = self._locate(index)
+        chunk = self.chunks[c]
+        chunk[1] = [_insert_bit(bits, offset, value >> j & 1) for j, bits in enumerate(chunk[1])]
+        chunk[0] += 1
+        if chunk[0] > 2 * self.CHUNK:
+            low = (1 << self.CHUNK) - 1
+            self.chunks.insert(c + 1, [chunk[0] - self.CHUNK, [bits >> self.CHUNK for bits in chunk[1]]])
+            chunk[:] = [self.CHUNK, [bits & low for bits in chunk[1]]]
+        self._edited(1)
+
+    def removed(self, index):
+        c, offset = self._locate(index)
+        chunk = self.chunks[c]
+        chunk[1] = [_delete_bit(bits, offset) for bits in chunk[1]]
+        chunk[0] -= 1
+        if not chunk[0]:
+            del self.chunks[c]
+        self._edited(-1)
+
+    def updated(self, index, old_value, value):
+        """Record that the value at index changed from old_value, flipping only the bits that differ"""
+        self._fit((value,))
+        c, offset = self._locate(index)
+        slices, flips = self.chunks[c][1], old_value ^ value
+        for j in range(self.width):
+            if flips >> j & 1:
+                slices[j] ^= 1 << offset
+
+    def extended(self, values):
+        """Record values appended at the end: top up the last chunk, then slice whole chunks at once"""
+        values = list(values)
+        if not values:
+            return
+        self._fit(values)
+        taken = 0
+        if self.chunks and self.chunks[-1][0] < self.CHUNK:
+            chunk = self.chunks[-1]
+            head = values[:self.CHUNK - chunk[0]]
+            chunk[1] = [bits | (new << chunk[0]) for bits, new in zip(chunk[1], _transpose(head, self.width))]
+            chunk[0] += len(head)
+            taken = len(head)
+        for i in range(taken, len(values), self.CHUNK):
+            part = values[i:i + self.CHUNK]
+            self.chunks.append([len(part), _transpose(part, self.width)])
+        self._edited(len(values))
+
+    def rebuild(self, values):
+        self.width = 1
+        self.chunks = []
+        self.starts = []
+        self.size = 0
+        self.extended(values)
+
+    def _at_most(self, slices, value, all_bits):
+        """Bitset of the chunk rows holding at most value (which must fit the width)"""
+        # Offset binary (sign bit flipped) orders like unsigned ints, so walk the
+        # bits from the top, as in comparing two binary strings
+        top = self.width - 1
+        target = value + (1 << top)
+        less, equal = 0, all_bits
+        for j in range(top, -1, -1):
+            bits = slices[j] if j < top else ~slices[j] & all_bits
+            if target >> j & 1:
+                less |= equal & ~bits
+                equal &= bits
+            else:
+                equal &= ~bits
+        return less | equal
+
+    def selectors(self, lo=None, hi=None):
+        """One byte per row, 1 where lo <= value <= hi (None = unbounded; bounds may be fractional)"""
+        smallest, largest = -(1 << (self.width - 1)), (1 << (self.width - 1)) - 1
+        # Clamp before rounding so an infinite bound never reaches floor() or ceil()
+        lo = None if lo is None or lo <= smallest else math.ceil(lo)
+        hi = None if hi is None or hi >= largest else math.floor(hi)
+        if (lo is not None and lo > largest) or (hi is not None and (hi < smallest or (lo is not None and lo > hi))):
+            return bytes(self.size)
+        digits = []
+        for count, slices in self.chunks:
+            all_bits = (1 << count) - 1
+            bits = all_bits if hi is None else self._at_most(slices, hi, all_bits)
+            if lo is not None:
+                bits &= ~self._at_most(slices, lo - 1, all_bits)
+            digits.append(format(bits, f"0{count}b")[::-1])  # the chunk's first row first
+        return "".join(digits).encode().translate(_SELECTOR_BYTES)
+
+class MedicineColumns:
+    """Bit-sliced packs, total_qty and expiry ordinal columns, position i holding medicines[i]"""
+
+    FIELDS = {"packs": MED_PACKS, "total_qty": MED_TOTAL_QTY, "expiry": MED_EXPIRY_ORD}
+    UNDATED = 0  # stored for a missing expiry: day ordinals start at 1, so no date range reaches it
+
+    # In scanned-row units (see AccessPath), measured on 1M medicines: building the
+    # selectors and walking the chunks costs 0.06 to 0.15 per row, each hit 0.3 to
+    # 1 more (the low end once hits are dense enough to compress whole chunks)
+    SCAN_COST = 0.15
+    HIT_COST = 0.5
+
+    def __init__(self):
+        self.columns = {field: SlicedColumn() for field in self.FIELDS}
+
+    def _value(self, row, col):
+        value = row[col]
+        return self.UNDATED if value is None else value
+
+    def inserted(self, index, row):
+        for field, col in self.FIELDS.items():
+            self.columns[field].inserted(index, self._value(row, col))
+
+    def removed(self, index):
+        for column in self.columns.values():
+            column.removed(index)
+
+    def updated(self, index, old_row, row):
+        for field, col in self.FIELDS.items():
+            self.columns[field].updated(index, self._value(old_row, col), self._value(row, col))
+
+    def extended(self, rows):
+        for field, col in self.FIELDS.items():
+            self.columns[field].extended([self._value(row, col) for row in rows])
+
+    def rebuild(self, rows):
+        for field, col in self.FIELDS.items():
+            self.columns[field].rebuild([self._value(row, col) for row in rows])
+
+    def selectors(self, field, lo=None, hi=None):
+        """One byte per medicine, 1 where lo <= field <= hi; an undated row never matches on expiry"""
+        if field == "expiry":
+            lo = 1 if lo is None else max(lo, 1)
+        return self.columns[field].selectors(lo, hi)
+
+medicine_columns = MedicineColumns()
+
+# -------------------------
+# Copy-on-Write Snapshots
+# -------------------------
+class FrozenRows(collections.abc.Sequence):
+    """Immutable tuple-of-chunks row sequence; each edit copies one chunk and shares the rest"""
+    __slots__ = ("chunks", "starts", "length")
+    CHUNK = 512  # a chunk is split in two once it grows past 2 * CHUNK rows
+
+    def __init__(self, chunks=(), starts=None):
+        self.chunks = chunks
+        if starts is None:
+            starts = tuple(itertools.accumulate(map(len, chunks[:-1]), initial=0)) if chunks else ()
+        self.starts = starts  # starts[c] = index of chunks[c][0]
+        self.length = starts[-1] + len(chunks[-1]) if chunks else 0
+
+    @classmethod
+    def from_rows(cls, rows):
+        frozen = [tuple(row) for row in rows]
+        return cls(tuple(tuple(frozen[i:i + cls.CHUNK]) for i in range(0, len(frozen), cls.CHUNK)))
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.chunks)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self)[index]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("FrozenRows index out of range")
+        c = bisect.bisect_right(self.starts, index) - 1
+        return self.chunks[c][index - self.starts[c]]
+
+    def _locate(self, index):
+        """Chunk number and offset for index (index == len appends to the last chunk)"""
+        if not self.chunks:
+            return 0, 0
+        c = max(0, bisect.bisect_right(self.starts, index) - 1)
+        return c, index - self.starts[c]
+
+    def _with_chunk(self, c, new_chunks, delta):
+        """New version with chunk c replaced by new_chunks (zero, one or two chunks) holding delta more rows"""
+        start, new_starts = self.starts[c], []
+        for chunk in new_chunks:
+            new_starts.append(start)
+            start += len(chunk)
+        later = self.starts[c + 1:]
+        if delta:
+            later = tuple(map(delta.__add__, later))  # shift the offsets after c without a Python loop
+        return FrozenRows(self.chunks[:c] + tuple(new_chunks) + self.chunks[c + 1:],
+                          self.starts[:c] + tuple(new_starts) + later)
+
+    def inserted(self, index, row):
+        if not self.chunks:
+            return FrozenRows(((row,),))
+        c, offset = self._locate(index)
+        chunk = self.chunks[c]
+        chunk = chunk[:offset] + (row,) + chunk[offset:]
+        if len(chunk) > 2 * self.CHUNK:
+            half = len(chunk) // 2
+            return self._with_chunk(c, (chunk[:half], chunk[half:]), 1)
+        return self._with_chunk(c, (chunk,), 1)
+
+    def extended(self, rows):
+        """New version with rows (tuples) appended; only the last chunk is copied"""
+        if not rows:
+            return self
+        c = max(len(self.chunks) - 1, 0)
+        start = self.starts[c] if self.chunks else 0
+        tail = self.chunks[c] + tuple(rows) if self.chunks else tuple(rows)
+        return FrozenRows(self.chunks[:c] + tuple(tail[i:i + self.CHUNK] for i in range(0, len(tail), self.CHUNK)),
+                          self.starts[:c] + tuple(range(start, start + len(tail), self.CHUNK)))
+
+    def deleted(self, index):
+        c, offset = self._locate(index)
+        chunk = self.chunks[c]
+        chunk = chunk[:offset] + chunk[offset + 1:]
+        return self._with_chunk(c, (chunk,) if chunk else (), -1)
+
+    def replaced(self, index, row):
+        c, offset = self._locate(index)
+        chunk = self.chunks[c]
+        return self._with_chunk(c, (chunk[:offset] + (row,) + chunk[offset + 1:],), 0)
+
+class InventorySnapshot:
+    """One consistent version of both arrays; rows are tuples and never change"""
+    __slots__ = ("medicines", "equipment", "version")
+
+    def __init__(self, medicines, equipment, version):
+        self.medicines = medicines  # FrozenRows
+        self.equipment = equipment  # FrozenRows
+        self.version = version
+
+    def medicine_records(self):
+        return [MedicineRecord(row) for row in self.medicines]
+
+    def equipment_records(self):
+        return [EquipmentRecord(row) for row in self.equipment]
+
+class SnapshotPublisher:
+    """Keeps frozen copies of the arrays in step with every mutation; publish() swaps them in with one assignment"""
+
+    def __init__(self):
+        self.medicines = FrozenRows()
+        self.equipment = FrozenRows()
+        self.version = 0
+        self.batch_depth = 0
+        self.published = InventorySnapshot(self.medicines, self.equipment, self.version)
+
+    def publish(self):
+        if self.batch_depth == 0:
+            self.version += 1
+            self.published = InventorySnapshot(self.medicines, self.equipment, self.version)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Publish once, after all the mutations in the with-block"""
+        self.batch_depth += 1
+        try:
+            yield
+        finally:
+            self.batch_depth -= 1
+            self.publish()
+
+snapshots = SnapshotPublisher()
+
+def snapshot():
+    """Return the latest published InventorySnapshot in O(1) (nothing is copied)"""
+    return snapshots.published
+
+# -------------------------
+# Thread-Safe Store (reader-writer lock)
+# -------------------------
+class ReadWriteLock:
+    """Many readers or one writer, reentrant per thread; waiting writers hold back new readers"""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0          # threads holding the read lock
+        self._writer = None        # ident of the thread holding the write lock
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()  # per-thread read depth
+
+    def acquire_read(self):
+        local = self._local
+        depth = getattr(local, "depth", 0)
+        if depth == 0:
+            with self._cond:
+                if self._writer == threading.get_ident():
+                    local.counted = False  # reading inside our own write section
+                else:
+                    while self._writer is not None or self._waiting_writers:
+                        self._cond.wait()
+                    self._readers += 1
+                    local.counted = True
+        local.depth = depth + 1
+
+    def release_read(self):
+        local = self._local
+        local.depth -= 1
+        if local.depth == 0 and local.counted:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    def acquire_write(self):
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "depth", 0):
+                raise RuntimeError("cannot upgrade a read lock to a write lock")
+            self._waiting_writers += 1
+            while self._writer is not None or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def is_outermost_write(self):
+        """True if the calling thread holds the write lock exactly once (its next release frees it)"""
+        with self._cond:
+            return self._writer == threading.get_ident() and self._write_depth == 1
+
+    def release_write(self):
+        with self._cond:
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+class InventoryStore:
+    """Thread-safe owner of the inventory arrays; read()/write() make several calls one atomic step"""
+
+    def __init__(self):
+        self.lock = ReadWriteLock()
+        self.generation = 0  # bumped by every mutation of either array (see the row helpers)
+        self.listeners = []  # callback(kind), see add_change_listener
+        self.changes = []    # kinds changed by the current write section, announced when it ends
+
+    @property
+    def medicines(self):
+        return medicines
+
+    @property
+    def equipment(self):
+        return equipment
+
+    @contextlib.contextmanager
+    def read(self):
+        self.lock.acquire_read()
+        try:
+            yield self
+        finally:
+            self.lock.release_read()
+
+    @contextlib.contextmanager
+    def write(self):
+        self.lock.acquire_write()
+        try:
+            yield self
+        finally:
+            self._end_write()
+
+    def _end_write(self):
+        """Release the write lock; the outermost release then calls the listeners, lock-free"""
+        changes = []
+        if self.lock.is_outermost_write():
+            changes, self.changes = self.changes, []
+        self.lock.release_write()
+        for kind in dict.fromkeys(changes):
+            for callback in self.listeners:
+                callback(kind)
+
+    def reader(self, func):
+        """Decorator: run func under the read lock"""
+        @functools.wraps(func)
+        def locked(*args, **kwargs):
+            self.lock.acquire_read()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.lock.release_read()
+        return locked
+
+    def writer(self, func):
+        """Decorator: run func under the write lock"""
+        @functools.wraps(func)
+        def locked(*args, **kwargs):
+            self.lock.acquire_write()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._end_write()
+        return locked
+
+inventory_store = InventoryStore()
+
+# -------------------------
+# Query Result Cache
+# -------------------------
+class QueryCache:
+    """Bounded LRU cache of query results keyed on (generation, query); a new generation drops every entry"""
+
+    def __init__(self, max_entries=128, max_rows=100000):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.entries = collections.OrderedDict()  # (generation, name, args) -> (result, rows)
+        self.generation = None                    # generation of the cached entries
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()  # readers share the cache concurrently
+
+    def _reset(self, generation):
+        self.entries.clear()
+        self.rows = 0
+        self.generation = generation
+
+    def get(self, query, compute):
+        """Return the cached result of query, or compute(), cache and return it"""
+        generation = inventory_store.generation
+        key = (generation,) + query
+        with self.lock:
+            if generation != self.generation:
+                self._reset(generation)
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        result = compute()
+        rows = len(result) if isinstance(result, collections.abc.Sized) else 1
+        with self.lock:
+            if generation == self.generation and rows <= self.max_rows and key not in self.entries:
+                self.entries[key] = (result, rows)
+                self.rows += rows
+                while len(self.entries) > self.max_entries or self.rows > self.max_rows:
+                    _, (_, dropped) = self.entries.popitem(last=False)
+                    self.rows -= dropped
+                    self.evictions += 1
+        return result
+
+    def cached(self, func):
+        """Decorator: serve func(*args) from the cache; list and set results are returned as copies"""
+        name = func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            query = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(query)
+            except TypeError:
+                return func(*args, **kwargs)
+            result = self.get(query, lambda: func(*args, **kwargs))
+            return type(result)(result) if isinstance(result, (list, set)) else result
+        return wrapper
+
+    def clear(self):
+        with self.lock:
+            self._reset(self.generation)
+
+    def info(self):
+        """Current size, limits and counters of the cache"""
+        with self.lock:
+            return {"entries": len(self.entries), "max_entries": self.max_entries,
+                    "rows": self.rows, "max_rows": self.max_rows, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions, "generation": self.generation}
+
+query_cache = QueryCache()
+
+# Field values are checked before anything is mutated: a value the indexes
+# cannot order (e.g. packs="3") must fail while the arrays are untouched.
+def _whole_number(value, field):
+    """Return value as an int, or raise ValueError if it is not a whole number"""
+    if type(value) is int:
+        return value
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or (not isinstance(value, str) and number != value):
+        raise ValueError(f"{field} must be a whole number, got {value!r}")
+    return number
+
+def _medicine_fields(name, packs, items_per_pack, total_qty):
+    """Checked (name, packs, items_per_pack, total_qty) for a medicine row"""
+    return (str(name), _whole_number(packs, "packs"), _whole_number(items_per_pack, "items_per_pack"),
+            _whole_number(total_qty, "total_qty"))
+
+def _equipment_fields(name, stock, status):
+    """Checked (name, stock, status) for an equipment row"""
+    return str(name), _whole_number(stock, "stock"), str(status)
+
+# Every mutator goes through these helpers so the id index and all secondary
+# indexes stay consistent with the arrays.
+def _index_medicine_rows(rows):
+    """Add medicine rows to the secondary indexes, merging each sorted index once"""
+    for row in rows:
+        medicine_names.add(row[MED_NAME], row[MED_ID])
+        medicine_lots.add(row[MED_NAME], row[MED_EXPIRY_ORD], row[MED_ID])
+        inventory_stats.add_medicine(row)
+    medicine_expiry.add_many([(row[MED_EXPIRY_ORD], row[MED_ID]) for row in rows])
+    medicine_packs.add_many([(row[MED_PACKS], row[MED_ID]) for row in rows])
+    medicine_total_qty.add_many([(row[MED_TOTAL_QTY], row[MED_ID]) for row in rows])
+
+def _unindex_medicine_rows(rows):
+    """Remove medicine rows from the secondary indexes (uses the rows' current values)"""
+    for row in rows:
+        medicine_names.discard(row[MED_NAME], row[MED_ID])
+        medicine_lots.discard(row[MED_NAME], row[MED_ID])
+        inventory_stats.remove_medicine(row)
+    medicine_expiry.discard_many([(row[MED_EXPIRY_ORD], row[MED_ID]) for row in rows])
+    medicine_packs.discard_many([(row[MED_PACKS], row[MED_ID]) for row in rows])
+    medicine_total_qty.discard_many([(row[MED_TOTAL_QTY], row[MED_ID]) for row in rows])
+
+def _index_equipment_rows(rows):
+    """Add equipment rows to the secondary indexes, merging the stock index once"""
+    for row in rows:
+        equipment_names.add(row[EQ_NAME], row[EQ_ID])
+        inventory_stats.add_equipment(row)
+    equipment_stock.add_many([(row[EQ_STOCK], row[EQ_ID]) for row in rows])
+
+def _unindex_equipment_rows(rows):
+    """Remove equipment rows from the secondary indexes (uses the rows' current values)"""
+    for row in rows:
+        equipment_names.discard(row[EQ_NAME], row[EQ_ID])
+        inventory_stats.remove_equipment(row)
+    equipment_stock.discard_many([(row[EQ_STOCK], row[EQ_ID]) for row in rows])
+
+def _index_medicine_row(row):
+    _index_medicine_rows((row,))
+
+def _unindex_medicine_row(row):
+    _unindex_medicine_rows((row,))
+
+def _index_equipment_row(row):
+    _index_equipment_rows((row,))
+
+def _unindex_equipment_row(row):
+    _unindex_equipment_rows((row,))
+
+def _insert_medicine_row(index, row):
+    """Insert a checked row (see _medicine_fields) into the medicines array at index and index it"""
+    medicines.insert(index, row)
+    inventory_store.generation += 1
+    medicine_views.clear()
+    snapshots.medicines = snapshots.medicines.inserted(index, tuple(row))
+    snapshots.publish()
+    medicine_columns.inserted(index, row)
+    _index_medicine_row(row)
+
+def _pop_medicine_row(index):
+    """Remove and return medicines[index], dropping it from every index"""
+    row = medicines.pop(index)
+    inventory_store.generation += 1
+    medicine_views.clear()
+    snapshots.medicines = snapshots.medicines.deleted(index)
+    snapshots.publish()
+    medicine_columns.removed(index)
+    _unindex_medicine_row(row)
+    return row
+
+def _insert_equipment_row(index, row):
+    """Insert a checked row (see _equipment_fields) into the equipment array at index and index it"""
+    equipment.insert(index, row)
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = snapshots.equipment.inserted(index, tuple(row))
+    snapshots.publish()
+    equipment_bitmaps.inserted(index, row)
+    _index_equipment_row(row)
+
+def _pop_equipment_row(index):
+    """Remove and return equipment[index], dropping it from every index"""
+    row = equipment.pop(index)
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = snapshots.equipment.deleted(index)
+    snapshots.publish()
+    equipment_bitmaps.removed(index, row)
+    _unindex_equipment_row(row)
+    return row
+
+# A bulk removal of more than 1/REMOVE_PASS_RATIO of an array rebuilds it in
+# one pass instead of popping (and shifting snapshots and bitmaps) row by row.
+REMOVE_PASS_RATIO = 64
+
+def _append_medicine_rows(rows):
+    """Append checked rows to the medicines array and merge them into every index once"""
+    medicines.extend(rows)
+    inventory_store.generation += 1
+    medicine_views.clear()
+    snapshots.medicines = snapshots.medicines.extended([tuple(row) for row in rows])
+    snapshots.publish()
+    medicine_columns.extended(rows)
+    _index_medicine_rows(rows)
+
+def _remove_medicine_rows(ids):
+    """Remove the medicines whose id is in ids; returns the removed rows in array order"""
+    positions = sorted({medicines.position(row_id) for row_id in ids} - {-1})
+    if len(positions) * REMOVE_PASS_RATIO < len(medicines):
+        # Pop from the back so the remaining positions stay valid
+        with snapshots.batch():
+            return [_pop_medicine_row(i) for i in reversed(positions)][::-1]
+    removed = [medicines[i] for i in positions]
+    doomed = {row[MED_ID] for row in removed}
+    kept = [row for row in medicines if row[MED_ID] not in doomed]
+    medicines.clear()
+    medicines.extend(kept)
+    inventory_store.generation += 1
+    medicine_views.clear()
+    snapshots.medicines = FrozenRows.from_rows(row for row in snapshots.medicines if row[MED_ID] not in doomed)
+    snapshots.publish()
+    medicine_columns.rebuild(kept)
+    _unindex_medicine_rows(removed)
+    return removed
+
+def _append_equipment_rows(rows):
+    """Append checked rows to the equipment array and merge them into every index once"""
+    equipment.extend(rows)
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = snapshots.equipment.extended([tuple(row) for row in rows])
+    snapshots.publish()
+    equipment_bitmaps.extended(rows)
+    _index_equipment_rows(rows)
+
+def _remove_equipment_rows(ids):
+    """Remove the equipment whose id is in ids; returns the removed rows in array order"""
+    positions = sorted({equipment.position(row_id) for row_id in ids} - {-1})
+    if len(positions) * REMOVE_PASS_RATIO < len(equipment):
+        with snapshots.batch():
+            return [_pop_equipment_row(i) for i in reversed(positions)][::-1]
+    removed = [equipment[i] for i in positions]
+    doomed = {row[EQ_ID] for row in removed}
+    kept = [row for row in equipment if row[EQ_ID] not in doomed]
+    equipment.clear()
+    equipment.extend(kept)
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = FrozenRows.from_rows(row for row in snapshots.equipment if row[EQ_ID] not in doomed)
+    snapshots.publish()
+    equipment_bitmaps.rebuild(kept)
+    _unindex_equipment_rows(removed)
+    return removed
+
+def _rebuild_medicine_indexes():
+    """Rebuild every medicine index from scratch (after clear or bulk load)"""
+    for row in medicines:
+        if len(row) <= MED_EXPIRY_ORD:
+            # Rows loaded from storage only carry the six visible columns
+            row[MED_EXPIRY], ordinal = normalize_expiry(row[MED_EXPIRY])
+            row.append(ordinal)
+    inventory_store.generation += 1
+    medicine_views.clear()
+    snapshots.medicines = FrozenRows.from_rows(medicines)
+    snapshots.publish()
+    medicine_columns.rebuild(medicines)
+    medicine_names.clear()
+    medicine_expiry.clear()
+    medicine_packs.clear()
+    medicine_total_qty.clear()
+    medicine_lots.clear()
+    inventory_stats.reset_medicines()
+    _index_medicine_rows(medicines)
+
+def _rebuild_equipment_indexes():
+    """Rebuild every equipment index from scratch (after clear or bulk load)"""
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = FrozenRows.from_rows(equipment)
+    snapshots.publish()
+    equipment_bitmaps.rebuild(equipment)
+    equipment_names.clear()
+    equipment_stock.clear()
+    inventory_stats.reset_equipment()
+    _index_equipment_rows(equipment)
+
+def _first_by_position(rows, ids):
+    """Return the id in ids that comes first in the array (ids is small: one per duplicate name)"""
+    if len(ids) == 1:
+        return next(iter(ids))
+    return min(ids, key=rows.position)
+
+# -------------------------
+# ID Allocation
+# -------------------------
+# Monotonic counters: an id is never handed out twice, even after removals,
+# and the position a row is inserted at has no effect on its id.
+next_medicine_id = 1
+next_equipment_id = 1
+
+@inventory_store.writer
+def allocate_medicine_id():
+    """Return a fresh medicine id and advance the counter"""
+    global next_medicine_id
+    row_id = next_medicine_id
+    next_medicine_id += 1
+    return row_id
+
+@inventory_store.writer
+def allocate_equipment_id():
+    """Return a fresh equipment id and advance the counter"""
+    global next_equipment_id
+    row_id = next_equipment_id
+    next_equipment_id += 1
+    return row_id
+
+@inventory_store.writer
+def allocate_medicine_ids(count):
+    """Reserve count consecutive fresh medicine ids and return them as a range"""
+    global next_medicine_id
+    ids = range(next_medicine_id, next_medicine_id + count)
+    next_medicine_id += count
+    return ids
+
+@inventory_store.writer
+def allocate_equipment_ids(count):
+    """Reserve count consecutive fresh equipment ids and return them as a range"""
+    global next_equipment_id
+    ids = range(next_equipment_id, next_equipment_id + count)
+    next_equipment_id += count
+    return ids
+
 # Add default data to demonstrate list operations
+@inventory_store.writer
 def initialize_default_data():
     """Initialize the multidimensional arrays with default medicine and equipment data"""
     global medicines, equipment
@@ -38,30 +1982,29 @@ def initialize_default_data():
     # Clear existing data
     medicines.clear()
     equipment.clear()
+    _rebuild_medicine_indexes()
+    _rebuild_equipment_indexes()
     
     # Arrays start empty - no default data
 
 # Basic Array Operations for Medicines
-def add_medicine(name, packs, items_per_pack, total_qty, expiry):
+@inventory_store.writer
+def add_medicine(name, packs, items_per_pack, total_qty, expiry, expiry_ordinal=None):
     """Add medicine to multidimensional array using append()"""
     global medicines
     
-    row_id = len(medicines) + 1  # simple auto-increment using array length
+    name, packs, items_per_pack, total_qty = _medicine_fields(name, packs, items_per_pack, total_qty)
+    expiry, expiry_ordinal = normalize_expiry(expiry, expiry_ordinal)  # parsed once, here
+    row_id = allocate_medicine_id()  # last, so a rejected row uses no id; never reused
     # Create a new row with all fields
-    new_row = [row_id, name, packs, items_per_pack, total_qty, expiry]
-    medicines.append(new_row)  # Add entire row to 2D array
+    new_row = [row_id, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal]
+    _insert_medicine_row(len(medicines), new_row)  # Append entire row to 2D array
     
-    # Return a dictionary for compatibility with existing code
-    return {
-        "id": row_id,
-        "name": name,
-        "packs": packs,
-        "items_per_pack": items_per_pack,
-        "total_qty": total_qty,
-        "expiry": expiry
-    }
+    # Return a dict-style record view for compatibility with existing code
+    return MedicineRecord(new_row)
 
-def insert_medicine_at_position(index, name, packs, items_per_pack, total_qty, expiry):
+@inventory_store.writer
+def insert_medicine_at_position(index, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal=None):
     """Insert medicine into multidimensional array at a specific index using insert()"""
     global medicines
     
@@ -69,144 +2012,149 @@ def insert_medicine_at_position(index, name, packs, items_per_pack, total_qty, e
         print(f"Error: Index {index} is out of bounds for medicines array (size {len(medicines)})")
         return None
     
-    # Generate a unique ID for the new medicine
-    new_id = (medicines[-1][MED_ID] + 1) if medicines else 1
+    name, packs, items_per_pack, total_qty = _medicine_fields(name, packs, items_per_pack, total_qty)
+    expiry, expiry_ordinal = normalize_expiry(expiry, expiry_ordinal)  # parsed once, here
+    # Generate a unique ID for the new medicine once the row is valid; existing ids are left untouched
+    new_id = allocate_medicine_id()
     
     # Create new row with all fields
-    new_row = [new_id, name, packs, items_per_pack, total_qty, expiry]
-    medicines.insert(index, new_row)  # Insert entire row at specific index
-    
-    # Re-assign IDs to maintain sequential order after insertion
-    for i in range(len(medicines)):
-        medicines[i][MED_ID] = i + 1
+    new_row = [new_id, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal]
+    _insert_medicine_row(index, new_row)  # Insert entire row at specific index
         
-    return {
-        "id": new_id,
-        "name": name,
-        "packs": packs,
-        "items_per_pack": items_per_pack,
-        "total_qty": total_qty,
-        "expiry": expiry
-    }
-
+    return MedicineRecord(new_row)
+
+def _move_medicine_row(row_id, anchor_id, offset):
+    """Move a medicine next to another one, repositioning only what is keyed on array position"""
+    if row_id == anchor_id or medicines.get(row_id) is None or medicines.get(anchor_id) is None:
+        return False
+    # The name, value and lot indexes hold ids, not positions, so they are left alone: a move
+    # costs two chunk edits in the RowStore, the snapshot and the columns, not a full reindex
+    old_index = medicines.position(row_id)
+    row = medicines.pop(old_index)
+    index = medicines.position(anchor_id) + offset
+    medicines.insert(index, row)
+    inventory_store.generation += 1
+    medicine_views.clear()  # equal sort keys keep array order
+    snapshots.medicines = snapshots.medicines.deleted(old_index).inserted(index, tuple(row))
+    snapshots.publish()
+    medicine_columns.removed(old_index)
+    medicine_columns.inserted(index, row)
+    return True
+
+@inventory_store.writer
+def move_medicine_before(row_id, anchor_id):
+    """Move a medicine so it sits just before the anchor medicine"""
+    return _move_medicine_row(row_id, anchor_id, 0)
+
+@inventory_store.writer
+def move_medicine_after(row_id, anchor_id):
+    """Move a medicine so it sits just after the anchor medicine"""
+    return _move_medicine_row(row_id, anchor_id, 1)
+
+@inventory_store.writer
 def remove_medicine_by_id(medicine_id):
-    """Remove medicine by ID using multidimensional array operations"""
+    """Remove medicine by ID using the id hash index (no scan)"""
     global medicines
     
-    for i in range(len(medicines)):
-        if medicines[i][MED_ID] == medicine_id:
-            # Store the removed data before deletion
-            removed_data = {
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            }
-            # Remove entire row from 2D array
-            medicines.pop(i)
-            return removed_data
-    return None
+    i = medicines.position(medicine_id)
+    if i == -1:
+        return None
+    # The row object outlives its removal, so a view of it is enough
+    removed_data = MedicineRecord(medicines[i])
+    # Remove entire row from 2D array
+    _pop_medicine_row(i)
+    return removed_data
 
+@inventory_store.writer
 def remove_medicine_by_name(name):
-    """Remove medicine by name using multidimensional array operations"""
+    """Remove the first medicine with this name (case-insensitive) using the name index"""
     global medicines
     
-    for i in range(len(medicines)):
-        if medicines[i][MED_NAME].lower() == name.lower():
-            # Store the removed data before deletion
-            removed_data = {
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            }
-            # Remove entire row from 2D array
-            medicines.pop(i)
-            return removed_data
-    return None
+    ids = medicine_names.ids(name)
+    if not ids:
+        return None
+    return remove_medicine_by_id(_first_by_position(medicines, ids))
 
+@inventory_store.reader
 def get_medicine_by_index(index):
     """Get medicine by multidimensional array index"""
     if 0 <= index < len(medicines):
-        return {
-            "id": medicines[index][MED_ID],
-            "name": medicines[index][MED_NAME],
-            "packs": medicines[index][MED_PACKS],
-            "items_per_pack": medicines[index][MED_ITEMS_PER_PACK],
-            "total_qty": medicines[index][MED_TOTAL_QTY],
-            "expiry": medicines[index][MED_EXPIRY]
-        }
+        return MedicineRecord(medicines[index])
     return None
 
-def insert_medicine(name, packs, items_per_pack, total_qty, expiry):
+@inventory_store.writer
+def insert_medicine(name, packs, items_per_pack, total_qty, expiry, expiry_ordinal=None):
     """Add medicine using basic multidimensional array append operation"""
-    return add_medicine(name, packs, items_per_pack, total_qty, expiry)
+    return add_medicine(name, packs, items_per_pack, total_qty, expiry, expiry_ordinal)
 
+@inventory_store.reader
 def fetch_medicines():
     """Fetch all medicines from multidimensional array"""
-    return [(medicines[i][MED_ID], medicines[i][MED_NAME], medicines[i][MED_PACKS], 
-             medicines[i][MED_ITEMS_PER_PACK], medicines[i][MED_TOTAL_QTY], medicines[i][MED_EXPIRY]) 
-            for i in range(len(medicines))]
+    return [(row[MED_ID], row[MED_NAME], row[MED_PACKS], 
+             row[MED_ITEMS_PER_PACK], row[MED_TOTAL_QTY], row[MED_EXPIRY]) 
+            for row in medicines]
 
+@inventory_store.reader
 def get_medicine_count():
     """Get total number of medicines in multidimensional array"""
     return len(medicines)
 
+@inventory_store.reader
 def is_medicines_empty():
     """Check if medicines multidimensional array is empty"""
     return len(medicines) == 0
 
+@inventory_store.writer
 def clear_all_medicines():
     """Clear all medicines from multidimensional array"""
     global medicines
     medicines.clear()
+    _rebuild_medicine_indexes()
 
-def update_medicine(row_id, name, packs, items_per_pack, total_qty, expiry):
-    """Update medicine using multidimensional array operations"""
+@inventory_store.writer
+def update_medicine(row_id, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal=None):
+    """Update medicine in place, located through the id hash index"""
     global medicines
     
-    for i in range(len(medicines)):
-        if medicines[i][MED_ID] == row_id:
-            medicines[i][MED_NAME] = name
-            medicines[i][MED_PACKS] = packs
-            medicines[i][MED_ITEMS_PER_PACK] = items_per_pack
-            medicines[i][MED_TOTAL_QTY] = total_qty
-            medicines[i][MED_EXPIRY] = expiry
-            return True
-    return False
-
+    row = medicines.get(row_id)
+    if row is None:
+        return False
+    name, packs, items_per_pack, total_qty = _medicine_fields(name, packs, items_per_pack, total_qty)
+    expiry, expiry_ordinal = normalize_expiry(expiry, expiry_ordinal)
+    old_row = row[:]
+    inventory_store.generation += 1
+    _unindex_medicine_row(row)
+    row[MED_NAME] = name
+    row[MED_PACKS] = packs
+    row[MED_ITEMS_PER_PACK] = items_per_pack
+    row[MED_TOTAL_QTY] = total_qty
+    row[MED_EXPIRY] = expiry
+    row[MED_EXPIRY_ORD] = expiry_ordinal
+    _index_medicine_row(row)
+    medicine_views.row_changed(old_row, row)
+    position = medicines.position(row_id)
+    snapshots.medicines = snapshots.medicines.replaced(position, tuple(row))
+    snapshots.publish()
+    medicine_columns.updated(position, old_row, row)
+    return True
+
+@inventory_store.reader
 def find_medicine_by_id(row_id):
-    """Find medicine by ID using multidimensional array operations"""
-    for i in range(len(medicines)):
-        if medicines[i][MED_ID] == row_id:
-            return {
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            }
-    return None
+    """Find medicine by ID using the id hash index"""
+    row = medicines.get(row_id)
+    if row is None:
+        return None
+    return MedicineRecord(row)
 
+@inventory_store.reader
 def find_medicine_by_name(name):
-    """Find medicine by name using multidimensional array operations"""
-    for i in range(len(medicines)):
-        if medicines[i][MED_NAME].lower() == name.lower():
-            return {
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            }
-    return None
+    """Find the first medicine with this name (case-insensitive) using the name index"""
+    ids = medicine_names.ids(name)
+    if not ids:
+        return None
+    return find_medicine_by_id(_first_by_position(medicines, ids))
 
+@inventory_store.writer
 def delete_medicine(row_id):
     """Delete medicine using multidimensional array operations"""
     return remove_medicine_by_id(row_id)
@@ -214,23 +2162,21 @@ def delete_medicine(row_id):
 # -------------------------
 # Equipment functions with Basic Multidimensional Array Operations
 # -------------------------
+@inventory_store.writer
 def add_equipment(name, stock, status):
     """Add equipment to multidimensional array using append()"""
     global equipment
     
-    row_id = len(equipment) + 1
+    name, stock, status = _equipment_fields(name, stock, status)
+    row_id = allocate_equipment_id()  # last, so a rejected row uses no id; never reused
     # Create a new row with all fields
     new_row = [row_id, name, stock, status]
-    equipment.append(new_row)  # Add entire row to 2D array
+    _insert_equipment_row(len(equipment), new_row)  # Append entire row to 2D array
     
-    # Return a dictionary for compatibility with existing code
-    return {
-        "id": row_id,
-        "name": name,
-        "stock": stock,
-        "status": status
-    }
+    # Return a dict-style record view for compatibility with existing code
+    return EquipmentRecord(new_row)
 
+@inventory_store.writer
 def insert_equipment_at_position(index, name, stock, status):
     """Insert equipment into multidimensional array at a specific index using insert()"""
     global equipment
@@ -239,452 +2185,1118 @@ def insert_equipment_at_position(index, name, stock, status):
         print(f"Error: Index {index} is out of bounds for equipment array (size {len(equipment)})")
         return None
     
-    # Generate a unique ID for the new equipment
-    new_id = (equipment[-1][EQ_ID] + 1) if equipment else 1
+    name, stock, status = _equipment_fields(name, stock, status)
+    # Generate a unique ID for the new equipment once the row is valid; existing ids are left untouched
+    new_id = allocate_equipment_id()
     
     # Create new row with all fields
     new_row = [new_id, name, stock, status]
-    equipment.insert(index, new_row)  # Insert entire row at specific index
-    
-    # Re-assign IDs to maintain sequential order after insertion
-    for i in range(len(equipment)):
-        equipment[i][EQ_ID] = i + 1
+    _insert_equipment_row(index, new_row)  # Insert entire row at specific index
         
-    return {
-        "id": new_id,
-        "name": name,
-        "stock": stock,
-        "status": status
-    }
-
+    return EquipmentRecord(new_row)
+
+def _move_equipment_row(row_id, anchor_id, offset):
+    """Move an equipment row next to another one, repositioning only what is keyed on array position"""
+    if row_id == anchor_id or equipment.get(row_id) is None or equipment.get(anchor_id) is None:
+        return False
+    # As for medicines, plus the bitmaps: shifting every bitset is O(n / word size) per move
+    old_index = equipment.position(row_id)
+    row = equipment.pop(old_index)
+    index = equipment.position(anchor_id) + offset
+    equipment.insert(index, row)
+    inventory_store.generation += 1
+    equipment_views.clear()
+    snapshots.equipment = snapshots.equipment.deleted(old_index).inserted(index, tuple(row))
+    snapshots.publish()
+    equipment_bitmaps.removed(old_index, row)
+    equipment_bitmaps.inserted(index, row)
+    return True
+
+@inventory_store.writer
+def move_equipment_before(row_id, anchor_id):
+    """Move equipment so it sits just before the anchor equipment"""
+    return _move_equipment_row(row_id, anchor_id, 0)
+
+@inventory_store.writer
+def move_equipment_after(row_id, anchor_id):
+    """Move equipment so it sits just after the anchor equipment"""
+    return _move_equipment_row(row_id, anchor_id, 1)
+
+@inventory_store.writer
 def remove_equipment_by_id(eq_id):
-    """Remove equipment by ID using multidimensional array operations"""
+    """Remove equipment by ID using the id hash index (no scan)"""
     global equipment
     
-    for i in range(len(equipment)):
-        if equipment[i][EQ_ID] == eq_id:
-            # Store the removed data before deletion
-            removed_data = {
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            }
-            # Remove entire row from 2D array
-            equipment.pop(i)
-            return removed_data
-    return None
+    i = equipment.position(eq_id)
+    if i == -1:
+        return None
+    # The row object outlives its removal, so a view of it is enough
+    removed_data = EquipmentRecord(equipment[i])
+    # Remove entire row from 2D array
+    _pop_equipment_row(i)
+    return removed_data
 
+@inventory_store.writer
 def remove_equipment_by_name(name):
-    """Remove equipment by name using multidimensional array operations"""
+    """Remove the first equipment with this name (case-insensitive) using the name index"""
     global equipment
     
-    for i in range(len(equipment)):
-        if equipment[i][EQ_NAME].lower() == name.lower():
-            # Store the removed data before deletion
-            removed_data = {
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            }
-            # Remove entire row from 2D array
-            equipment.pop(i)
-            return removed_data
-    return None
+    ids = equipment_names.ids(name)
+    if not ids:
+        return None
+    return remove_equipment_by_id(_first_by_position(equipment, ids))
 
+@inventory_store.reader
 def get_equipment_by_index(index):
     """Get equipment by multidimensional array index"""
     if 0 <= index < len(equipment):
-        return {
-            "id": equipment[index][EQ_ID],
-            "name": equipment[index][EQ_NAME],
-            "stock": equipment[index][EQ_STOCK],
-            "status": equipment[index][EQ_STATUS]
-        }
+        return EquipmentRecord(equipment[index])
     return None
 
+@inventory_store.writer
 def insert_equipment(name, stock, status):
     """Add equipment using basic multidimensional array append operation"""
     return add_equipment(name, stock, status)
 
+@inventory_store.reader
 def fetch_equipment():
     """Fetch all equipment from multidimensional array"""
-    return [(equipment[i][EQ_ID], equipment[i][EQ_NAME], equipment[i][EQ_STOCK], equipment[i][EQ_STATUS]) 
-            for i in range(len(equipment))]
+    return [(row[EQ_ID], row[EQ_NAME], row[EQ_STOCK], row[EQ_STATUS]) 
+            for row in equipment]
 
+@inventory_store.reader
 def get_equipment_count():
     """Get total number of equipment in multidimensional array"""
     return len(equipment)
 
+@inventory_store.reader
 def is_equipment_empty():
     """Check if equipment multidimensional array is empty"""
     return len(equipment) == 0
 
+@inventory_store.writer
 def clear_all_equipment():
     """Clear all equipment from multidimensional array"""
     global equipment
     equipment.clear()
+    _rebuild_equipment_indexes()
 
+@inventory_store.writer
 def update_equipment(row_id, name, stock, status):
-    """Update equipment using multidimensional array operations"""
+    """Update equipment in place, located through the id hash index"""
     global equipment
     
-    for i in range(len(equipment)):
-        if equipment[i][EQ_ID] == row_id:
-            equipment[i][EQ_NAME] = name
-            equipment[i][EQ_STOCK] = stock
-            equipment[i][EQ_STATUS] = status
-            return True
-    return False
-
+    row = equipment.get(row_id)
+    if row is None:
+        return False
+    name, stock, status = _equipment_fields(name, stock, status)
+    old_row = row[:]
+    inventory_store.generation += 1
+    _unindex_equipment_row(row)
+    row[EQ_NAME] = name
+    row[EQ_STOCK] = stock
+    row[EQ_STATUS] = status
+    _index_equipment_row(row)
+    equipment_views.row_changed(old_row, row)
+    position = equipment.position(row_id)
+    equipment_bitmaps.updated(position, old_row, row)
+    snapshots.equipment = snapshots.equipment.replaced(position, tuple(row))
+    snapshots.publish()
+    return True
+
+@inventory_store.reader
 def find_equipment_by_id(row_id):
-    """Find equipment by ID using multidimensional array operations"""
-    for i in range(len(equipment)):
-        if equipment[i][EQ_ID] == row_id:
-            return {
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            }
-    return None
+    """Find equipment by ID using the id hash index"""
+    row = equipment.get(row_id)
+    if row is None:
+        return None
+    return EquipmentRecord(row)
 
+@inventory_store.reader
 def find_equipment_by_name(name):
-    """Find equipment by name using multidimensional array operations"""
-    for i in range(len(equipment)):
-        if equipment[i][EQ_NAME].lower() == name.lower():
-            return {
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            }
-    return None
+    """Find the first equipment with this name (case-insensitive) using the name index"""
+    ids = equipment_names.ids(name)
+    if not ids:
+        return None
+    return find_equipment_by_id(_first_by_position(equipment, ids))
 
+@inventory_store.writer
 def delete_equipment(row_id):
     """Delete equipment using multidimensional array operations"""
     return remove_equipment_by_id(row_id)
 
+# -------------------------
+# Bulk Operations (one snapshot and one change notification per batch)
+# -------------------------
+# callback(kind) is called once after each bulk operation, kind being
+# "medicines" or "equipment", e.g. so the UI reloads that table once.
+# It runs after the write lock is released, on the writer's thread.
+def add_change_listener(callback):
+    """Register callback(kind) to run after every bulk operation"""
+    inventory_store.listeners.append(callback)
+
+def _notify_change(kind):
+    inventory_store.changes.append(kind)
+
+@inventory_store.writer
+def add_medicines_bulk(items):
+    """Append many medicines given as (name, packs, items_per_pack, total_qty, expiry[, expiry_ordinal]) tuples"""
+    # Build every row first so a malformed item leaves the array untouched
+    new_rows = []
+    expiries = {}  # a batch repeats few distinct dates: parse each one once
+    for item in items:
+        name, packs, items_per_pack, total_qty, expiry, *ordinal = item
+        name, packs, items_per_pack, total_qty = _medicine_fields(name, packs, items_per_pack, total_qty)
+        if ordinal:
+            expiry, expiry_ordinal = normalize_expiry(expiry, ordinal[0])
+        else:
+            if expiry not in expiries:
+                expiries[expiry] = normalize_expiry(expiry)
+            expiry, expiry_ordinal = expiries[expiry]
+        new_rows.append([None, name, packs, items_per_pack, total_qty, expiry, expiry_ordinal])
+    if not new_rows:
+        return []
+    for row, row_id in zip(new_rows, allocate_medicine_ids(len(new_rows))):
+        row[MED_ID] = row_id
+    _append_medicine_rows(new_rows)
+    _notify_change("medicines")
+    return [MedicineRecord(row) for row in new_rows]
+
+@inventory_store.writer
+def update_medicines_bulk(updates):
+    """Apply many (row_id, name, packs, items_per_pack, total_qty, expiry[, expiry_ordinal]) updates; all or nothing"""
+    updates = list(updates)
+    if any(len(update) not in (6, 7) or medicines.get(update[0]) is None for update in updates):
+        return False  # unknown id or malformed update: change nothing
+    for update in updates:
+        _medicine_fields(*update[1:5])  # a bad value raises before anything changes
+    if not updates:
+        return True
+    with snapshots.batch():
+        for update in updates:
+            update_medicine(*update)
+    _notify_change("medicines")
+    return True
+
+@inventory_store.writer
+def remove_medicines_bulk(ids):
+    """Remove every medicine whose id is in ids; returns the removed medicines in array order"""
+    removed = _remove_medicine_rows(ids)
+    if not removed:
+        return []
+    _notify_change("medicines")
+    return [MedicineRecord(row) for row in removed]
+
+@inventory_store.writer
+def add_equipment_bulk(items):
+    """Append many equipment items given as (name, stock, status) tuples"""
+    # Build every row first so a malformed item leaves the array untouched
+    new_rows = [[None, *_equipment_fields(name, stock, status)] for name, stock, status in items]
+    if not new_rows:
+        return []
+    for row, row_id in zip(new_rows, allocate_equipment_ids(len(new_rows))):
+        row[EQ_ID] = row_id
+    _append_equipment_rows(new_rows)
+    _notify_change("equipment")
+    return [EquipmentRecord(row) for row in new_rows]
+
+@inventory_store.writer
+def update_equipment_bulk(updates):
+    """Apply many (row_id, name, stock, status) updates; all or nothing"""
+    updates = list(updates)
+    if any(len(update) != 4 or equipment.get(update[0]) is None for update in updates):
+        return False  # unknown id or malformed update: change nothing
+    for update in updates:
+        _equipment_fields(*update[1:])  # a bad value raises before anything changes
+    if not updates:
+        return True
+    with snapshots.batch():
+        for update in updates:
+            update_equipment(*update)
+    _notify_change("equipment")
+    return True
+
+@inventory_store.writer
+def remove_equipment_bulk(ids):
+    """Remove every equipment item whose id is in ids; returns the removed items in array order"""
+    removed = _remove_equipment_rows(ids)
+    if not removed:
+        return []
+    _notify_change("equipment")
+    return [EquipmentRecord(row) for row in removed]
+
 # -------------------------
 # Array Sorting Functions
 # -------------------------
-def sort_medicines_by_name(ascending=True):
-    """Sort medicines multidimensional array by name"""
-    global medicines
-    
-    # Sort the 2D array by name column
-    medicines.sort(key=lambda row: row[MED_NAME].lower(), reverse=not ascending)
-    
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+def _sorted_medicines(column, ascending, materialize):
+    view = medicine_views.get(medicines, column, ascending)
+    if not materialize:
+        return view  # the cached list of rows itself: read it, don't modify it
+    return [MedicineRecord(row) for row in view]
+
+def _sorted_equipment(column, ascending, materialize):
+    view = equipment_views.get(equipment, column, ascending)
+    if not materialize:
+        return view  # the cached list of rows itself: read it, don't modify it
+    return [EquipmentRecord(row) for row in view]
+
+@inventory_store.reader
+def sort_medicines_by_name(ascending=True, materialize=True):
+    """Medicines ordered by name (cached view; the array itself keeps its order)"""
+    return _sorted_medicines(MED_NAME, ascending, materialize)
+
+@inventory_store.reader
+def sort_medicines_by_expiry(ascending=True, materialize=True):
+    """Medicines ordered by expiry date, rows without a valid date last (cached view)"""
+    return _sorted_medicines(MED_EXPIRY_ORD, ascending, materialize)
+
+@inventory_store.reader
+def sort_medicines_by_total_qty(ascending=True, materialize=True):
+    """Medicines ordered by total quantity (cached view)"""
+    return _sorted_medicines(MED_TOTAL_QTY, ascending, materialize)
+
+@inventory_store.reader
+def sort_medicines_by_packs(ascending=True, materialize=True):
+    """Medicines ordered by packs (cached view)"""
+    return _sorted_medicines(MED_PACKS, ascending, materialize)
+
+@inventory_store.reader
+def sort_equipment_by_name(ascending=True, materialize=True):
+    """Equipment ordered by name (cached view; the array itself keeps its order)"""
+    return _sorted_equipment(EQ_NAME, ascending, materialize)
+
+@inventory_store.reader
+def sort_equipment_by_stock(ascending=True, materialize=True):
+    """Equipment ordered by stock quantity (cached view)"""
+    return _sorted_equipment(EQ_STOCK, ascending, materialize)
+
+@inventory_store.reader
+def sort_equipment_by_status(ascending=True, materialize=True):
+    """Equipment ordered by status (cached view)"""
+    return _sorted_equipment(EQ_STATUS, ascending, materialize)
 
-def sort_medicines_by_expiry(ascending=True):
-    """Sort medicines multidimensional array by expiry date"""
-    global medicines
-    
-    # Sort the 2D array by expiry column
-    medicines.sort(key=lambda row: row[MED_EXPIRY], reverse=not ascending)
-    
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+# -------------------------
+# Lazy Query Pipeline
+# -------------------------
+class Predicate:
+    """Store-independent row test (field, op, argument); combine with &, | and ~, compile() per record type"""
+
+    NULLABLE_FIELDS = ("expiry",)  # None for rows without a valid date
+
+    def __init__(self, field, op, arg):
+        self.field = field
+        self.op = op    # "between" (arg = inclusive (lo, hi), None = open), "eq", "contains",
+        self.arg = arg  # or "and", "or", "not" (arg = child predicates)
+        # record_type -> compiled test. Readers may fill this concurrently without a
+        # lock: the test is a pure function of the predicate, so a race only builds it twice.
+        self._compiled = {}
+
+    def __and__(self, other):
+        return Predicate(None, "and", (self, other))
+
+    def __or__(self, other):
+        return Predicate(None, "or", (self, other))
+
+    def __invert__(self):
+        # Push the negation down to the comparisons, so a comparison on a missing
+        # expiry stays false under not, as in SQL: not expiry >= X skips bad dates
+        if self.op == "and":
+            return functools.reduce(operator.or_, [~child for child in self.arg])
+        if self.op == "or":
+            return functools.reduce(operator.and_, [~child for child in self.arg])
+        if self.op == "not":
+            return self.arg[0]
+        if self.field in self.NULLABLE_FIELDS and self.op == "between" and self.arg != (None, None):
+            lo, hi = self.arg
+            below = None if lo is None else field_between(self.field, None, lo - 1)
+            above = None if hi is None else field_between(self.field, hi + 1, None)
+            return above if below is None else below if above is None else below | above
+        return Predicate(None, "not", (self,))
+
+    def __repr__(self):
+        return f"Predicate({self.field!r}, {self.op!r}, {self.arg!r})"
+
+    def compile(self, record_type):
+        """Return a function row -> bool for rows of record_type's array (built once per record type)"""
+        test = self._compiled.get(record_type)
+        if test is None:
+            test = self._compiled[record_type] = self._build(record_type)
+        return test
+
+    def _build(self, record_type):
+        if self.op in ("and", "or", "not"):
+            tests = [child.compile(record_type) for child in self.arg]
+            if self.op == "not":
+                test = tests[0]
+                return lambda row: not test(row)
+            # Chain the children into nested closures instead of all()/any() over a generator
+            if self.op == "and":
+                return functools.reduce(lambda a, b: lambda row: a(row) and b(row), tests)
+            return functools.reduce(lambda a, b: lambda row: a(row) or b(row), tests)
+
+        if self.field == "expiry":
+            col = MED_EXPIRY_ORD  # compare parsed ordinals, never the strings
+        else:
+            col = record_type.FIELDS[self.field]
+        if self.op == "contains":
+            text = self.arg.casefold()
+            return lambda row: text in row[col].casefold()
+        if self.op == "eq":
+            if isinstance(self.arg, str):
+                value = self.arg.casefold()
+                return lambda row: row[col].casefold() == value
+            value = self.arg
+            return lambda row: row[col] == value
+        lo, hi = self.arg
+        if lo is None and hi is None:
+            return lambda row: row[col] is not None
+        if lo is None:
+            return lambda row: row[col] is not None and row[col] <= hi
+        if hi is None:
+            return lambda row: row[col] is not None and lo <= row[col]
+        return lambda row: row[col] is not None and lo <= row[col] <= hi
+
+def _expiry_bound(value):
+    """Accept a YYYY-MM-DD string, a date or a day ordinal as an expiry bound"""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, date):
+        return value.toordinal()
+    ordinal = parse_expiry(value)
+    if ordinal is None:
+        raise ValueError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+    return ordinal
+
+def field_between(field, lo=None, hi=None):
+    """field between lo and hi, inclusive (None = unbounded)"""
+    return Predicate(field, "between", (lo, hi))
+
+def field_equals(field, value):
+    """field == value (case-insensitive for text)"""
+    return Predicate(field, "eq", value)
+
+def field_contains(field, text):
+    """text occurs in field (case-insensitive)"""
+    return Predicate(field, "contains", text)
+
+def id_equals(row_id):
+    return field_equals("id", row_id)
+
+def name_equals(name):
+    return field_equals("name", name)
+
+def name_contains(text):
+    return field_contains("name", text)
+
+def low_stock(threshold=5):
+    """Medicines with total_qty <= threshold"""
+    return field_between("total_qty", None, threshold)
+
+def packs_between(min_packs, max_packs):
+    return field_between("packs", min_packs, max_packs)
+
+def expiry_between(start=None, end=None):
+    """Medicines expiring between start and end inclusive (strings, dates or ordinals)"""
+    return field_between("expiry", _expiry_bound(start), _expiry_bound(end))
+
+def expiring_before(end):
+    """Medicines expiring strictly before end"""
+    return field_between("expiry", None, _expiry_bound(end) - 1)
+
+def expiring_within(days_ahead=30):
+    """Medicines expiring within days_ahead days from today (including already expired)"""
+    return field_between("expiry", None, (datetime.now() + timedelta(days=days_ahead)).toordinal())
+
+def stock_between(min_stock=None, max_stock=None):
+    """Equipment with min_stock <= stock <= max_stock"""
+    return field_between("stock", min_stock, max_stock)
+
+def status_contains(text):
+    return field_contains("status", text)
 
-def sort_medicines_by_total_qty(ascending=True):
-    """Sort medicines multidimensional array by total quantity"""
-    global medicines
-    
-    # Sort the 2D array by total_qty column
-    medicines.sort(key=lambda row: row[MED_TOTAL_QTY], reverse=not ascending)
-    
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+# -------------------------
+# Query Planner
+# -------------------------
+class AccessPath:
+    """One way to produce candidate rows for a predicate, with its estimated cost (rows touched)"""
+
+    # Per-hit costs in units of one row tested by a full scan, measured on 200k medicines:
+    # fetching a hit through the id dict costs about 10 tested rows, sorting it back into
+    # array order about 10 more. An ordered index path therefore only beats a scan below
+    # ~5% selectivity, an unordered one below ~10%.
+    FETCH_COST = 10
+    REORDER_COST = 10
+
+    def __init__(self, name, predicate, estimate, fetch, exact=True, in_array_order=False, covers=None,
+                 walk_cost=0, fetch_cost=FETCH_COST, setup_cost=0):
+        self.name = name                      # e.g. "expiry index", shown by Query.explain()
+        self.predicate = predicate            # the conjunct this path answers
+        self.covers = covers or (predicate,)  # every conjunct it answers (bitmaps can answer several)
+        self.estimate = estimate              # estimated rows touched (lower is better)
+        self.fetch = fetch                    # callable -> iterable of rows
+        self.exact = exact                    # True if every candidate satisfies predicate
+        self.in_array_order = in_array_order  # True if candidates come in array order
+        self.walk_cost = walk_cost            # per-hit cost of reading the hit off the index
+        self.fetch_cost = fetch_cost          # per-hit cost of producing the row
+        self.setup_cost = setup_cost          # paid once, whatever the number of hits
+
+    def cost(self, ordered=True):
+        """Estimated work in scanned-row units: every hit is fetched, and re-sorted if order matters"""
+        per_hit = self.fetch_cost + self.walk_cost
+        if ordered and not self.in_array_order:
+            per_hit += self.REORDER_COST
+        return self.setup_cost + self.estimate * per_hit
+
+class QueryTarget:
+    """What a Query runs against: the row store and the access paths it offers"""
+
+    def __init__(self, get_rows, record_type, access_paths, bitmap=None):
+        self.get_rows = get_rows          # callable returning the RowStore
+        self.record_type = record_type
+        self.access_paths = access_paths  # list of functions predicate -> AccessPath or None
+        self.bitmap = bitmap              # predicate -> bitset of matching positions, or None
+
+    def rows_for_ids(self, ids):
+        """Look up rows for ids through the store's id dict"""
+        get = self.get_rows().get
+        return [get(row_id) for row_id in ids]
+
+    def in_array_order(self, rows, limit=None):
+        """Sort rows found through an index back into array order (keeping only the first limit)"""
+        return self.get_rows().order.sorted_by_position(rows, limit)
+
+class QueryPlan:
+    """Chosen access path (None = full scan) plus the residual predicates to test per row"""
+
+    def __init__(self, target, path, residual):
+        self.target = target
+        self.path = path
+        self.residual = residual
+
+    def candidates(self):
+        return self.target.get_rows() if self.path is None else self.path.fetch()
+
+    def __str__(self):
+        source = "full scan" if self.path is None else f"{self.path.name} (~{self.path.estimate:g} rows)"
+        if not self.residual:
+            return source
+        return f"{source}, then filter {len(self.residual)} predicate(s)"
+
+def _conjuncts(predicates):
+    """Flatten nested ANDs into a flat list of predicates"""
+    result = []
+    for pred in predicates:
+        if pred.op == "and":
+            result.extend(_conjuncts(pred.arg))
+        else:
+            result.append(pred)
+    return result
 
-def sort_medicines_by_packs(ascending=True):
-    """Sort medicines multidimensional array by packs"""
-    global medicines
-    
-    # Sort the 2D array by packs column
-    medicines.sort(key=lambda row: row[MED_PACKS], reverse=not ascending)
-    
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+def _best_path(target, pred, ordered=True):
+    """Cheapest access path for one predicate; an OR is served by the union of its branches' paths"""
+    best = None
+    for make_path in target.access_paths:
+        path = make_path(pred)
+        if path is not None and (best is None or path.cost(ordered) < best.cost(ordered)):
+            best = path
+    if pred.op == "or":
+        branches = [_best_path(target, child, ordered) for child in pred.arg]
+        if all(branches):
+            union = _union_path(target, pred, branches)
+            if best is None or union.cost(ordered) < best.cost(ordered):
+                best = union
+    return best
+
+def _union_path(target, pred, branches):
+    id_col = target.record_type.FIELDS["id"]
+
+    def fetch():
+        seen = set()
+        for branch in branches:
+            for row in branch.fetch():
+                if row[id_col] not in seen:
+                    seen.add(row[id_col])
+                    yield row
+    return AccessPath(" + ".join(b.name for b in branches), pred, sum(b.estimate for b in branches),
+                      fetch, exact=all(b.exact for b in branches))
+
+def plan_query(target, predicates, ordered=True, limit=None):
+    """Pick the cheapest access path among the AND-ed predicates; the rest become residual filters"""
+    conjuncts = _conjuncts(predicates)
+    best = None if target.bitmap is None else _bitmap_path(target, conjuncts)
+    for pred in conjuncts:
+        path = _best_path(target, pred, ordered)
+        if path is not None and (best is None or path.cost(ordered) < best.cost(ordered)):
+            best = path
+    # A full scan tests every row once, so it costs len(rows) in the same units; under
+    # a limit it stops after about limit / (hits / rows) rows
+    scan_cost = len(target.get_rows())
+    if best is not None and limit is not None and best.estimate > 0:
+        scan_cost = min(scan_cost, limit * scan_cost / best.estimate)
+    if best is None or best.cost(ordered) >= scan_cost:
+        return QueryPlan(target, None, conjuncts)
+    residual = [p for p in conjuncts if not best.exact or not any(p is c for c in best.covers)]
+    return QueryPlan(target, best, residual)
+
+def _bitmap_path(target, conjuncts):
+    """AND together the bitsets of every conjunct the target's bitmaps can answer"""
+    covered = []
+    bits = None
+    for pred in conjuncts:
+        pred_bits = target.bitmap(pred)
+        if pred_bits is not None:
+            covered.append(pred)
+            bits = pred_bits if bits is None else bits & pred_bits
+    if not covered:
+        return None
+    rows = target.get_rows()
+    return AccessPath("bitmap", covered[0], bits.bit_count(),
+                      lambda: [rows[i] for i in bit_positions(bits)],
+                      in_array_order=True, covers=tuple(covered))
+
+# Access paths. Each looks at one conjunct and returns None if it cannot serve it.
+def _id_path(target):
+    def make_path(pred):
+        if pred.field == "id" and pred.op == "eq":
+            return AccessPath("id index", pred, 1,
+                              lambda: [row for row in [target.get_rows().get(pred.arg)] if row is not None])
+        return None
+    return make_path
+
+def _name_path(target, name_index):
+    def make_path(pred):
+        if pred.field == "name" and pred.op == "eq":
+            ids = name_index.ids(pred.arg)
+            return AccessPath("name index", pred, len(ids), lambda: target.rows_for_ids(ids))
+        if pred.field == "name" and pred.op == "contains":
+            pattern = pred.arg
+            name = "trigram index" if len(pattern.casefold()) >= 3 else "name dictionary scan"
+            return AccessPath(name, pred, name_index.estimate_containing(pattern),
+                              lambda: target.rows_for_ids(name_index.ids_containing(pattern)))
+        return None
+    return make_path
+
+def _column_path(target, field, columns, value_index):
+    """Range over a bit-sliced column: selectors for every row, then the hits in array order"""
+    def make_path(pred):
+        if pred.field == field and pred.op == "between":
+            lo, hi = pred.arg
+            rows = target.get_rows()
+            return AccessPath(field + " column", pred, value_index.count_range(lo, hi),
+                              lambda: rows.order.compress(columns.selectors(field, lo, hi)),
+                              in_array_order=True, fetch_cost=columns.HIT_COST,
+                              setup_cost=len(rows) * columns.SCAN_COST)
+        return None
+    return make_path
+
+def _value_path(target, field, value_index):
+    def make_path(pred):
+        if pred.field == field and pred.op == "between":
+            lo, hi = pred.arg
+            return AccessPath(field + " index", pred, value_index.count_range(lo, hi),
+                              lambda: target.rows_for_ids(value_index.range_ids(lo, hi)),
+                              walk_cost=value_index.WALK_COST)
+        return None
+    return make_path
+
+class Query:
+    """Lazy, immutable query over the medicines or equipment array; results come in array order"""
+    # first(), count() and to_list() run under the store's read lock; plain
+    # iteration does not, so consume it before mutating the inventory.
+
+    def __init__(self, target, predicates=(), max_rows=None, fields=None, ordered=True):
+        self.target = target            # QueryTarget: medicine_target or equipment_target
+        self.predicates = tuple(predicates)
+        self.max_rows = max_rows
+        self.fields = fields            # projection: tuple of field names, or None for records
+        self.ordered = ordered
+
+    def _copy(self, **changes):
+        state = dict(target=self.target, predicates=self.predicates, max_rows=self.max_rows,
+                     fields=self.fields, ordered=self.ordered)
+        state.update(changes)
+        return Query(**state)
+
+    def where(self, *predicates):
+        """Keep rows matching every predicate (ANDed with earlier ones)"""
+        return self._copy(predicates=self.predicates + predicates)
+
+    def limit(self, n):
+        """Stop after n matching rows"""
+        return self._copy(max_rows=n if self.max_rows is None else min(n, self.max_rows))
+
+    def select(self, *fields):
+        """Yield tuples of the given fields instead of record views"""
+        return self._copy(fields=fields)
+
+    def unordered(self):
+        """Allow results in index order (skips restoring array order)"""
+        return self._copy(ordered=False)
+
+    def plan(self):
+        return plan_query(self.target, self.predicates, self.ordered, self.max_rows)
+
+    def explain(self):
+        """Describe how the query would run, e.g. "expiry index (~12 rows), then filter 1 predicate(s)" """
+        return str(self.plan())
+
+    def rows(self):
+        """Iterate over the raw matching rows (no record objects are built)"""
+        plan = self.plan()
+        rows = plan.candidates()
+        if plan.residual:
+            tests = [p.compile(self.target.record_type) for p in plan.residual]
+            if len(tests) == 1:
+                rows = filter(tests[0], rows)
+            else:
+                rows = (row for row in rows if all(t(row) for t in tests))
+        if self.ordered and plan.path is not None and not plan.path.in_array_order:
+            rows = self.target.in_array_order(rows, self.max_rows)  # a bounded heap, not a full sort
+        elif self.max_rows is not None:
+            rows = itertools.islice(rows, self.max_rows)
+        return rows
+
+    def __iter__(self):
+        if self.fields is None:
+            return map(self.target.record_type, self.rows())
+        cols = [self.target.record_type.FIELDS[f] for f in self.fields]
+        return (tuple(row[c] for c in cols) for row in self.rows())
+
+    @inventory_store.reader
+    def first(self):
+        """Return the first match or None"""
+        return next(iter(self.limit(1)), None)
+
+    @inventory_store.reader
+    def count(self):
+        """Count matches without building records"""
+        return sum(1 for _ in self.unordered().rows())
+
+    @inventory_store.reader
+    def to_list(self):
+        return list(self)
+
+medicine_target = QueryTarget(lambda: medicines, MedicineRecord, [])
+medicine_target.access_paths += [_id_path(medicine_target), _name_path(medicine_target, medicine_names),
+                                 _value_path(medicine_target, "expiry", medicine_expiry),
+                                 _value_path(medicine_target, "packs", medicine_packs),
+                                 _value_path(medicine_target, "total_qty", medicine_total_qty),
+                                 _column_path(medicine_target, "expiry", medicine_columns, medicine_expiry),
+                                 _column_path(medicine_target, "packs", medicine_columns, medicine_packs),
+                                 _column_path(medicine_target, "total_qty", medicine_columns, medicine_total_qty)]
+def _equipment_bitmap(pred):
+    """Bitset for predicates on status or on a flagged stock threshold, else None"""
+    if pred.op in ("and", "or", "not"):
+        children = [_equipment_bitmap(child) for child in pred.arg]
+        if any(bits is None for bits in children):
+            return None
+        if pred.op == "not":
+            return ~children[0] & equipment_bitmaps.all_bits()
+        combine = int.__and__ if pred.op == "and" else int.__or__
+        return functools.reduce(combine, children)
+    if pred.field == "status" and pred.op == "contains":
+        text = pred.arg.casefold()
+        return equipment_bitmaps.status_matching(lambda status: text in status.casefold())
+    if pred.field == "status" and pred.op == "eq":
+        value = pred.arg.casefold()
+        return equipment_bitmaps.status_matching(lambda status: status.casefold() == value)
+    if pred.field == "stock" and pred.op == "between" and pred.arg[0] is None:
+        for flag, threshold in EquipmentBitmaps.FLAGS.items():
+            if pred.arg[1] == threshold:
+                return equipment_bitmaps.flag_bits[flag]
+    return None
 
-def sort_equipment_by_name(ascending=True):
-    """Sort equipment multidimensional array by name"""
-    global equipment
-    
-    # Sort the 2D array by name column
-    equipment.sort(key=lambda row: row[EQ_NAME].lower(), reverse=not ascending)
-    
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+equipment_target = QueryTarget(lambda: equipment, EquipmentRecord, [], _equipment_bitmap)
+equipment_target.access_paths += [_id_path(equipment_target), _name_path(equipment_target, equipment_names),
+                                  _value_path(equipment_target, "stock", equipment_stock)]
 
-def sort_equipment_by_stock(ascending=True):
-    """Sort equipment multidimensional array by stock quantity"""
-    global equipment
-    
-    # Sort the 2D array by stock column
-    equipment.sort(key=lambda row: row[EQ_STOCK], reverse=not ascending)
-    
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+def query_medicines():
+    """Start a lazy query over all medicines"""
+    return Query(medicine_target)
 
-def sort_equipment_by_status(ascending=True):
-    """Sort equipment multidimensional array by status"""
-    global equipment
-    
-    # Sort the 2D array by status column
-    equipment.sort(key=lambda row: row[EQ_STATUS].lower(), reverse=not ascending)
-    
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+def query_equipment():
+    """Start a lazy query over all equipment"""
+    return Query(equipment_target)
+
+# -------------------------
+# Filter Expressions
+# -------------------------
+# A small language for the filter bar, e.g.
+#     qty <= 5 and expiry < 2026-03-01 and name ~ "amox"
+# Comparisons (<, <=, >, >=, =, !=, ~ for "contains") combine with and, or,
+# not and parentheses. An expression parses into Predicates, so the planner
+# serves it from the indexes and the residual tests compile to closures.
+_FILTER_TOKEN = re.compile(r"""\s*(?:
+    (?P<date>\d{4}-\d{2}-\d{2})
+  | (?P<word>(?=[\w\-./]*[^\W\d])\w[\w\-./]*)  # any run with a letter: 500mg, amox-clav
+  | (?P<number>-?\d+)
+  | "(?P<dstring>[^"]*)" | '(?P<sstring>[^']*)'
+  | (?P<op><=|>=|==|!=|<|>|=|~)
+  | (?P<paren>[()])
+)""", re.VERBOSE)
+
+FILTER_FIELD_ALIASES = {"qty": "total_qty", "quantity": "total_qty", "items": "items_per_pack"}
+TEXT_FIELDS = ("name", "status")
+
+def tokenize_filter(text):
+    """Split a filter expression into (kind, value) tokens"""
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _FILTER_TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError(f"Unexpected character {text[pos:].lstrip()[:1]!r} at position {pos}")
+        kind = match.lastgroup
+        if kind in ("dstring", "sstring"):
+            kind = "string"
+        value = match.group(match.lastgroup)
+        if kind == "word" and value.lower() in ("and", "or", "not"):
+            kind = value = value.lower()
+        tokens.append((kind, value))
+        pos = match.end()
+    return tokens
+
+class FilterParser:
+    """Recursive descent parser from filter tokens to a Predicate for one record type"""
+
+    def __init__(self, tokens, record_type):
+        self.tokens = tokens
+        self.pos = 0
+        self.record_type = record_type
+
+    def peek(self):
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self, kind=None):
+        if self.pos >= len(self.tokens):
+            raise ValueError("Filter expression ends too early")
+        token = self.tokens[self.pos]
+        if kind is not None and token[0] != kind:
+            raise ValueError(f"Expected {kind} but found {token[1]!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Empty filter expression")
+        pred = self.parse_or()
+        if self.pos < len(self.tokens):
+            raise ValueError(f"Unexpected {self.tokens[self.pos][1]!r}")
+        return pred
+
+    def parse_or(self):
+        pred = self.parse_and()
+        while self.peek() == "or":
+            self.take()
+            pred = pred | self.parse_and()
+        return pred
+
+    def parse_and(self):
+        pred = self.parse_not()
+        while self.peek() == "and":
+            self.take()
+            pred = pred & self.parse_not()
+        return pred
+
+    def parse_not(self):
+        if self.peek() == "not":
+            self.take()
+            return ~self.parse_not()
+        if self.peek() == "paren":
+            if self.take()[1] != "(":
+                raise ValueError("Unexpected ')'")
+            pred = self.parse_or()
+            if self.take("paren")[1] != ")":
+                raise ValueError("Expected ')'")
+            return pred
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        word = self.take("word")[1].lower()
+        field = FILTER_FIELD_ALIASES.get(word, word)
+        if field not in self.record_type.FIELDS:
+            raise ValueError(f"Unknown field {word!r}; use one of {', '.join(self.record_type.FIELDS)}")
+        op = self.take("op")[1]
+        kind, value = self.take()
+        if kind not in ("date", "number", "string", "word"):
+            raise ValueError(f"Expected a value after {word} {op}")
+        return comparison_predicate(field, op, value, kind)
+
+def comparison_predicate(field, op, value, kind="string"):
+    """Predicate for "field op value" from a filter expression"""
+    if field in TEXT_FIELDS:
+        if op == "~":
+            return field_contains(field, value)
+        if op in ("=", "=="):
+            return field_equals(field, value)
+        if op == "!=":
+            return ~field_equals(field, value)
+        raise ValueError(f"{field} only supports =, != and ~")
+    if op == "~":
+        raise ValueError(f"~ only applies to text fields ({', '.join(TEXT_FIELDS)})")
+    if field == "expiry":
+        value = _expiry_bound(value)
+    elif kind == "number":
+        value = int(value)
+    else:
+        raise ValueError(f"{field} must be compared with a whole number, not {value!r}")
+    # ids are looked up through the id hash index, other columns through their sorted indexes
+    exact = field_equals(field, value) if field == "id" else field_between(field, value, value)
+    if op in ("=", "=="):
+        return exact
+    if op == "!=":
+        return ~exact
+    if op == "<":
+        return field_between(field, None, value - 1)
+    if op == "<=":
+        return field_between(field, None, value)
+    if op == ">":
+        return field_between(field, value + 1, None)
+    return field_between(field, value, None)
+
+@functools.lru_cache(maxsize=128)
+def compile_filter(text, target):
+    """Parse a filter expression for medicine_target or equipment_target into a Predicate (cached by text)"""
+    return FilterParser(tokenize_filter(text), target.record_type).parse()
 
 # -------------------------
 # Array Filtering Functions
 # -------------------------
+@inventory_store.reader
+@query_cache.cached
 def filter_medicines_by_expiry_range(start_date, end_date):
-    """Filter medicines by expiry date range using multidimensional array"""
-    from datetime import datetime
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        result = []
-        for i in range(len(medicines)):
-            if start <= datetime.strptime(medicines[i][MED_EXPIRY], "%Y-%m-%d") <= end:
-                result.append({
-                    "id": medicines[i][MED_ID],
-                    "name": medicines[i][MED_NAME],
-                    "packs": medicines[i][MED_PACKS],
-                    "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                    "total_qty": medicines[i][MED_TOTAL_QTY],
-                    "expiry": medicines[i][MED_EXPIRY]
-                })
-        return result
-    except ValueError:
+    """Filter medicines by expiry date range (array order), served by the sorted expiry index"""
+    start = parse_expiry(start_date)
+    end = parse_expiry(end_date)
+    if start is None or end is None:
         return []
+    return query_medicines().where(expiry_between(start, end)).to_list()
 
+@inventory_store.reader
+@query_cache.cached
 def filter_medicines_by_low_stock(threshold=5):
-    """Filter medicines with low stock (total_qty <= threshold) using multidimensional array"""
-    result = []
-    for i in range(len(medicines)):
-        if medicines[i][MED_TOTAL_QTY] <= threshold:
-            result.append({
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            })
-    return result
+    """Filter medicines with low stock (total_qty <= threshold) via the total_qty index"""
+    return query_medicines().where(low_stock(threshold)).to_list()
 
+@inventory_store.reader
+@query_cache.cached
 def filter_medicines_by_name_pattern(pattern):
-    """Filter medicines by name pattern (case-insensitive) using multidimensional array"""
-    result = []
-    for i in range(len(medicines)):
-        if pattern.lower() in medicines[i][MED_NAME].lower():
-            result.append({
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            })
-    return result
+    """Filter medicines by name pattern (case-insensitive), served by the trigram index"""
+    return query_medicines().where(name_contains(pattern)).to_list()
+
+@inventory_store.reader
+@query_cache.cached
+def filter_medicines_by_expression(expression):
+    """Filter medicines with a filter expression, e.g. qty <= 5 and expiry < 2026-03-01 and name ~ "amox" """
+    return query_medicines().where(compile_filter(expression.strip(), medicine_target)).to_list()
 
+@inventory_store.reader
 def get_medicines_slice(start, end):
-    """Get a slice of medicines multidimensional array using slicing operation"""
-    result = []
-    for i in range(start, min(end, len(medicines))):
-        result.append({
-            "id": medicines[i][MED_ID],
-            "name": medicines[i][MED_NAME],
-            "packs": medicines[i][MED_PACKS],
-            "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-            "total_qty": medicines[i][MED_TOTAL_QTY],
-            "expiry": medicines[i][MED_EXPIRY]
-        })
-    return result
+    """Get a slice of medicines multidimensional array as record views (rows are not copied)"""
+    return [MedicineRecord(row) for row in medicines[start:end]]
 
+@inventory_store.reader
+@query_cache.cached
 def filter_medicines_by_packs_range(min_packs, max_packs):
-    """Filter medicines by packs range using multidimensional array"""
-    result = []
-    for i in range(len(medicines)):
-        if min_packs <= medicines[i][MED_PACKS] <= max_packs:
-            result.append({
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            })
-    return result
+    """Filter medicines by packs range via the packs index"""
+    return query_medicines().where(packs_between(min_packs, max_packs)).to_list()
 
+@inventory_store.reader
+@query_cache.cached
 def filter_equipment_by_stock_level(threshold, above=True):
-    """Filter equipment by stock level using multidimensional array"""
-    result = []
-    for i in range(len(equipment)):
-        if above and equipment[i][EQ_STOCK] >= threshold:
-            result.append({
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            })
-        elif not above and equipment[i][EQ_STOCK] <= threshold:
-            result.append({
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            })
-    return result
+    """Filter equipment by stock level, served by the stock index"""
+    if above:
+        return query_equipment().where(stock_between(threshold, None)).to_list()
+    return query_equipment().where(stock_between(None, threshold)).to_list()
 
+@inventory_store.reader
+@query_cache.cached
 def filter_equipment_by_status_pattern(pattern):
-    """Filter equipment by status pattern (case-insensitive) using multidimensional array"""
-    result = []
-    for i in range(len(equipment)):
-        if pattern.lower() in equipment[i][EQ_STATUS].lower():
-            result.append({
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            })
-    return result
+    """Filter equipment by status pattern (case-insensitive), answered from the status bitmaps"""
+    return query_equipment().where(status_contains(pattern)).to_list()
 
+@inventory_store.reader
+@query_cache.cached
 def filter_equipment_by_name_pattern(pattern):
-    """Filter equipment by name pattern (case-insensitive) using multidimensional array"""
-    result = []
-    for i in range(len(equipment)):
-        if pattern.lower() in equipment[i][EQ_NAME].lower():
-            result.append({
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            })
-    return result
-
+    """Filter equipment by name pattern (case-insensitive), served by the trigram index"""
+    return query_equipment().where(name_contains(pattern)).to_list()
+
+@inventory_store.reader
+@query_cache.cached
+def filter_equipment_by_keyword(pattern):
+    """Filter equipment whose name or status contains pattern (case-insensitive)"""
+    return query_equipment().where(name_contains(pattern) | status_contains(pattern)).to_list()
+
+@inventory_store.reader
+@query_cache.cached
+def filter_equipment_by_expression(expression):
+    """Filter equipment with a filter expression, e.g. stock <= 3 and status ~ "repair" """
+    return query_equipment().where(compile_filter(expression.strip(), equipment_target)).to_list()
+
+@inventory_store.reader
 def get_equipment_slice(start, end):
-    """Get a slice of equipment multidimensional array using slicing operation"""
-    result = []
-    for i in range(start, min(end, len(equipment))):
-        result.append({
-            "id": equipment[i][EQ_ID],
-            "name": equipment[i][EQ_NAME],
-            "stock": equipment[i][EQ_STOCK],
-            "status": equipment[i][EQ_STATUS]
-        })
-    return result
+    """Get a slice of equipment multidimensional array as record views (rows are not copied)"""
+    return [EquipmentRecord(row) for row in equipment[start:end]]
 
+@inventory_store.reader
+@query_cache.cached
 def filter_equipment_by_stock_range(min_stock, max_stock):
-    """Filter equipment by stock range using multidimensional array"""
-    result = []
-    for i in range(len(equipment)):
-        if min_stock <= equipment[i][EQ_STOCK] <= max_stock:
-            result.append({
-                "id": equipment[i][EQ_ID],
-                "name": equipment[i][EQ_NAME],
-                "stock": equipment[i][EQ_STOCK],
-                "status": equipment[i][EQ_STATUS]
-            })
-    return result
+    """Filter equipment by stock range, served by the stock index"""
+    return query_equipment().where(stock_between(min_stock, max_stock)).to_list()
 
 # -------------------------
 # Advanced Array Operations
 # -------------------------
+@inventory_store.reader
 def get_medicines_sorted_by_expiry():
-    """Get medicines sorted by expiry date (earliest first)"""
-    return sort_medicines_by_expiry(ascending=True)
-
+    """Get medicines sorted by expiry date (earliest first), read off the expiry index without reordering the array"""
+    dated = [MedicineRecord(medicines.get(row_id)) for row_id in medicine_expiry.range_ids()]
+    undated = [MedicineRecord(row) for row in medicines if row[MED_EXPIRY_ORD] is None]
+    return dated + undated
+
+@inventory_store.reader
+def get_next_expiring_medicines(count=5):
+    """Get the next count medicines to expire, soonest first (already expired lots included)"""
+    return [MedicineRecord(medicines.get(row_id)) for row_id in medicine_expiry.first_ids(count)]
+
+@inventory_store.reader
+def get_soonest_lot(name):
+    """Get the lot of medicine name that expires first (first-expiry-first-out), or None"""
+    row_id = medicine_lots.soonest(name)
+    return None if row_id is None else MedicineRecord(medicines.get(row_id))
+
+@inventory_store.writer
+def dispense_soonest_lot(name):
+    """Remove and return the lot of medicine name that expires first, or None"""
+    row_id = medicine_lots.soonest(name)
+    return None if row_id is None else remove_medicine_by_id(row_id)
+
+@inventory_store.reader
 def get_equipment_sorted_by_stock():
     """Get equipment sorted by stock quantity (highest first)"""
     return sort_equipment_by_stock(ascending=False)
 
+@inventory_store.reader
 def get_low_stock_medicines(threshold=5):
     """Get all medicines with low stock"""
     return filter_medicines_by_low_stock(threshold)
 
+@inventory_store.reader
 def get_low_stock_equipment(threshold=3):
     """Get all equipment with low stock"""
     return filter_equipment_by_stock_level(threshold, above=False)
 
+@inventory_store.reader
+@query_cache.cached
+def get_low_stock_equipment_by_status(pattern, threshold=3):
+    """Low-stock equipment whose status contains pattern (one bitwise AND at the default threshold)"""
+    return query_equipment().where(status_contains(pattern), stock_between(None, threshold)).to_list()
+
+@inventory_store.reader
+@query_cache.cached
+def get_critical_equipment_ids():
+    """Ids of equipment at or under the table's highlight threshold, read off the flag bitset"""
+    return {equipment[i][EQ_ID] for i in bit_positions(equipment_bitmaps.flag_bits["critical"])}
+
+@inventory_store.reader
+def get_expiring_low_stock_medicines(days_ahead=30, threshold=5):
+    """Medicines expiring within days_ahead days AND with total_qty <= threshold, in one planned pass"""
+    return query_medicines().where(expiring_within(days_ahead), low_stock(threshold)).to_list()
+
+@inventory_store.reader
 def get_expiring_medicines(days_ahead=30):
-    """Get medicines expiring within specified days using multidimensional array"""
-    from datetime import datetime, timedelta
-    cutoff_date = datetime.now() + timedelta(days=days_ahead)
-    result = []
-    for i in range(len(medicines)):
-        if datetime.strptime(medicines[i][MED_EXPIRY], "%Y-%m-%d") <= cutoff_date:
-            result.append({
-                "id": medicines[i][MED_ID],
-                "name": medicines[i][MED_NAME],
-                "packs": medicines[i][MED_PACKS],
-                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                "total_qty": medicines[i][MED_TOTAL_QTY],
-                "expiry": medicines[i][MED_EXPIRY]
-            })
-    return result
+    """Get medicines expiring within specified days (array order; a prefix of the sorted expiry index)"""
+    return query_medicines().where(expiring_within(days_ahead)).to_list()
 
+@inventory_store.reader
 def get_medicines_by_name_search(search_term):
     """Search medicines by name (case-insensitive partial match)"""
     return filter_medicines_by_name_pattern(search_term)
 
+@inventory_store.reader
 def get_equipment_by_name_search(search_term):
     """Search equipment by name (case-insensitive partial match)"""
     return filter_equipment_by_name_pattern(search_term)
 
+@inventory_store.reader
 def find_medicine_index_by_id(medicine_id):
-    """Find the index of a medicine by its ID using multidimensional array operations (internal utility)"""
-    for i in range(len(medicines)):
-        if medicines[i][MED_ID] == medicine_id:
-            return i
-    return -1 # Not found
-
+    """Find the index of a medicine by its ID using the id hash index (internal utility)"""
+    return medicines.position(medicine_id)  # -1 if not found
+
+@inventory_store.reader
+def suggest_medicine_names(prefix, limit=10):
+    """Type-ahead: up to limit distinct medicine names starting with prefix"""
+    return medicine_names.prefixes.complete(prefix, limit)
+
+@inventory_store.reader
+def suggest_equipment_names(prefix, limit=10):
+    """Type-ahead: up to limit distinct equipment names starting with prefix"""
+    return equipment_names.prefixes.complete(prefix, limit)
+
+@inventory_store.reader
+def suggest_similar_medicine_names(name, max_distance=2, limit=5):
+    """Did-you-mean: medicine names within max_distance typos of name, closest first"""
+    return medicine_names.similar_names(name, max_distance, limit)
+
+@inventory_store.reader
+def suggest_similar_equipment_names(name, max_distance=2, limit=5):
+    """Did-you-mean: equipment names within max_distance typos of name, closest first"""
+    return equipment_names.similar_names(name, max_distance, limit)
+
+@inventory_store.reader
+def find_medicine_by_name_fuzzy(name, max_distance=2):
+    """Like find_medicine_by_name, but falls back to the closest name within max_distance typos"""
+    found = find_medicine_by_name(name)
+    if found is None:
+        similar = suggest_similar_medicine_names(name, max_distance, limit=1)
+        if similar:
+            found = find_medicine_by_name(similar[0])
+    return found
+
+@inventory_store.reader
+def find_equipment_by_name_fuzzy(name, max_distance=2):
+    """Like find_equipment_by_name, but falls back to the closest name within max_distance typos"""
+    found = find_equipment_by_name(name)
+    if found is None:
+        similar = suggest_similar_equipment_names(name, max_distance, limit=1)
+        if similar:
+            found = find_equipment_by_name(similar[0])
+    return found
+
+@inventory_store.reader
 def count_medicines_by_name(name):
-    """Count occurrences of a medicine name using multidimensional array operations (internal utility)"""
-    count = 0
-    for i in range(len(medicines)):
-        if medicines[i][MED_NAME].lower() == name.lower():
-            count += 1
-    return count
+    """Count occurrences of a medicine name using the name index (internal utility)"""
+    return medicine_names.count(name)
 
+@inventory_store.reader
 def find_equipment_index_by_id(eq_id):
-    """Find the index of an equipment by its ID using multidimensional array operations (internal utility)"""
-    for i in range(len(equipment)):
-        if equipment[i][EQ_ID] == eq_id:
-            return i
-    return -1 # Not found
+    """Find the index of an equipment by its ID using the id hash index (internal utility)"""
+    return equipment.position(eq_id)  # -1 if not found
 
+@inventory_store.reader
 def count_equipment_by_name(name):
-    """Count occurrences of an equipment name using multidimensional array operations (internal utility)"""
-    count = 0
-    for i in range(len(equipment)):
-        if equipment[i][EQ_NAME].lower() == name.lower():
-            count += 1
-    return count
+    """Count occurrences of an equipment name using the name index (internal utility)"""
+    return equipment_names.count(name)
+
+def roll_expiry_window(today=None):
+    """Move the expiring-soon counter to today's window; takes the write lock only when the day changed"""
+    today = today or date.today()
+    if inventory_stats.window_end != inventory_stats.window_end_on(today):
+        with inventory_store.write():  # a writer, so readers never adjust the counters
+            inventory_stats.roll_expiry_window(today)
 
+@inventory_store.reader
 def get_array_statistics():
-    """Get statistics about the multidimensional arrays"""
-    med_count = len(medicines)
-    eq_count = len(equipment)
-    low_stock_med = len(get_low_stock_medicines())
-    low_stock_eq = len(get_low_stock_equipment())
-    expiring_med = len(get_expiring_medicines())
-    
+    """Get statistics about the multidimensional arrays (O(1): read from the running counters)"""
     return {
-        "medicines_count": med_count,
-        "equipment_count": eq_count,
-        "low_stock_medicines": low_stock_med,
-        "low_stock_equipment": low_stock_eq,
-        "expiring_medicines": expiring_med
+        "medicines_count": len(medicines),
+        "equipment_count": len(equipment),
+        "low_stock_medicines": inventory_stats.low_stock_medicines,
+        "low_stock_equipment": inventory_stats.low_stock_equipment,
+        "expiring_medicines": inventory_stats.expiring_medicines,
+        "equipment_by_status": dict(inventory_stats.status_counts),
+        "query_cache": query_cache.info()
     }
 
 
@@ -702,6 +3314,10 @@ class ClinicInventoryApp(ctk.CTk):
         self.selected_medicine_id = None
         self.selected_equipment_id = None
 
+        # Active table sort as (sort function, ascending); None shows array order
+        self.med_sort = None
+        self.eq_sort = None
+
         # Initialize a deque for a fixed-size transaction log (Queue Data Structure)
         # collections.deque is chosen over a list for queues because it provides O(1) complexity
         # for append and popleft operations, which are essential for efficient queue management.
@@ -714,8 +3330,16 @@ class ClinicInventoryApp(ctk.CTk):
         
         self.create_ui()
         self.load_all_tables()
+        add_change_listener(self.on_inventory_changed)
         self.log_transaction("Application started.")
 
+    def on_inventory_changed(self, kind):
+        """Reloads the affected table once after a bulk operation (scheduled onto the Tk thread)"""
+        if kind == "medicines":
+            self.after(0, self.load_medicines_table)
+        else:
+            self.after(0, self.load_equipment_table)
+
     def log_transaction(self, message):
         """Logs a transaction message to the deque-based transaction log (Queue)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -724,6 +3348,12 @@ class ClinicInventoryApp(ctk.CTk):
 
     # ---------- UI ----------
     def create_ui(self):
+        # Dashboard header: live counters, refreshed with the clock
+        header_frame = ctk.CTkFrame(self)
+        header_frame.pack(fill="x", padx=10, pady=(10, 0))
+        self.stats_label = ctk.CTkLabel(header_frame, text="", font=("Arial", 12))
+        self.stats_label.pack(side="left", padx=5, pady=5)
+
         # Top area: tabs
         tabview = ctk.CTkTabview(self, width=980, height=580)
         tabview.pack(fill="both", expand=True, padx=10, pady=(10, 5))
@@ -759,6 +3389,7 @@ class ClinicInventoryApp(ctk.CTk):
         ctk.CTkLabel(frm, text="Name").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.med_name = ctk.CTkEntry(frm, width=240, placeholder_text="Medicine name")
         self.med_name.grid(row=1, column=0, padx=5, pady=5)
+        self.attach_name_completion(self.med_name, suggest_medicine_names)
 
         # Packs
         ctk.CTkLabel(frm, text="Packs").grid(row=0, column=1, padx=5, pady=5, sticky="w")
@@ -834,7 +3465,7 @@ class ClinicInventoryApp(ctk.CTk):
         # Filter Controls
         ctk.CTkLabel(sort_filter_frm, text="Filter:").pack(side="left", padx=(20, 5), pady=5)
         self.med_filter_type = ctk.StringVar(value="name")
-        med_filter_combo = ctk.CTkComboBox(sort_filter_frm, values=["name", "low_stock", "expiry_range", "packs_range"], 
+        med_filter_combo = ctk.CTkComboBox(sort_filter_frm, values=["name", "low_stock", "expiry_range", "packs_range", "expression"], 
                                           variable=self.med_filter_type, width=120)
         med_filter_combo.pack(side="left", padx=5, pady=5)
         
@@ -850,6 +3481,7 @@ class ClinicInventoryApp(ctk.CTk):
         self.med_search = ctk.CTkEntry(searchfrm, placeholder_text="Search medicines by name")
         self.med_search.pack(side="left", padx=6, pady=6, fill="x", expand=True)
         ctk.CTkButton(searchfrm, text="🔍 Search", width=100, command=self.search_medicines).pack(side="left", padx=6)
+        self.attach_name_completion(self.med_search, suggest_medicine_names, on_pick=self.search_medicines)
         ctk.CTkButton(searchfrm, text="⟳ Reset", width=80, command=self.load_medicines_table).pack(side="left", padx=6)
 
         # Table
@@ -889,6 +3521,7 @@ class ClinicInventoryApp(ctk.CTk):
         ctk.CTkLabel(frm, text="Name").grid(row=0, column=0, padx=5, pady=5, sticky="w")
         self.eq_name = ctk.CTkEntry(frm, width=320, placeholder_text="Equipment name")
         self.eq_name.grid(row=1, column=0, padx=5, pady=5)
+        self.attach_name_completion(self.eq_name, suggest_equipment_names)
 
         # Quantity
         ctk.CTkLabel(frm, text="Quantity").grid(row=0, column=1, padx=5, pady=5, sticky="w")
@@ -957,7 +3590,7 @@ class ClinicInventoryApp(ctk.CTk):
         # Filter Controls
         ctk.CTkLabel(sort_filter_frm, text="Filter:").pack(side="left", padx=(20, 5), pady=5)
         self.eq_filter_type = ctk.StringVar(value="name")
-        eq_filter_combo = ctk.CTkComboBox(sort_filter_frm, values=["name", "status", "stock_level", "stock_range"], 
+        eq_filter_combo = ctk.CTkComboBox(sort_filter_frm, values=["name", "status", "stock_level", "stock_range", "expression"], 
                                          variable=self.eq_filter_type, width=120)
         eq_filter_combo.pack(side="left", padx=5, pady=5)
         
@@ -973,6 +3606,7 @@ class ClinicInventoryApp(ctk.CTk):
         self.eq_search = ctk.CTkEntry(searchfrm, placeholder_text="Search equipment by name or description")
         self.eq_search.pack(side="left", padx=6, pady=6, fill="x", expand=True)
         ctk.CTkButton(searchfrm, text="🔍 Search", width=100, command=self.search_equipment).pack(side="left", padx=6)
+        self.attach_name_completion(self.eq_search, suggest_equipment_names, on_pick=self.search_equipment)
         ctk.CTkButton(searchfrm, text="⟳ Reset", width=80, command=self.load_equipment_table).pack(side="left", padx=6)
 
         # Table
@@ -1001,6 +3635,49 @@ class ClinicInventoryApp(ctk.CTk):
 
 
 
+    # ---------- NAME COMPLETION ----------
+    def attach_name_completion(self, entry, suggest, on_pick=None, limit=8):
+        """Show type-ahead name suggestions under entry, refreshed on every keystroke"""
+        listbox = tk.Listbox(self, height=0, activestyle="none", exportselection=False)
+
+        def refresh(event):
+            if event.keysym in ("Down", "Up", "Return", "Escape", "Tab"):
+                return
+            text = entry.get().strip()
+            names = suggest(text, limit) if text else []
+            if not names:
+                listbox.place_forget()
+                return
+            listbox.delete(0, "end")
+            for name in names:
+                listbox.insert("end", name)
+            listbox.configure(height=len(names))
+            listbox.place(in_=entry, x=0, rely=1.0, relwidth=1.0)
+            listbox.lift()
+
+        def pick(event=None):
+            selection = listbox.curselection()
+            if selection:
+                entry.delete(0, "end")
+                entry.insert(0, listbox.get(selection[0]))
+                entry.focus_set()
+            listbox.place_forget()
+            if selection and on_pick is not None:
+                on_pick()
+
+        def focus_list(event):
+            if listbox.winfo_ismapped():
+                listbox.focus_set()
+                listbox.selection_clear(0, "end")
+                listbox.selection_set(0)
+
+        entry.bind("<KeyRelease>", refresh, add=True)
+        entry.bind("<Down>", focus_list, add=True)
+        entry.bind("<Escape>", lambda event: listbox.place_forget(), add=True)
+        listbox.bind("<ButtonRelease-1>", pick)
+        listbox.bind("<Return>", pick)
+        listbox.bind("<Escape>", lambda event: (listbox.place_forget(), entry.focus_set()))
+
     # ---------- LOAD & DISPLAY ----------
     def load_all_tables(self):
         self.load_medicines_table()
@@ -1009,16 +3686,24 @@ class ClinicInventoryApp(ctk.CTk):
     def load_medicines_table(self):
         for row in self.med_tree.get_children():
             self.med_tree.delete(row)
-        rows = fetch_medicines()
+        if self.med_sort is None:
+            rows = fetch_medicines()
+        else:
+            sort_function, ascending = self.med_sort
+            rows = sort_function(ascending, materialize=False)
         for r in rows:
-            rid, name, packs, items_per_pack, total_qty, expiry = r
+            rid, name, packs, items_per_pack, total_qty, expiry = r[:MED_EXPIRY_ORD]
             self.med_tree.insert("", "end", values=(rid, name, packs, items_per_pack, total_qty, expiry))
         self.highlight_med_low_stock()
 
     def load_equipment_table(self):
         for row in self.eq_tree.get_children():
             self.eq_tree.delete(row)
-        rows = fetch_equipment()
+        if self.eq_sort is None:
+            rows = fetch_equipment()
+        else:
+            sort_function, ascending = self.eq_sort
+            rows = sort_function(ascending, materialize=False)
         for r in rows:
             rid, name, quantity, description = r
             self.eq_tree.insert("", "end", values=(rid, name, quantity, description))
@@ -1037,10 +3722,10 @@ class ClinicInventoryApp(ctk.CTk):
                 self.med_tree.item(item, tags=())
 
     def highlight_eq_low_stock(self):
+        critical_ids = get_critical_equipment_ids()
         for item in self.eq_tree.get_children():
             vals = self.eq_tree.item(item, "values")
-            quantity = int(vals[2])
-            if quantity <= 2:
+            if int(vals[0]) in critical_ids:
                 self.eq_tree.item(item, tags=("low",))
             else:
                 self.eq_tree.item(item, tags=())
@@ -1062,11 +3747,7 @@ class ClinicInventoryApp(ctk.CTk):
         return total
 
     def validate_date(self, date_text):
-        try:
-            datetime.strptime(date_text, "%Y-%m-%d")
-            return True
-        except Exception:
-            return False
+        return parse_expiry(date_text) is not None
 
     def add_medicine(self):
         name = self.med_name.get().strip()
@@ -1080,7 +3761,8 @@ class ClinicInventoryApp(ctk.CTk):
         if not packs.isdigit() or not ipp.isdigit():
             messagebox.showerror("Error", "Packs and Items/Pack must be integers.")
             return
-        if not self.validate_date(expiry):
+        expiry_ord = parse_expiry(expiry)  # parsed once and handed to the array functions
+        if expiry_ord is None:
             messagebox.showerror("Error", "Expiry date must be in YYYY-MM-DD format.")
             return
 
@@ -1088,7 +3770,7 @@ class ClinicInventoryApp(ctk.CTk):
         ipp_i = int(ipp)
         total = packs_i * ipp_i
 
-        add_medicine(name, packs_i, ipp_i, total, expiry)  # Using list append operation
+        add_medicine(name, packs_i, ipp_i, total, expiry, expiry_ord)  # Using list append operation
         self.load_medicines_table()
         self.clear_med_entries()
         self.log_transaction(f"Added medicine: {name}")
@@ -1121,13 +3803,14 @@ class ClinicInventoryApp(ctk.CTk):
         if not q:
             messagebox.showinfo("Info", "Enter search keywords.")
             return
-        rows = fetch_medicines()
-        filtered = [r for r in rows if q in r[1].lower()]
-        for row in self.med_tree.get_children():
-            self.med_tree.delete(row)
-        for r in filtered:
-            self.med_tree.insert("", "end", values=r)
-        self.highlight_med_low_stock()
+        results = filter_medicines_by_name_pattern(q)
+        if not results:
+            similar = suggest_similar_medicine_names(q, limit=1)
+            if similar and messagebox.askyesno("No Matches", f"No medicines match '{q}'.\nDid you mean '{similar[0]}'?"):
+                self.med_search.delete(0, "end")
+                self.med_search.insert(0, similar[0])
+                results = filter_medicines_by_name_pattern(similar[0])
+        self.display_filtered_medicines(results)
 
     def clear_med_entries(self):
         self.med_name.delete(0, "end")
@@ -1177,13 +3860,14 @@ class ClinicInventoryApp(ctk.CTk):
         if not q:
             messagebox.showinfo("Info", "Enter search keywords.")
             return
-        rows = fetch_equipment()
-        filtered = [r for r in rows if q in r[1].lower() or (r[3] and q in r[3].lower())]
-        for row in self.eq_tree.get_children():
-            self.eq_tree.delete(row)
-        for r in filtered:
-            self.eq_tree.insert("", "end", values=r)
-        self.highlight_eq_low_stock()
+        results = filter_equipment_by_keyword(q)
+        if not results:
+            similar = suggest_similar_equipment_names(q, limit=1)
+            if similar and messagebox.askyesno("No Matches", f"No equipment matches '{q}'.\nDid you mean '{similar[0]}'?"):
+                self.eq_search.delete(0, "end")
+                self.eq_search.insert(0, similar[0])
+                results = filter_equipment_by_name_pattern(similar[0])
+        self.display_filtered_equipment(results)
 
     def clear_eq_entries(self):
         self.eq_name.delete(0, "end")
@@ -1197,14 +3881,15 @@ class ClinicInventoryApp(ctk.CTk):
         sort_by = self.med_sort_var.get()
         ascending = self.med_sort_order.get() == "asc"
         
+        # The table keeps showing this order; the array itself is never reordered
         if sort_by == "name":
-            sort_medicines_by_name(ascending)
+            self.med_sort = (sort_medicines_by_name, ascending)
         elif sort_by == "expiry":
-            sort_medicines_by_expiry(ascending)
+            self.med_sort = (sort_medicines_by_expiry, ascending)
         elif sort_by == "total_qty":
-            sort_medicines_by_total_qty(ascending)
+            self.med_sort = (sort_medicines_by_total_qty, ascending)
         elif sort_by == "packs":
-            sort_medicines_by_packs(ascending)
+            self.med_sort = (sort_medicines_by_packs, ascending)
         
         self.load_medicines_table()
         messagebox.showinfo("Sort Complete", f"Medicines sorted by {sort_by} ({'ascending' if ascending else 'descending'})")
@@ -1214,12 +3899,13 @@ class ClinicInventoryApp(ctk.CTk):
         sort_by = self.eq_sort_var.get()
         ascending = self.eq_sort_order.get() == "asc"
         
+        # The table keeps showing this order; the array itself is never reordered
         if sort_by == "name":
-            sort_equipment_by_name(ascending)
+            self.eq_sort = (sort_equipment_by_name, ascending)
         elif sort_by == "stock":
-            sort_equipment_by_stock(ascending)
+            self.eq_sort = (sort_equipment_by_stock, ascending)
         elif sort_by == "status":
-            sort_equipment_by_status(ascending)
+            self.eq_sort = (sort_equipment_by_status, ascending)
         
         self.load_equipment_table()
         messagebox.showinfo("Sort Complete", f"Equipment sorted by {sort_by} ({'ascending' if ascending else 'descending'})")
@@ -1261,6 +3947,13 @@ class ClinicInventoryApp(ctk.CTk):
             except ValueError:
                 messagebox.showerror("Error", "Packs range format: min,max (e.g., 1,10)")
                 return
+        elif filter_type == "expression":
+            # e.g. qty <= 5 and expiry < 2026-03-01 and name ~ "amox"
+            try:
+                filtered_medicines = filter_medicines_by_expression(filter_value)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid filter expression: {e}")
+                return
         
         # Display filtered results
         self.display_filtered_medicines(filtered_medicines)
@@ -1303,6 +3996,13 @@ class ClinicInventoryApp(ctk.CTk):
             except ValueError:
                 messagebox.showerror("Error", "Stock range format: min,max (e.g., 1,10)")
                 return
+        elif filter_type == "expression":
+            # e.g. stock <= 3 and status ~ "repair"
+            try:
+                filtered_equipment = filter_equipment_by_expression(filter_value)
+            except ValueError as e:
+                messagebox.showerror("Error", f"Invalid filter expression: {e}")
+                return
         
         # Display filtered results
         self.display_filtered_equipment(filtered_equipment)
@@ -1386,7 +4086,8 @@ class ClinicInventoryApp(ctk.CTk):
         if not packs.isdigit() or not ipp.isdigit():
             messagebox.showerror("Error", "Packs and Items/Pack must be integers.")
             return
-        if not self.validate_date(expiry):
+        expiry_ord = parse_expiry(expiry)  # parsed once and handed to the array functions
+        if expiry_ord is None:
             messagebox.showerror("Error", "Expiry date must be in YYYY-MM-DD format.")
             return
 
@@ -1394,7 +4095,7 @@ class ClinicInventoryApp(ctk.CTk):
         ipp_i = int(ipp)
         total = packs_i * ipp_i
 
-        insert_medicine_at_position(0, name, packs_i, ipp_i, total, expiry) # Using list insert(0, item) operation
+        insert_medicine_at_position(0, name, packs_i, ipp_i, total, expiry, expiry_ord) # Using list insert(0, item) operation
         self.load_medicines_table()
         self.clear_med_entries()
         messagebox.showinfo("Insert Complete", "Medicine inserted at the beginning of the list.")
@@ -1464,17 +4165,10 @@ class ClinicInventoryApp(ctk.CTk):
 
         last_index = len(medicines) - 1
         # Store data before removal
-        removed_data = {
-            "id": medicines[last_index][MED_ID],
-            "name": medicines[last_index][MED_NAME],
-            "packs": medicines[last_index][MED_PACKS],
-            "items_per_pack": medicines[last_index][MED_ITEMS_PER_PACK],
-            "total_qty": medicines[last_index][MED_TOTAL_QTY],
-            "expiry": medicines[last_index][MED_EXPIRY]
-        }
+        removed_data = MedicineRecord(medicines[last_index])
         
-        # Remove entire row from 2D array
-        medicines.pop()
+        # Remove entire row from 2D array (through the API so the id index stays in sync)
+        remove_medicine_by_id(removed_data["id"])
         
         self.load_medicines_table()
         messagebox.showinfo("Remove Last Medicine", 
@@ -1495,15 +4189,10 @@ class ClinicInventoryApp(ctk.CTk):
 
         last_index = len(equipment) - 1
         # Store data before removal
-        removed_data = {
-            "id": equipment[last_index][EQ_ID],
-            "name": equipment[last_index][EQ_NAME],
-            "stock": equipment[last_index][EQ_STOCK],
-            "status": equipment[last_index][EQ_STATUS]
-        }
+        removed_data = EquipmentRecord(equipment[last_index])
         
-        # Remove entire row from 2D array
-        equipment.pop()
+        # Remove entire row from 2D array (through the API so the id index stays in sync)
+        remove_equipment_by_id(removed_data["id"])
         
         self.load_equipment_table()
         messagebox.showinfo("Remove Last Equipment", 
@@ -1562,8 +4251,18 @@ class ClinicInventoryApp(ctk.CTk):
         """Updates the time label in the top right corner"""
         current_time = datetime.now().strftime("%H:%M:%S")
         self.time_label.configure(text=f"Time: {current_time}")
+        self.update_stats_header()
         self.after(1000, self.update_time) # Update every second
 
+    def update_stats_header(self):
+        """Shows the running inventory counters in the dashboard header"""
+        roll_expiry_window()  # before the read lock: the roll is a write
+        stats = get_array_statistics()
+        self.stats_label.configure(text=(
+            f"Medicines: {stats['medicines_count']}  |  Low stock: {stats['low_stock_medicines']}  |  "
+            f"Expiring in {InventoryStats.EXPIRY_WINDOW_DAYS} days: {stats['expiring_medicines']}  |  "
+            f"Equipment: {stats['equipment_count']}  |  Low stock: {stats['low_stock_equipment']}"))
+
     def update_medicine_ui(self):
         """Handles the update medicine button click event."""
         if self.selected_medicine_id is None:
@@ -1581,7 +4280,8 @@ class ClinicInventoryApp(ctk.CTk):
         if not packs.isdigit() or not ipp.isdigit():
             messagebox.showerror("Error", "Packs and Items/Pack must be integers.")
             return
-        if not self.validate_date(expiry):
+        expiry_ord = parse_expiry(expiry)  # parsed once and handed to the array functions
+        if expiry_ord is None:
             messagebox.showerror("Error", "Expiry date must be in YYYY-MM-DD format.")
             return
 
@@ -1589,7 +4289,7 @@ class ClinicInventoryApp(ctk.CTk):
         ipp_i = int(ipp)
         total = packs_i * ipp_i
 
-        if update_medicine(self.selected_medicine_id, name, packs_i, ipp_i, total, expiry):
+        if update_medicine(self.selected_medicine_id, name, packs_i, ipp_i, total, expiry, expiry_ord):
             messagebox.showinfo("Update Complete", f"Medicine ID {self.selected_medicine_id} updated successfully.")
             self.load_medicines_table()
             self.clear_med_entries()
@@ -1,5 +1,5 @@
 # clinic_inventory_list.py - Using Basic List Data Structures
-from datetime import datetime
+from datetime import date, datetime, timedelta
 import customtkinter as ctk
 from tkinter import ttk, messagebox
 import collections
@@ -12,7 +12,7 @@ ctk.set_default_color_theme("blue")
 
 # Using Multidimensional Array Data Structures for storing inventory data
 # Each row represents a record, each column represents a field
-# medicines[row][column] where columns are: [id, name, packs, items_per_pack, total_qty, expiry]
+# medicines[row][column] where columns are: [id, name, packs, items_per_pack, total_qty, expiry, expiry_ord]
 medicines = []  # 2D array: medicines[row][0]=id, medicines[row][1]=name, etc.
 
 # equipment[row][column] where columns are: [id, name, stock, status]  
@@ -25,6 +25,7 @@ MED_PACKS = 2
 MED_ITEMS_PER_PACK = 3
 MED_TOTAL_QTY = 4
 MED_EXPIRY = 5
+MED_EXPIRY_ORD = 6  # expiry parsed once into a day ordinal (None if not a valid date)
 
 # Column indices for equipment array
 EQ_ID = 0
@@ -32,17 +33,44 @@ EQ_NAME = 1
 EQ_STOCK = 2
 EQ_STATUS = 3
 
+def parse_expiry(expiry):
+    """Parse a YYYY-MM-DD string into a day ordinal, or None if it is not a valid date"""
+    try:
+        return datetime.strptime(expiry, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return None
+
 # JSON file path for storing inventory data
 JSON_FILE = "clinic_inventory.json"
 
+# Monotonic id counters, persisted in the JSON file so ids are never reused
+# across removals or restarts. Insert position has no effect on a row's id.
+next_medicine_id = 1
+next_equipment_id = 1
+
+def allocate_medicine_id():
+    """Return a fresh medicine id and advance the counter"""
+    global next_medicine_id
+    row_id = next_medicine_id
+    next_medicine_id += 1
+    return row_id
+
+def allocate_equipment_id():
+    """Return a fresh equipment id and advance the counter"""
+    global next_equipment_id
+    row_id = next_equipment_id
+    next_equipment_id += 1
+    return row_id
+
 # JSON Storage Functions
 def save_to_json():
     """Save medicines and equipment data to JSON file"""
     global medicines, equipment
     try:
         data = {
-            "medicines": medicines,
-            "equipment": equipment
+            "medicines": [row[:MED_EXPIRY_ORD] for row in medicines],  # the ordinal is derived, not saved
+            "equipment": equipment,
+            "next_ids": {"medicines": next_medicine_id, "equipment": next_equipment_id}
         }
         with open(JSON_FILE, 'w', encoding='utf-8') as f:
             json.dump(data, f, indent=2, ensure_ascii=False)
@@ -51,13 +79,19 @@ def save_to_json():
 
 def load_from_json():
     """Load medicines and equipment data from JSON file"""
-    global medicines, equipment
+    global medicines, equipment, next_medicine_id, next_equipment_id
     try:
         if os.path.exists(JSON_FILE):
             with open(JSON_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
                 medicines = data.get("medicines", [])
                 equipment = data.get("equipment", [])
+                for row in medicines:
+                    row[MED_EXPIRY_ORD:] = [parse_expiry(row[MED_EXPIRY])]
+                # Older files have no "next_ids"; never go below max id + 1 either way
+                next_ids = data.get("next_ids", {})
+                next_medicine_id = max([next_ids.get("medicines", 1)] + [row[MED_ID] + 1 for row in medicines])
+                next_equipment_id = max([next_ids.get("equipment", 1)] + [row[EQ_ID] + 1 for row in equipment])
                 return True
         return False
     except Exception as e:
@@ -80,9 +114,9 @@ def add_medicine(name, packs, items_per_pack, total_qty, expiry):
     """Add medicine to multidimensional array using append()"""
     global medicines
     
-    row_id = len(medicines) + 1  # simple auto-increment using array length
+    row_id = allocate_medicine_id()  # never reused, unlike len(medicines) + 1
     # Create a new row with all fields
-    new_row = [row_id, name, packs, items_per_pack, total_qty, expiry]
+    new_row = [row_id, name, packs, items_per_pack, total_qty, expiry, parse_expiry(expiry)]
     medicines.append(new_row)  # Add entire row to 2D array
     save_to_json()  # Save changes to JSON
     
@@ -104,17 +138,13 @@ def insert_medicine_at_position(index, name, packs, items_per_pack, total_qty, e
         print(f"Error: Index {index} is out of bounds for medicines array (size {len(medicines)})")
         return None
     
-    # Generate a unique ID for the new medicine
-    new_id = (medicines[-1][MED_ID] + 1) if medicines else 1
+    # Generate a unique ID for the new medicine; existing ids are left untouched
+    new_id = allocate_medicine_id()
     
     # Create new row with all fields
-    new_row = [new_id, name, packs, items_per_pack, total_qty, expiry]
+    new_row = [new_id, name, packs, items_per_pack, total_qty, expiry, parse_expiry(expiry)]
     medicines.insert(index, new_row)  # Insert entire row at specific index
     
-    # Re-assign IDs to maintain sequential order after insertion
-    for i in range(len(medicines)):
-        medicines[i][MED_ID] = i + 1
-    
     save_to_json()  # Save changes to JSON
         
     return {
@@ -143,6 +173,7 @@ def remove_medicine_by_id(medicine_id):
             }
             # Remove entire row from 2D array
             medicines.pop(i)
+            save_to_json()  # Save changes to JSON
             return removed_data
     return None
 
@@ -215,6 +246,7 @@ def update_medicine(row_id, name, packs, items_per_pack, total_qty, expiry):
             medicines[i][MED_ITEMS_PER_PACK] = items_per_pack
             medicines[i][MED_TOTAL_QTY] = total_qty
             medicines[i][MED_EXPIRY] = expiry
+            medicines[i][MED_EXPIRY_ORD] = parse_expiry(expiry)
             save_to_json()  # Save changes to JSON
             return True
     return False
@@ -258,7 +290,7 @@ def add_equipment(name, stock, status):
     """Add equipment to multidimensional array using append()"""
     global equipment
     
-    row_id = len(equipment) + 1
+    row_id = allocate_equipment_id()  # never reused, unlike len(equipment) + 1
     # Create a new row with all fields
     new_row = [row_id, name, stock, status]
     equipment.append(new_row)  # Add entire row to 2D array
@@ -280,17 +312,13 @@ def insert_equipment_at_position(index, name, stock, status):
         print(f"Error: Index {index} is out of bounds for equipment array (size {len(equipment)})")
         return None
     
-    # Generate a unique ID for the new equipment
-    new_id = (equipment[-1][EQ_ID] + 1) if equipment else 1
+    # Generate a unique ID for the new equipment; existing ids are left untouched
+    new_id = allocate_equipment_id()
     
     # Create new row with all fields
     new_row = [new_id, name, stock, status]
     equipment.insert(index, new_row)  # Insert entire row at specific index
     
-    # Re-assign IDs to maintain sequential order after insertion
-    for i in range(len(equipment)):
-        equipment[i][EQ_ID] = i + 1
-    
     save_to_json()  # Save changes to JSON
         
     return {
@@ -414,112 +442,235 @@ def delete_equipment(row_id):
     return remove_equipment_by_id(row_id)
 
 # -------------------------
-# Array Sorting Functions
+# Bulk Operations (one save and one change notification per batch)
 # -------------------------
-def sort_medicines_by_name(ascending=True):
-    """Sort medicines multidimensional array by name"""
+# callback(kind) is called once after each bulk operation, kind being
+# "medicines" or "equipment", e.g. so the UI reloads that table once
+change_listeners = []
+
+def add_change_listener(callback):
+    """Register callback(kind) to run after every bulk operation"""
+    change_listeners.append(callback)
+
+def _notify_change(kind):
+    for callback in change_listeners:
+        callback(kind)
+
+# Bulk items are checked before any id is allocated or any row is touched:
+# a bad item must fail while the arrays, the id counters and the JSON file
+# are unchanged.
+def _whole_number(value, field):
+    """Return value as an int, or raise ValueError if it is not a whole number"""
+    if type(value) is int:
+        return value
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        number = None
+    if number is None or (not isinstance(value, str) and number != value):
+        raise ValueError(f"{field} must be a whole number, got {value!r}")
+    return number
+
+def _medicine_fields(item):
+    """Checked [name, packs, items_per_pack, total_qty, expiry] from a medicine item"""
+    if len(item) != 5:
+        raise ValueError(f"expected (name, packs, items_per_pack, total_qty, expiry), got {item!r}")
+    name, packs, items_per_pack, total_qty, expiry = item
+    return [str(name), _whole_number(packs, "packs"), _whole_number(items_per_pack, "items_per_pack"),
+            _whole_number(total_qty, "total_qty"), str(expiry)]
+
+def _equipment_fields(item):
+    """Checked [name, stock, status] from an equipment item"""
+    if len(item) != 3:
+        raise ValueError(f"expected (name, stock, status), got {item!r}")
+    name, stock, status = item
+    return [str(name), _whole_number(stock, "stock"), str(status)]
+
+def add_medicines_bulk(items):
+    """Append many medicines given as (name, packs, items_per_pack, total_qty, expiry) tuples; ValueError adds none"""
     global medicines
     
-    # Sort the 2D array by name column
-    medicines.sort(key=lambda row: row[MED_NAME].lower(), reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    # Check every item before allocating ids so a malformed one changes nothing
+    checked = [_medicine_fields(item) for item in items]
+    new_rows = [[allocate_medicine_id()] + fields + [parse_expiry(fields[-1])] for fields in checked]
+    if not new_rows:
+        return []
+    medicines.extend(new_rows)
+    save_to_json()  # Save once for the whole batch
+    _notify_change("medicines")
     
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in new_rows]
 
-def sort_medicines_by_expiry(ascending=True):
-    """Sort medicines multidimensional array by expiry date"""
+def update_medicines_bulk(updates):
+    """Apply many (row_id, name, packs, items_per_pack, total_qty, expiry) updates; all or nothing"""
     global medicines
     
-    # Sort the 2D array by expiry column
-    medicines.sort(key=lambda row: row[MED_EXPIRY], reverse=not ascending)
-    save_to_json()  # Save changes to JSON
-    
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
-
-def sort_medicines_by_total_qty(ascending=True):
-    """Sort medicines multidimensional array by total quantity"""
+    updates = list(updates)
+    rows_by_id = {row[MED_ID]: row for row in medicines}
+    if any(len(update) != 6 or update[0] not in rows_by_id for update in updates):
+        return False  # unknown id or malformed update: change nothing
+    try:
+        checked = [(update[0], _medicine_fields(update[1:])) for update in updates]
+    except ValueError:
+        return False  # a field that is not a whole number: change nothing
+    if not checked:
+        return True
+    for row_id, fields in checked:
+        rows_by_id[row_id][MED_NAME:] = fields + [parse_expiry(fields[-1])]
+    save_to_json()  # Save once for the whole batch
+    _notify_change("medicines")
+    return True
+
+def remove_medicines_bulk(ids):
+    """Remove every medicine whose id is in ids in a single pass; returns the removed medicines"""
     global medicines
     
-    # Sort the 2D array by total_qty column
-    medicines.sort(key=lambda row: row[MED_TOTAL_QTY], reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    ids = set(ids)
+    removed = [row for row in medicines if row[MED_ID] in ids]
+    if not removed:
+        return []
+    medicines[:] = [row for row in medicines if row[MED_ID] not in ids]
+    save_to_json()  # Save once for the whole batch
+    _notify_change("medicines")
     
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in removed]
 
-def sort_medicines_by_packs(ascending=True):
-    """Sort medicines multidimensional array by packs"""
-    global medicines
+def add_equipment_bulk(items):
+    """Append many equipment items given as (name, stock, status) tuples; ValueError adds none"""
+    global equipment
     
-    # Sort the 2D array by packs column
-    medicines.sort(key=lambda row: row[MED_PACKS], reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    # Check every item before allocating ids so a malformed one changes nothing
+    checked = [_equipment_fields(item) for item in items]
+    new_rows = [[allocate_equipment_id()] + fields for fields in checked]
+    if not new_rows:
+        return []
+    equipment.extend(new_rows)
+    save_to_json()  # Save once for the whole batch
+    _notify_change("equipment")
     
-    return [{"id": medicines[i][MED_ID], "name": medicines[i][MED_NAME], "packs": medicines[i][MED_PACKS], 
-             "items_per_pack": medicines[i][MED_ITEMS_PER_PACK], "total_qty": medicines[i][MED_TOTAL_QTY], 
-             "expiry": medicines[i][MED_EXPIRY]} for i in range(len(medicines))]
+    return [{"id": row[EQ_ID], "name": row[EQ_NAME], "stock": row[EQ_STOCK], 
+             "status": row[EQ_STATUS]} for row in new_rows]
 
-def sort_equipment_by_name(ascending=True):
-    """Sort equipment multidimensional array by name"""
+def update_equipment_bulk(updates):
+    """Apply many (row_id, name, stock, status) updates; all or nothing"""
     global equipment
     
-    # Sort the 2D array by name column
-    equipment.sort(key=lambda row: row[EQ_NAME].lower(), reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    updates = list(updates)
+    rows_by_id = {row[EQ_ID]: row for row in equipment}
+    if any(len(update) != 4 or update[0] not in rows_by_id for update in updates):
+        return False  # unknown id or malformed update: change nothing
+    try:
+        checked = [(update[0], _equipment_fields(update[1:])) for update in updates]
+    except ValueError:
+        return False  # a field that is not a whole number: change nothing
+    if not checked:
+        return True
+    for row_id, fields in checked:
+        rows_by_id[row_id][EQ_NAME:EQ_STATUS + 1] = fields
+    save_to_json()  # Save once for the whole batch
+    _notify_change("equipment")
+    return True
+
+def remove_equipment_bulk(ids):
+    """Remove every equipment item whose id is in ids in a single pass; returns the removed items"""
+    global equipment
     
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+    ids = set(ids)
+    removed = [row for row in equipment if row[EQ_ID] in ids]
+    if not removed:
+        return []
+    equipment[:] = [row for row in equipment if row[EQ_ID] not in ids]
+    save_to_json()  # Save once for the whole batch
+    _notify_change("equipment")
+    
+    return [{"id": row[EQ_ID], "name": row[EQ_NAME], "stock": row[EQ_STOCK], 
+             "status": row[EQ_STATUS]} for row in removed]
 
-def sort_equipment_by_stock(ascending=True):
-    """Sort equipment multidimensional array by stock quantity"""
-    global equipment
+# -------------------------
+# Array Sorting Functions
+# -------------------------
+def sort_medicines_by_name(ascending=True):
+    """Medicines ordered by name (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(medicines, key=lambda row: row[MED_NAME].lower(), reverse=not ascending)
     
-    # Sort the 2D array by stock column
-    equipment.sort(key=lambda row: row[EQ_STOCK], reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in rows]
+
+def sort_medicines_by_expiry(ascending=True):
+    """Medicines ordered by expiry date (sorted copy; the array and the JSON file are left untouched)"""
+    # Compare the parsed ordinals; rows without a valid date go last in either direction
+    rows = sorted((row for row in medicines if row[MED_EXPIRY_ORD] is not None),
+                  key=lambda row: row[MED_EXPIRY_ORD], reverse=not ascending)
+    rows += [row for row in medicines if row[MED_EXPIRY_ORD] is None]
     
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in rows]
 
-def sort_equipment_by_status(ascending=True):
-    """Sort equipment multidimensional array by status"""
-    global equipment
+def sort_medicines_by_total_qty(ascending=True):
+    """Medicines ordered by total quantity (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(medicines, key=lambda row: row[MED_TOTAL_QTY], reverse=not ascending)
     
-    # Sort the 2D array by status column
-    equipment.sort(key=lambda row: row[EQ_STATUS].lower(), reverse=not ascending)
-    save_to_json()  # Save changes to JSON
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in rows]
+
+def sort_medicines_by_packs(ascending=True):
+    """Medicines ordered by packs (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(medicines, key=lambda row: row[MED_PACKS], reverse=not ascending)
     
-    return [{"id": equipment[i][EQ_ID], "name": equipment[i][EQ_NAME], "stock": equipment[i][EQ_STOCK], 
-             "status": equipment[i][EQ_STATUS]} for i in range(len(equipment))]
+    return [{"id": row[MED_ID], "name": row[MED_NAME], "packs": row[MED_PACKS], 
+             "items_per_pack": row[MED_ITEMS_PER_PACK], "total_qty": row[MED_TOTAL_QTY], 
+             "expiry": row[MED_EXPIRY]} for row in rows]
+
+def sort_equipment_by_name(ascending=True):
+    """Equipment ordered by name (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(equipment, key=lambda row: row[EQ_NAME].lower(), reverse=not ascending)
+    
+    return [{"id": row[EQ_ID], "name": row[EQ_NAME], "stock": row[EQ_STOCK], 
+             "status": row[EQ_STATUS]} for row in rows]
+
+def sort_equipment_by_stock(ascending=True):
+    """Equipment ordered by stock quantity (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(equipment, key=lambda row: row[EQ_STOCK], reverse=not ascending)
+    
+    return [{"id": row[EQ_ID], "name": row[EQ_NAME], "stock": row[EQ_STOCK], 
+             "status": row[EQ_STATUS]} for row in rows]
+
+def sort_equipment_by_status(ascending=True):
+    """Equipment ordered by status (sorted copy; the array and the JSON file are left untouched)"""
+    rows = sorted(equipment, key=lambda row: row[EQ_STATUS].lower(), reverse=not ascending)
+    
+    return [{"id": row[EQ_ID], "name": row[EQ_NAME], "stock": row[EQ_STOCK], 
+             "status": row[EQ_STATUS]} for row in rows]
 
 # -------------------------
 # Array Filtering Functions
 # -------------------------
 def filter_medicines_by_expiry_range(start_date, end_date):
     """Filter medicines by expiry date range using multidimensional array"""
-    from datetime import datetime
-    try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
-        result = []
-        for i in range(len(medicines)):
-            if start <= datetime.strptime(medicines[i][MED_EXPIRY], "%Y-%m-%d") <= end:
-                result.append({
-                    "id": medicines[i][MED_ID],
-                    "name": medicines[i][MED_NAME],
-                    "packs": medicines[i][MED_PACKS],
-                    "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
-                    "total_qty": medicines[i][MED_TOTAL_QTY],
-                    "expiry": medicines[i][MED_EXPIRY]
-                })
-        return result
-    except ValueError:
+    start = parse_expiry(start_date)
+    end = parse_expiry(end_date)
+    if start is None or end is None:
         return []
+    result = []
+    for i in range(len(medicines)):
+        # An undated row (ordinal None) never matches
+        if medicines[i][MED_EXPIRY_ORD] is not None and start <= medicines[i][MED_EXPIRY_ORD] <= end:
+            result.append({
+                "id": medicines[i][MED_ID],
+                "name": medicines[i][MED_NAME],
+                "packs": medicines[i][MED_PACKS],
+                "items_per_pack": medicines[i][MED_ITEMS_PER_PACK],
+                "total_qty": medicines[i][MED_TOTAL_QTY],
+                "expiry": medicines[i][MED_EXPIRY]
+            })
+    return result
 
 def filter_medicines_by_low_stock(threshold=5):
     """Filter medicines with low stock (total_qty <= threshold) using multidimensional array"""
@@ -672,11 +823,10 @@ def get_low_stock_equipment(threshold=3):
 
 def get_expiring_medicines(days_ahead=30):
     """Get medicines expiring within specified days using multidimensional array"""
-    from datetime import datetime, timedelta
-    cutoff_date = datetime.now() + timedelta(days=days_ahead)
+    cutoff = (date.today() + timedelta(days=days_ahead)).toordinal()
     result = []
     for i in range(len(medicines)):
-        if datetime.strptime(medicines[i][MED_EXPIRY], "%Y-%m-%d") <= cutoff_date:
+        if medicines[i][MED_EXPIRY_ORD] is not None and medicines[i][MED_EXPIRY_ORD] <= cutoff:
             result.append({
                 "id": medicines[i][MED_ID],
                 "name": medicines[i][MED_NAME],
@@ -756,6 +906,10 @@ class ClinicInventoryApp(ctk.CTk):
         self.selected_medicine_id = None
         self.selected_equipment_id = None
 
+        # Active table sort as (sort function, ascending); None shows array order
+        self.med_sort = None
+        self.eq_sort = None
+
         # Initialize a deque for a fixed-size transaction log (Queue Data Structure)
         # collections.deque is chosen over a list for queues because it provides O(1) complexity
         # for append and popleft operations, which are essential for efficient queue management.
@@ -768,8 +922,16 @@ class ClinicInventoryApp(ctk.CTk):
         
         self.create_ui()
         self.load_all_tables()
+        add_change_listener(self.on_inventory_changed)
         self.log_transaction("Application started.")
 
+    def on_inventory_changed(self, kind):
+        """Reloads the affected table once after a bulk operation"""
+        if kind == "medicines":
+            self.load_medicines_table()
+        else:
+            self.load_equipment_table()
+
     def log_transaction(self, message):
         """Logs a transaction message to the deque-based transaction log (Queue)"""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -1059,7 +1221,12 @@ class ClinicInventoryApp(ctk.CTk):
     def load_medicines_table(self):
         for row in self.med_tree.get_children():
             self.med_tree.delete(row)
-        rows = fetch_medicines()
+        if self.med_sort is None:
+            rows = fetch_medicines()
+        else:
+            sort_function, ascending = self.med_sort
+            rows = [(m["id"], m["name"], m["packs"], m["items_per_pack"], m["total_qty"], m["expiry"])
+                    for m in sort_function(ascending)]
         for r in rows:
             rid, name, packs, items_per_pack, total_qty, expiry = r
             self.med_tree.insert("", "end", values=(rid, name, packs, items_per_pack, total_qty, expiry))
@@ -1068,7 +1235,11 @@ class ClinicInventoryApp(ctk.CTk):
     def load_equipment_table(self):
         for row in self.eq_tree.get_children():
             self.eq_tree.delete(row)
-        rows = fetch_equipment()
+        if self.eq_sort is None:
+            rows = fetch_equipment()
+        else:
+            sort_function, ascending = self.eq_sort
+            rows = [(eq["id"], eq["name"], eq["stock"], eq["status"]) for eq in sort_function(ascending)]
         for r in rows:
             rid, name, quantity, description = r
             self.eq_tree.insert("", "end", values=(rid, name, quantity, description))
@@ -1112,11 +1283,7 @@ class ClinicInventoryApp(ctk.CTk):
         return total
 
     def validate_date(self, date_text):
-        try:
-            datetime.strptime(date_text, "%Y-%m-%d")
-            return True
-        except Exception:
-            return False
+        return parse_expiry(date_text) is not None
 
     def add_medicine(self):
         name = self.med_name.get().strip()
@@ -1248,13 +1415,13 @@ class ClinicInventoryApp(ctk.CTk):
         ascending = self.med_sort_order.get() == "asc"
         
         if sort_by == "name":
-            sort_medicines_by_name(ascending)
+            self.med_sort = (sort_medicines_by_name, ascending)
         elif sort_by == "expiry":
-            sort_medicines_by_expiry(ascending)
+            self.med_sort = (sort_medicines_by_expiry, ascending)
         elif sort_by == "total_qty":
-            sort_medicines_by_total_qty(ascending)
+            self.med_sort = (sort_medicines_by_total_qty, ascending)
         elif sort_by == "packs":
-            sort_medicines_by_packs(ascending)
+            self.med_sort = (sort_medicines_by_packs, ascending)
         
         self.load_medicines_table()
         messagebox.showinfo("Sort Complete", f"Medicines sorted by {sort_by} ({'ascending' if ascending else 'descending'})")
@@ -1265,11 +1432,11 @@ class ClinicInventoryApp(ctk.CTk):
         ascending = self.eq_sort_order.get() == "asc"
         
         if sort_by == "name":
-            sort_equipment_by_name(ascending)
+            self.eq_sort = (sort_equipment_by_name, ascending)
         elif sort_by == "stock":
-            sort_equipment_by_stock(ascending)
+            self.eq_sort = (sort_equipment_by_stock, ascending)
         elif sort_by == "status":
-            sort_equipment_by_status(ascending)
+            self.eq_sort = (sort_equipment_by_status, ascending)
         
         self.load_equipment_table()
         messagebox.showinfo("Sort Complete", f"Equipment sorted by {sort_by} ({'ascending' if ascending else 'descending'})")
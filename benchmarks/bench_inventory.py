@@ -0,0 +1,155 @@
+"""Micro-benchmarks for the inventory indexes.
+
+Run from the repository root:  python benchmarks/bench_inventory.py
+Each line prints the indexed path and the plain scan (or flat list) it
+replaced. Needs customtkinter importable (the GUI classes are defined at
+import time). Absolute numbers depend on the machine; compare the ratios.
+"""
+import bisect
+import datetime
+import importlib.util
+import pathlib
+import random
+import sys
+import time
+
+SOURCE = pathlib.Path(__file__).resolve().parent.parent / "Clinic-Inventory-System.py"
+STATUSES = ["Available", "In Use", "Under Maintenance", "Broken"]
+
+
+def load_inventory():
+    spec = importlib.util.spec_from_file_location("clinic_inventory", SOURCE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best(func, repeat=5, number=1):
+    """Best wall time of func() in seconds, over repeat runs of number calls"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return min(times)
+
+
+def report(label, fast, slow, unit="ms"):
+    scale = 1e6 if unit == "us" else 1e3
+    print(f"{label:<48} {fast * scale:10.1f} {unit}  vs {slow * scale:10.1f} {unit}")
+
+
+def random_name(rnd):
+    return "".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(10))
+
+
+def load_medicines(inv, n, rnd):
+    inv.initialize_default_data()
+    inv.add_medicines_bulk([(random_name(rnd), rnd.randint(0, 50), 10, rnd.randint(0, 500),
+                             f"{rnd.randint(2025, 2029)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}")
+                            for _ in range(n)])
+
+
+def bench_value_index(inv, n=1_000_000, k=20_000):
+    index = inv.ValueIndex()
+    for i in range(n):
+        index.add(i % 1000, i)
+    flat = sorted((i % 1000, i) for i in range(n))
+
+    def index_updates():
+        for i in range(k):
+            index.discard(i % 1000, i)
+            index.add((i + 7) % 1000, i)
+
+    def flat_updates():
+        for i in range(k):
+            del flat[bisect.bisect_left(flat, (i % 1000, i))]
+            bisect.insort(flat, ((i + 7) % 1000, i))
+
+    report("ValueIndex update, 1M entries (vs flat list)", best(index_updates, 1) / k, best(flat_updates, 1) / k, "us")
+
+
+def bench_query_cache(inv, rnd, n=20_000):
+    load_medicines(inv, n, rnd)
+    uncached = best(lambda: (inv.query_cache._reset(None), inv.filter_medicines_by_low_stock(100)))
+    inv.filter_medicines_by_low_stock(100)
+    cached = best(lambda: inv.filter_medicines_by_low_stock(100), number=100)
+    report("repeated low-stock query, 20k (cached vs uncached)", cached, uncached, "us")
+
+
+def bench_medicine_indexes(inv, rnd, n=200_000):
+    load_medicines(inv, n, rnd)
+    rows = inv.fetch_medicines()
+    fresh = lambda query: lambda: (inv.query_cache._reset(None), query())  # bypass the result cache
+    fresh(lambda: inv.filter_medicines_by_low_stock(5))()  # first run builds the per-chunk offset tables
+    report("low-stock report, 200k (total_qty index vs scan)",
+           best(fresh(lambda: inv.filter_medicines_by_low_stock(5))),
+           best(lambda: [r for r in rows if r[4] <= 5]))
+    pattern = rows[n // 2][1][2:6]
+    report("name pattern, 200k random names (trigrams vs scan)",
+           best(fresh(lambda: inv.filter_medicines_by_name_pattern(pattern))),
+           best(lambda: [r for r in rows if pattern in r[1].casefold()]))
+    store, row = inv.medicines, [-1] + list(rows[0][1:])
+    report("insert + pop at the head, 200k rows (RowStore vs list)",
+           best(lambda: (store.insert(0, row), store.pop(0)), number=1000),
+           best(lambda: (rows.insert(0, row), rows.pop(0)), number=1000), "us")
+
+
+def bench_range_selectivity(inv, rnd, n=200_000):
+    """Ranges from selective to matching most rows: the planner must never lose to a plain scan"""
+    load_medicines(inv, n, rnd)
+    rows, record = list(inv.medicines), inv.MedicineRecord
+    cases = [("low_stock(5)", lambda: inv.filter_medicines_by_low_stock(5), lambda r: r[4] <= 5),
+             ("low_stock(100)", lambda: inv.filter_medicines_by_low_stock(100), lambda r: r[4] <= 100),
+             ("low_stock(400)", lambda: inv.filter_medicines_by_low_stock(400), lambda r: r[4] <= 400),
+             ("packs_range(3, 3)", lambda: inv.filter_medicines_by_packs_range(3, 3), lambda r: r[2] == 3),
+             ("packs_range(0, 40)", lambda: inv.filter_medicines_by_packs_range(0, 40), lambda r: r[2] <= 40)]
+    for label, query, test in cases:
+        planned = best(lambda: (inv.query_cache._reset(None), query()))
+        scanned = best(lambda: [record(r) for r in rows if test(r)])
+        report(f"{label}, 200k (planner vs scan)", planned, scanned)
+        if planned > 1.2 * scanned:
+            print(f"  REGRESSION: {label} is {planned / scanned:.1f}x slower than a scan")
+
+
+def bench_medicine_columns(inv, rnd, n=1_000_000):
+    """The bit-sliced columns against the row scan they replace for unselective ranges"""
+    load_medicines(inv, n, rnd)
+    rows, record = list(inv.medicines), inv.MedicineRecord
+    soon = (datetime.date.today() + datetime.timedelta(days=30)).toordinal()
+    cases = [("low_stock(25)", lambda: inv.filter_medicines_by_low_stock(25), lambda r: r[4] <= 25),
+             ("low_stock(400)", lambda: inv.filter_medicines_by_low_stock(400), lambda r: r[4] <= 400),
+             ("packs_range(10, 20)", lambda: inv.filter_medicines_by_packs_range(10, 20), lambda r: 10 <= r[2] <= 20),
+             ("get_expiring_medicines(30)", lambda: inv.get_expiring_medicines(30),
+              lambda r: r[6] is not None and r[6] <= soon)]
+    for label, query, test in cases:
+        report(f"{label}, 1M (columns vs scan)", best(lambda: (inv.query_cache._reset(None), query()), 3),
+               best(lambda: [record(r) for r in rows if test(r)], 3))
+    sliced = sum(sys.getsizeof(bits) for column in inv.medicine_columns.columns.values()
+                 for _, slices in column.chunks for bits in slices)
+    print(f"{'bit-sliced columns, 1M medicines':<48} {sliced / n:10.1f} bytes per row")
+
+
+def bench_bitmaps(inv, rnd, n=300_000):
+    inv.initialize_default_data()
+    inv.add_equipment_bulk([(random_name(rnd), rnd.randint(0, 20), rnd.choice(STATUSES)) for _ in range(n)])
+    rows = inv.fetch_equipment()
+    report("status + low stock, 300k equipment (bitmaps vs scan)",
+           best(lambda: (inv.query_cache._reset(None), inv.get_low_stock_equipment_by_status("maint"))),
+           best(lambda: [r for r in rows if "maint" in r[3].casefold() and r[2] <= 3]))
+
+
+def main():
+    inv = load_inventory()
+    rnd = random.Random(0)
+    bench_value_index(inv)
+    bench_query_cache(inv, rnd)
+    bench_medicine_indexes(inv, rnd)
+    bench_range_selectivity(inv, rnd)
+    bench_medicine_columns(inv, rnd)
+    bench_bitmaps(inv, rnd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Shared fixtures: every test gets a freshly imported copy of the inventory module"""
+import importlib.util
+import itertools
+import pathlib
+import sys
+import types
+
+import pytest
+
+SOURCE = pathlib.Path(__file__).resolve().parent.parent / "Clinic-Inventory-System.py"
+_copies = itertools.count()
+
+
+def _stub_customtkinter():
+    """Stand-in for customtkinter: the module only touches it to define the GUI classes at import time"""
+    stub = types.ModuleType("customtkinter")
+    stub.set_appearance_mode = stub.set_default_color_theme = lambda *args, **kwargs: None
+    stub.__getattr__ = lambda name: type(name, (), {})  # CTk, CTkFrame, ... as empty base classes
+    return stub
+
+
+try:
+    import customtkinter  # noqa: F401
+except ImportError:
+    sys.modules["customtkinter"] = _stub_customtkinter()
+
+
+def load_inventory():
+    """Import Clinic-Inventory-System.py as a new module, so no global state leaks between tests"""
+    spec = importlib.util.spec_from_file_location(f"clinic_inventory_{next(_copies)}", SOURCE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def inventory():
+    return load_inventory()
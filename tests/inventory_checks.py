@@ -0,0 +1,191 @@
+"""Plain-list reference model of the inventory and the checks that compare the module against it"""
+import collections
+from datetime import date, timedelta
+
+
+def ordinal(expiry):
+    return date.fromisoformat(expiry).toordinal()
+
+
+def ids(records):
+    return [record["id"] for record in records]
+
+
+class Model:
+    """The visible columns of both arrays as plain lists, edited the naive way"""
+
+    def __init__(self, inv):
+        self.meds = [list(row) for row in inv.fetch_medicines()]
+        self.eqs = [list(row) for row in inv.fetch_equipment()]
+
+    @staticmethod
+    def position(rows, row_id):
+        return next((i for i, row in enumerate(rows) if row[0] == row_id), -1)
+
+    @staticmethod
+    def first_named(rows, name):
+        return next((row for row in rows if row[1].casefold() == name.casefold()), None)
+
+    @staticmethod
+    def move(rows, row_id, anchor_id, offset):
+        if row_id == anchor_id or Model.position(rows, row_id) < 0 or Model.position(rows, anchor_id) < 0:
+            return False
+        row = rows.pop(Model.position(rows, row_id))
+        rows.insert(Model.position(rows, anchor_id) + offset, row)
+        return True
+
+
+def check_against_model(inv, model):
+    """Every public read path must agree with the plain lists"""
+    meds, eqs = model.meds, model.eqs
+    assert [list(row) for row in inv.fetch_medicines()] == meds
+    assert [list(row) for row in inv.fetch_equipment()] == eqs
+    assert inv.get_medicine_count() == len(meds) and inv.get_equipment_count() == len(eqs)
+    for i, row in enumerate(meds):
+        assert inv.find_medicine_index_by_id(row[0]) == i
+        assert inv.find_medicine_by_id(row[0])["name"] == row[1]
+    for i, row in enumerate(eqs):
+        assert inv.find_equipment_index_by_id(row[0]) == i
+    assert inv.find_medicine_index_by_id(-1) == -1 and inv.find_equipment_index_by_id(-1) == -1
+
+    snap = inv.snapshot()
+    assert [list(row[:6]) for row in snap.medicines] == meds
+    assert [list(row) for row in snap.equipment] == eqs
+    assert ids(inv.get_medicines_slice(1, 4)) == [r[0] for r in meds[1:4]]
+    assert ids(inv.get_equipment_slice(0, 2)) == [r[0] for r in eqs[0:2]]
+
+    # medicine filters, each served by a different index
+    for threshold in (0, 5, 12):
+        assert ids(inv.filter_medicines_by_low_stock(threshold)) == [r[0] for r in meds if r[4] <= threshold]
+    for lo, hi in ((0, 3), (2, 7), (5, 4)):
+        assert ids(inv.filter_medicines_by_packs_range(lo, hi)) == [r[0] for r in meds if lo <= r[2] <= hi]
+    start, end = "2025-01-01", "2026-06-30"
+    assert ids(inv.filter_medicines_by_expiry_range(start, end)) == [r[0] for r in meds if start <= r[5] <= end]
+    for pattern in ("ibu", "A", "500", "zz"):
+        assert ids(inv.filter_medicines_by_name_pattern(pattern)) == \
+            [r[0] for r in meds if pattern.casefold() in r[1].casefold()]
+    assert ids(inv.filter_medicines_by_expression('qty <= 5 and packs >= 2')) == \
+        [r[0] for r in meds if r[4] <= 5 and r[2] >= 2]
+    assert ids(inv.filter_medicines_by_expression('name ~ "amox" or not expiry >= 2026-06-01')) == \
+        [r[0] for r in meds if "amox" in r[1].casefold() or r[5] < "2026-06-01"]
+    cutoff = (date.today() + timedelta(days=400)).isoformat()
+    assert ids(inv.get_expiring_medicines(400)) == [r[0] for r in meds if r[5] <= cutoff]
+
+    # names
+    for name in {r[1] for r in meds} | {"nothing"}:
+        first = Model.first_named(meds, name)
+        assert inv.count_medicines_by_name(name) == sum(r[1].casefold() == name.casefold() for r in meds)
+        found = inv.find_medicine_by_name(name)
+        assert (found is None) if first is None else found["id"] == first[0]
+    for prefix in ("", "i", "IBU", "amox", "q"):
+        expected = sorted({r[1].casefold() for r in meds if r[1].casefold().startswith(prefix.casefold())})[:5]
+        assert [s.casefold() for s in inv.suggest_medicine_names(prefix, 5)] == expected
+
+    # sorted views never reorder the array
+    med_keys = {inv.sort_medicines_by_name: lambda r: inv.natural_sort_key(r[1]),
+                inv.sort_medicines_by_expiry: lambda r: ordinal(r[5]),
+                inv.sort_medicines_by_total_qty: lambda r: r[4],
+                inv.sort_medicines_by_packs: lambda r: r[2]}
+    eq_keys = {inv.sort_equipment_by_name: lambda r: inv.natural_sort_key(r[1]),
+               inv.sort_equipment_by_stock: lambda r: r[2],
+               inv.sort_equipment_by_status: lambda r: r[3].casefold()}
+    for ascending in (True, False):
+        for sort, key in med_keys.items():
+            assert ids(sort(ascending)) == [r[0] for r in sorted(meds, key=key, reverse=not ascending)]
+        for sort, key in eq_keys.items():
+            assert ids(sort(ascending)) == [r[0] for r in sorted(eqs, key=key, reverse=not ascending)]
+    assert [list(row) for row in inv.fetch_medicines()] == meds
+
+    # first-expiry-first-out lots
+    lots = collections.defaultdict(list)
+    for r in meds:
+        lots[r[1].casefold()].append((ordinal(r[5]), r[0]))
+    for name, entries in lots.items():
+        assert inv.get_soonest_lot(name)["id"] == min(entries)[1]
+    soonest = sorted((ordinal(r[5]), r[0]) for r in meds)
+    assert ids(inv.get_next_expiring_medicines(3)) == [row_id for _, row_id in soonest[:3]]
+
+    # equipment filters
+    for threshold in (0, 3, 6):
+        assert ids(inv.filter_equipment_by_stock_level(threshold, above=False)) == \
+            [r[0] for r in eqs if r[2] <= threshold]
+        assert ids(inv.filter_equipment_by_stock_level(threshold)) == [r[0] for r in eqs if r[2] >= threshold]
+    assert ids(inv.filter_equipment_by_stock_range(2, 6)) == [r[0] for r in eqs if 2 <= r[2] <= 6]
+    for pattern in ("use", "a", "", "xx"):
+        assert ids(inv.filter_equipment_by_status_pattern(pattern)) == \
+            [r[0] for r in eqs if pattern in r[3].casefold()]
+        assert ids(inv.get_low_stock_equipment_by_status(pattern)) == \
+            [r[0] for r in eqs if pattern in r[3].casefold() and r[2] <= 3]
+        assert ids(inv.filter_equipment_by_keyword(pattern)) == \
+            [r[0] for r in eqs if pattern in r[1].casefold() or pattern in r[3].casefold()]
+    assert ids(inv.filter_equipment_by_expression('stock <= 3 and status ~ "use"')) == \
+        [r[0] for r in eqs if r[2] <= 3 and "use" in r[3].casefold()]
+    assert inv.get_critical_equipment_ids() == {r[0] for r in eqs if r[2] <= 2}
+    for name in {r[1] for r in eqs}:
+        assert inv.count_equipment_by_name(name) == sum(r[1].casefold() == name.casefold() for r in eqs)
+
+    # running statistics
+    stats = inv.get_array_statistics()
+    window_end = (date.today() + timedelta(days=inv.InventoryStats.EXPIRY_WINDOW_DAYS)).isoformat()
+    assert stats["medicines_count"] == len(meds) and stats["equipment_count"] == len(eqs)
+    assert stats["low_stock_medicines"] == sum(r[4] <= 5 for r in meds)
+    assert stats["low_stock_equipment"] == sum(r[2] <= 3 for r in eqs)
+    assert stats["expiring_medicines"] == sum(r[5] <= window_end for r in meds)
+    assert stats["equipment_by_status"] == dict(collections.Counter(r[3] for r in eqs))
+
+
+def check_indexes(inv):
+    """Every secondary structure must equal one rebuilt from the rows"""
+    meds, eqs = list(inv.medicines), list(inv.equipment)
+    for store, rows in ((inv.medicines, meds), (inv.equipment, eqs)):
+        assert store.rows_by_id == {row[0]: row for row in rows}
+        order = store.order
+        offsets = order._offsets()
+        assert offsets == [sum(len(block) for block in order.blocks[:b]) for b in range(len(order.blocks))]
+        assert all(block.no == b and 0 < len(block) <= 2 * order.LOAD for b, block in enumerate(order.blocks))
+        assert all(order.where[row[0]] is block for block in order.blocks for row in block)
+        assert all(block.ranks in (None, {row[0]: i for i, row in enumerate(block)}) for block in order.blocks)
+
+    snap = inv.snapshot()
+    for frozen, rows in ((snap.medicines, meds), (snap.equipment, eqs)):
+        assert list(frozen) == [tuple(row) for row in rows] and len(frozen) == len(rows)
+        assert all(frozen.chunks) and list(frozen.starts) == [sum(map(len, frozen.chunks[:c]))
+                                                               for c in range(len(frozen.chunks))]
+        assert [frozen[i] for i in range(len(rows))] == list(frozen)
+
+    assert inv.medicine_expiry.keys[:] == sorted((r[6], r[0]) for r in meds if r[6] is not None)
+    assert inv.medicine_packs.keys[:] == sorted((r[2], r[0]) for r in meds)
+    assert inv.medicine_total_qty.keys[:] == sorted((r[4], r[0]) for r in meds)
+    assert inv.equipment_stock.keys[:] == sorted((r[2], r[0]) for r in eqs)
+
+    for names, rows in ((inv.medicine_names, meds), (inv.equipment_names, eqs)):
+        assert set(names.ids_by_name) == {r[1].casefold() for r in rows}
+        assert names.sort_keys == {r[0]: inv.natural_sort_key(r[1]) for r in rows}
+        posted = set().union(*names.trigrams.postings.values()) if names.trigrams.postings else set()
+        assert posted <= set(names.ids_by_name)
+
+    for name, queue in inv.medicine_lots.queues.items():
+        for i, (_, row_id) in enumerate(queue.heap):
+            assert queue.pos[row_id] == i
+            assert i == 0 or queue.heap[(i - 1) // 2] <= queue.heap[i]
+    assert set(inv.medicine_lots.queues) == {r[1].casefold() for r in meds if r[6] is not None}
+
+    for field, col in inv.MedicineColumns.FIELDS.items():
+        column = inv.medicine_columns.columns[field]
+        assert column.size == len(meds) and sum(count for count, _ in column.chunks) == len(meds)
+        assert column.starts == [sum(count for count, _ in column.chunks[:c]) for c in range(len(column.chunks))]
+        assert all(0 < count <= 2 * column.CHUNK and len(slices) == column.width and
+                   all(bits >> count == 0 for bits in slices) for count, slices in column.chunks)
+        stored = [sum((slices[j] >> i & 1) << j for j in range(column.width)) for count, slices in column.chunks
+                  for i in range(count)]
+        stored = [value - (value >> (column.width - 1) << column.width) for value in stored]  # two's complement
+        assert stored == [0 if r[col] is None else r[col] for r in meds]
+
+    bitmaps = inv.equipment_bitmaps
+    fresh = inv.EquipmentBitmaps()
+    fresh.rebuild(eqs)
+    assert bitmaps.size == len(eqs)
+    assert {s: bitmaps.status_bits[c] for c, s in enumerate(bitmaps.statuses) if bitmaps.status_bits[c]} == \
+        {s: fresh.status_bits[c] for c, s in enumerate(fresh.statuses) if fresh.status_bits[c]}
+    assert bitmaps.flag_bits == fresh.flag_bits
+
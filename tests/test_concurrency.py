@@ -0,0 +1,205 @@
+"""Reader/writer tests for inventory_store and the lock-free snapshots"""
+import threading
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from inventory_checks import check_indexes
+
+WAIT = 5  # seconds; generous so a slow machine never fails a test that is not deadlocked
+
+
+def run_threads(targets):
+    errors = []
+
+    def guarded(target):
+        try:
+            target()
+        except BaseException as exc:  # surfaced in the main thread below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=guarded, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(WAIT * 6)
+        assert not thread.is_alive(), "thread did not finish (deadlock?)"
+    if errors:
+        raise errors[0]
+
+
+def test_upgrading_read_lock_raises(inventory):
+    store = inventory.inventory_store
+    with store.read():
+        with pytest.raises(RuntimeError):
+            with store.write():
+                pass
+        with pytest.raises(RuntimeError):
+            inventory.add_medicine("Zinc", 1, 1, 1, "2027-01-01")  # a writer called from inside a read
+    assert inventory.get_medicine_count() == 0
+    with store.write():  # the failed upgrade left the lock usable
+        inventory.add_medicine("Zinc", 1, 1, 1, "2027-01-01")
+    assert inventory.get_medicine_count() == 1
+
+
+def test_writer_may_read_and_write_again(inventory):
+    store = inventory.inventory_store
+    assert not store.lock.is_outermost_write()
+    with store.write():
+        assert store.lock.is_outermost_write()
+        record = inventory.add_medicine("Zinc", 1, 10, 10, "2027-01-01")
+        with store.read():
+            assert inventory.find_medicine_by_id(record["id"])["name"] == "Zinc"
+        with store.write():
+            assert not store.lock.is_outermost_write()
+            inventory.update_medicine(record["id"], "Zinc", 2, 10, 20, "2027-01-01")
+        assert store.lock.is_outermost_write()
+        others = []
+        run_threads([lambda: others.append(store.lock.is_outermost_write())])
+        assert others == [False]  # another thread never holds our write lock
+    assert inventory.find_medicine_by_id(record["id"])["total_qty"] == 20
+    done = threading.Event()
+    run_threads([lambda: (inventory.get_medicine_count(), done.set())])  # lock fully released
+    assert done.is_set()
+
+
+def test_writer_excludes_readers_and_waiting_writer_blocks_new_readers(inventory):
+    lock = inventory.inventory_store.lock
+    events = []
+    reader_in, writer_waiting = threading.Event(), threading.Event()
+
+    def first_reader():
+        lock.acquire_read()
+        reader_in.set()
+        assert writer_waiting.wait(WAIT)
+        time.sleep(0.1)  # let the late reader queue up behind the writer
+        events.append("first reader out")
+        lock.release_read()
+
+    def writer():
+        assert reader_in.wait(WAIT)
+        writer_waiting.set()
+        lock.acquire_write()
+        events.append("writer in")
+        time.sleep(0.05)
+        events.append("writer out")
+        lock.release_write()
+
+    def late_reader():
+        assert writer_waiting.wait(WAIT)
+        time.sleep(0.05)  # the writer is waiting by now
+        lock.acquire_read()
+        events.append("late reader in")
+        lock.release_read()
+
+    run_threads([first_reader, writer, late_reader])
+    assert events == ["first reader out", "writer in", "writer out", "late reader in"]
+
+
+def test_readers_share_the_lock(inventory):
+    lock = inventory.inventory_store.lock
+    barrier = threading.Barrier(4, timeout=WAIT)
+
+    def reader():
+        lock.acquire_read()
+        try:
+            barrier.wait()  # only passes if all four hold the read lock at once
+        finally:
+            lock.release_read()
+
+    run_threads([reader] * 4)
+
+
+def test_concurrent_readers_and_writers_keep_indexes_consistent(inventory):
+    inventory.BlockedList.LOAD = 4
+    store = inventory.inventory_store
+    stop = threading.Event()
+
+    def writer(tag):
+        def run():
+            for k in range(150):
+                record = inventory.add_medicine(f"Drug {tag}{k % 7}", k % 5, 2, k % 11, f"2027-01-{k % 28 + 1:02d}")
+                inventory.add_equipment(f"Kit {tag}", k % 6, "In Use" if k % 2 else "Available")
+                if k % 3 == 0:
+                    inventory.update_medicine(record["id"], f"Drug {tag}", 1, 1, 1, "2026-05-05")
+                if k % 4 == 0:
+                    inventory.remove_medicine_by_id(record["id"])
+                if k % 5 == 0 and inventory.fetch_equipment():
+                    inventory.remove_equipment_by_name(f"Kit {tag}")
+        return run
+
+    def reader():
+        while not stop.is_set():
+            with store.read():  # several calls as one consistent view
+                rows = inventory.fetch_medicines()
+                assert inventory.get_medicine_count() == len(rows)
+                assert [r["id"] for r in inventory.filter_medicines_by_low_stock(4)] == \
+                    [r[0] for r in rows if r[4] <= 4]
+                for i, row in enumerate(rows[:20]):
+                    assert inventory.find_medicine_index_by_id(row[0]) == i
+            inventory.filter_equipment_by_status_pattern("use")
+            inventory.get_array_statistics()
+
+    def snapshot_reader():
+        while not stop.is_set():
+            snap = inventory.snapshot()  # no lock: the snapshot must not change under us
+            before = [tuple(row) for row in snap.medicines]
+            time.sleep(0.001)
+            assert [tuple(row) for row in snap.medicines] == before
+            assert len({row[0] for row in snap.medicines}) == len(before)
+
+    writers = [writer("a"), writer("b"), writer("c")]
+
+    def writers_then_stop():
+        try:
+            run_threads(writers)
+        finally:
+            stop.set()
+
+    run_threads([writers_then_stop, reader, reader, snapshot_reader])
+
+    check_indexes(inventory)
+    snap = inventory.snapshot()
+    assert [list(row[:6]) for row in snap.medicines] == [list(row) for row in inventory.fetch_medicines()]
+    assert inventory.get_medicine_count() == 3 * (150 - 38)
+
+
+def test_readers_filling_caches_together_agree(inventory):
+    inventory.BlockedList.LOAD = 4
+    inventory.add_medicines_bulk([(f"Drug {k % 13}", k % 4, 2, k % 9, "2027-01-01") for k in range(200)])
+    rows = inventory.fetch_medicines()
+    barrier = threading.Barrier(4, timeout=WAIT)
+    results = []
+
+    def reader():
+        barrier.wait()  # every reader finds the offsets, rank tables and sorted views stale
+        results.append((inventory.sort_medicines_by_name(materialize=False),
+                        [inventory.find_medicine_index_by_id(row[0]) for row in rows]))
+
+    inventory.remove_medicine_by_id(rows.pop(0)[0])  # makes every cached offset stale
+    run_threads([reader] * 4)
+    views, positions = zip(*results)
+    assert all(view is views[0] for view in views)  # sorted once, shared by all
+    assert all(p == list(range(len(rows))) for p in positions)
+
+
+def test_expiry_window_rolls_under_the_write_lock(inventory):
+    today = date.today()
+    for days in (-5, 0, 20, 31, 45, 90):
+        inventory.add_medicine("Zinc", 1, 1, 1, (today + timedelta(days=days)).isoformat())
+    stats = inventory.inventory_stats
+    assert inventory.get_array_statistics()["expiring_medicines"] == 3
+    with inventory.inventory_store.read():
+        inventory.get_array_statistics()  # a reader never moves the window
+        with pytest.raises(RuntimeError):
+            inventory.roll_expiry_window(today + timedelta(days=20))
+    inventory.roll_expiry_window(today + timedelta(days=20))
+    assert stats.window_end == stats.window_end_on(today + timedelta(days=20))
+    assert inventory.get_array_statistics()["expiring_medicines"] == 5
+    inventory.roll_expiry_window(today)
+    assert inventory.get_array_statistics()["expiring_medicines"] == 3
+    lock = inventory.inventory_store.lock
+    with inventory.inventory_store.read():
+        inventory.roll_expiry_window(today)  # nothing to move: no write lock, so no upgrade error
+    assert lock._writer is None
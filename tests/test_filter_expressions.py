@@ -0,0 +1,44 @@
+"""Filter expression tests: tokenizing, parsing and the rows each expression selects"""
+import pytest
+
+
+def test_tokenizer_keeps_words_with_digits_and_dashes_whole(inventory):
+    tokens = inventory.tokenize_filter("name ~ 500mg and name ~ amox-clav or qty<=-5 AND expiry >= 2026-06-01")
+    assert tokens == [("word", "name"), ("op", "~"), ("word", "500mg"), ("and", "and"),
+                      ("word", "name"), ("op", "~"), ("word", "amox-clav"), ("or", "or"),
+                      ("word", "qty"), ("op", "<="), ("number", "-5"), ("and", "and"),
+                      ("word", "expiry"), ("op", ">="), ("date", "2026-06-01")]
+    assert inventory.tokenize_filter("packs = 12 and name ~ 1.5ml") == \
+        [("word", "packs"), ("op", "="), ("number", "12"), ("and", "and"),
+         ("word", "name"), ("op", "~"), ("word", "1.5ml")]
+
+
+def test_bare_words_match_names(inventory):
+    plain = inventory.add_medicine("Amoxicillin 500mg", 1, 1, 1, "2027-01-01")
+    combo = inventory.add_medicine("Amox-Clav 625", 1, 1, 1, "2027-01-01")
+    inventory.add_medicine("Zinc 50", 1, 1, 1, "2027-01-01")
+    expression = inventory.filter_medicines_by_expression
+    assert [r["id"] for r in expression("name ~ 500mg")] == [plain["id"]]
+    assert [r["id"] for r in expression("name ~ amox-clav")] == [combo["id"]]
+    assert [r["id"] for r in expression("name ~ amox and not name ~ 500MG")] == [combo["id"]]
+    assert [r["id"] for r in expression("name != 'zinc 50'")] == [plain["id"], combo["id"]]
+
+
+def test_negated_comparisons_skip_invalid_dates(inventory):
+    early = inventory.add_medicine("Early", 1, 1, 1, "2025-01-01")
+    late = inventory.add_medicine("Late", 1, 1, 9, "2028-01-01")
+    undated = inventory.add_medicine("Undated", 1, 1, 1, "not a date")
+    ids = lambda text: [r["id"] for r in inventory.filter_medicines_by_expression(text)]
+    assert ids("not expiry >= 2026-01-01") == [early["id"]]
+    assert ids("expiry != 2025-01-01") == [late["id"]]
+    assert ids("not (expiry < 2026-01-01 or qty > 5)") == []
+    assert ids("not (expiry < 2026-01-01 and qty <= 5)") == [late["id"]]  # the undated row stays unknown
+    assert ids("not not expiry < 2026-01-01") == [early["id"]]
+    assert ids("not qty > 5") == [early["id"], undated["id"]]  # no dates involved: plain negation
+
+
+def test_filter_expression_errors(inventory):
+    for text in ["", "qty <", "foo = 1", "name < 3", 'qty ~ "a"', 'qty = "x"', "qty = 5mg", "(qty = 1",
+                 "qty = 1 )", "expiry < 2026-13-01", "qty @ 1"]:
+        with pytest.raises(ValueError):
+            inventory.filter_medicines_by_expression(text)
@@ -0,0 +1,502 @@
+"""Inventory model tests: a randomized run checked against plain lists, plus focused index tests"""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from inventory_checks import Model, check_against_model, check_indexes
+
+NAMES = ["Amoxicillin 500mg", "amoxicillin 500MG", "Paracetamol", "Ibuprofen 200mg", "Ibuprofen 1000mg",
+         "Cetirizine", "Zinc"]
+STATUSES = ["Available", "In Use", "Under Maintenance", "Broken", ""]
+
+
+def random_date(rnd):
+    return f"{rnd.randint(2024, 2028)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+
+
+def random_medicine(rnd):
+    packs, items = rnd.randint(0, 9), rnd.randint(1, 5)
+    return [rnd.choice(NAMES), packs, items, rnd.choice([packs * items, rnd.randint(0, 20)]), random_date(rnd)]
+
+
+def random_equipment(rnd):
+    return [rnd.choice(NAMES), rnd.randint(0, 9), rnd.choice(STATUSES)]
+
+
+def some_id(rnd, rows):
+    return rnd.choice(rows)[0] if rows and rnd.random() < 0.9 else 10_000
+
+
+def medicine_step(inv, model, rnd):
+    meds = model.meds
+    op = rnd.randrange(12)
+    if op == 0:
+        fields = random_medicine(rnd)
+        meds.append([inv.add_medicine(*fields)["id"]] + fields)
+    elif op == 1:
+        index, fields = rnd.randint(0, len(meds)), random_medicine(rnd)
+        meds.insert(index, [inv.insert_medicine_at_position(index, *fields)["id"]] + fields)
+    elif op == 2:
+        row_id = some_id(rnd, meds)
+        removed = inv.remove_medicine_by_id(row_id)
+        assert (removed is None) == (Model.position(meds, row_id) < 0)
+        if removed is not None:
+            meds.pop(Model.position(meds, row_id))
+    elif op == 3:
+        name = rnd.choice(NAMES)
+        first = Model.first_named(meds, name)
+        removed = inv.remove_medicine_by_name(name)
+        assert (removed is None) if first is None else removed["id"] == first[0]
+        if first is not None:
+            meds.remove(first)
+    elif op == 4:
+        row_id, fields = some_id(rnd, meds), random_medicine(rnd)
+        assert inv.update_medicine(row_id, *fields) == (Model.position(meds, row_id) >= 0)
+        if Model.position(meds, row_id) >= 0:
+            meds[Model.position(meds, row_id)] = [row_id] + fields
+    elif op == 5:
+        row_id, anchor_id, after = some_id(rnd, meds), some_id(rnd, meds), rnd.random() < 0.5
+        move = inv.move_medicine_after if after else inv.move_medicine_before
+        assert move(row_id, anchor_id) == Model.move(meds, row_id, anchor_id, 1 if after else 0)
+    elif op == 6:
+        items = [random_medicine(rnd) for _ in range(rnd.randint(0, 4))]
+        added = inv.add_medicines_bulk(items)
+        meds.extend([record["id"]] + fields for record, fields in zip(added, items))
+    elif op == 7:
+        updates = [[some_id(rnd, meds)] + random_medicine(rnd) for _ in range(rnd.randint(1, 3))]
+        applied = all(Model.position(meds, update[0]) >= 0 for update in updates)
+        assert inv.update_medicines_bulk(updates) == applied
+        for update in updates if applied else ():
+            meds[Model.position(meds, update[0])] = update
+    elif op == 8:
+        doomed = {some_id(rnd, meds) for _ in range(rnd.randint(0, 3))}
+        assert sorted(record["id"] for record in inv.remove_medicines_bulk(doomed)) == \
+            sorted(r[0] for r in meds if r[0] in doomed)
+        meds[:] = [r for r in meds if r[0] not in doomed]
+    elif op == 9:
+        # A value the indexes cannot order is refused before anything changes
+        with pytest.raises(ValueError):
+            inv.add_medicine("Broken row", "three", 1, 1, "2027-01-01")
+        if meds:
+            with pytest.raises(ValueError):
+                inv.update_medicine(meds[0][0], "Broken row", 1, 2.5, 1, "2027-01-01")
+    elif op == 10:
+        # Whole-number strings are coerced, as the GUI entries produce them
+        fields = random_medicine(rnd)
+        record = inv.add_medicine(fields[0], str(fields[1]), fields[2], str(fields[3]), fields[4])
+        meds.append([record["id"]] + fields)
+    elif rnd.random() < 0.05:
+        inv.clear_all_medicines()
+        meds.clear()
+
+
+def equipment_step(inv, model, rnd):
+    eqs = model.eqs
+    op = rnd.randrange(10)
+    if op == 0:
+        fields = random_equipment(rnd)
+        eqs.append([inv.add_equipment(*fields)["id"]] + fields)
+    elif op == 1:
+        index, fields = rnd.randint(0, len(eqs)), random_equipment(rnd)
+        eqs.insert(index, [inv.insert_equipment_at_position(index, *fields)["id"]] + fields)
+    elif op == 2:
+        row_id = some_id(rnd, eqs)
+        removed = inv.remove_equipment_by_id(row_id)
+        assert (removed is None) == (Model.position(eqs, row_id) < 0)
+        if removed is not None:
+            eqs.pop(Model.position(eqs, row_id))
+    elif op == 3:
+        name = rnd.choice(NAMES)
+        first = Model.first_named(eqs, name)
+        removed = inv.remove_equipment_by_name(name)
+        assert (removed is None) if first is None else removed["id"] == first[0]
+        if first is not None:
+            eqs.remove(first)
+    elif op == 4:
+        row_id, fields = some_id(rnd, eqs), random_equipment(rnd)
+        assert inv.update_equipment(row_id, *fields) == (Model.position(eqs, row_id) >= 0)
+        if Model.position(eqs, row_id) >= 0:
+            eqs[Model.position(eqs, row_id)] = [row_id] + fields
+    elif op == 5:
+        row_id, anchor_id, after = some_id(rnd, eqs), some_id(rnd, eqs), rnd.random() < 0.5
+        move = inv.move_equipment_after if after else inv.move_equipment_before
+        assert move(row_id, anchor_id) == Model.move(eqs, row_id, anchor_id, 1 if after else 0)
+    elif op == 6:
+        items = [random_equipment(rnd) for _ in range(rnd.randint(0, 4))]
+        added = inv.add_equipment_bulk(items)
+        eqs.extend([record["id"]] + fields for record, fields in zip(added, items))
+    elif op == 7:
+        updates = [[some_id(rnd, eqs)] + random_equipment(rnd) for _ in range(rnd.randint(1, 3))]
+        applied = all(Model.position(eqs, update[0]) >= 0 for update in updates)
+        assert inv.update_equipment_bulk(updates) == applied
+        for update in updates if applied else ():
+            eqs[Model.position(eqs, update[0])] = update
+    elif op == 8:
+        doomed = {some_id(rnd, eqs) for _ in range(rnd.randint(0, 3))}
+        inv.remove_equipment_bulk(doomed)
+        eqs[:] = [r for r in eqs if r[0] not in doomed]
+    elif rnd.random() < 0.05:
+        inv.clear_all_equipment()
+        eqs.clear()
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_public_api_matches_plain_list_model(inventory, seed):
+    # Small chunks so splits, merges and offset bookkeeping happen within a short run
+    inventory.BlockedList.LOAD = 4
+    inventory.FrozenRows.CHUNK = 4
+    inventory.initialize_default_data()
+    rnd = random.Random(seed)
+    model = Model(inventory)
+    for step in range(400):
+        medicine_step(inventory, model, rnd)
+        equipment_step(inventory, model, rnd)
+        check_against_model(inventory, model)
+        if step % 10 == 0:
+            check_indexes(inventory)
+    check_indexes(inventory)
+
+
+
+def test_id_index_follows_inserts_moves_and_removals(inventory):
+    first = inventory.add_medicine("Zinc", 1, 10, 10, "2027-01-01")
+    head = inventory.insert_medicine_at_position(0, "Cetirizine", 2, 5, 10, "2026-02-01")
+    assert [inventory.find_medicine_index_by_id(r["id"]) for r in (head, first)] == [0, 1]
+    assert inventory.move_medicine_after(head["id"], first["id"])
+    assert [inventory.find_medicine_index_by_id(r["id"]) for r in (first, head)] == [0, 1]
+    assert inventory.remove_medicine_by_id(first["id"])["name"] == "Zinc"
+    assert inventory.find_medicine_by_id(first["id"]) is None
+    assert inventory.find_medicine_index_by_id(head["id"]) == 0
+    assert inventory.remove_medicine_by_id(first["id"]) is None
+    later = inventory.add_medicine("Zinc", 1, 10, 10, "2027-01-01")
+    assert later["id"] not in (first["id"], head["id"])  # ids are never reused
+
+
+def test_name_index_is_case_insensitive_and_follows_array_order(inventory):
+    late = inventory.add_medicine("Amoxicillin 500mg", 1, 10, 10, "2027-01-01")
+    early = inventory.insert_medicine_at_position(0, "AMOXICILLIN 500MG", 1, 10, 10, "2027-01-01")
+    assert inventory.count_medicines_by_name("amoxicillin 500mg") == 2
+    assert inventory.find_medicine_by_name("Amoxicillin 500MG")["id"] == early["id"]  # first in the array
+    inventory.update_medicine(early["id"], "Paracetamol", 1, 10, 10, "2027-01-01")
+    assert inventory.find_medicine_by_name("amoxicillin 500mg")["id"] == late["id"]
+    assert inventory.remove_medicine_by_name("PARACETAMOL")["id"] == early["id"]
+    assert inventory.count_medicines_by_name("paracetamol") == 0
+    assert inventory.find_medicine_by_name("paracetamol") is None
+
+
+def test_expiry_queries_keep_array_order(inventory):
+    soon = (date.today() + timedelta(days=10)).isoformat()
+    sooner = (date.today() + timedelta(days=3)).isoformat()
+    later = inventory.add_medicine("Zinc", 1, 10, 10, soon)
+    earlier = inventory.add_medicine("Cetirizine", 1, 10, 10, sooner)
+    inventory.add_medicine("Paracetamol", 1, 10, 10, "not a date")
+    inventory.add_medicine("Ibuprofen 200mg", 1, 10, 10, "2999-01-01")
+    # Same order as the table shows, not expiry order
+    assert [r["id"] for r in inventory.get_expiring_medicines(30)] == [later["id"], earlier["id"]]
+    assert [r["id"] for r in inventory.filter_medicines_by_expiry_range(sooner, soon)] == [later["id"], earlier["id"]]
+    assert inventory.filter_medicines_by_expiry_range("2020-01-01", "bad") == []
+    # The sorted expiry index still serves the soonest-first helpers
+    assert [r["id"] for r in inventory.get_next_expiring_medicines(2)] == [earlier["id"], later["id"]]
+
+
+def test_trigram_search_verifies_contiguous_matches(inventory):
+    both = inventory.add_medicine("abcxbcd", 1, 1, 1, "2027-01-01")  # has "abc" and "bcd" but not "abcd"
+    hit = inventory.add_medicine("Xabcdy", 1, 1, 1, "2027-01-01")
+    short = inventory.add_medicine("ab", 1, 1, 1, "2027-01-01")
+    assert [r["id"] for r in inventory.filter_medicines_by_name_pattern("ABCD")] == [hit["id"]]
+    assert [r["id"] for r in inventory.filter_medicines_by_name_pattern("ab")] == [both["id"], hit["id"], short["id"]]
+    assert inventory.filter_medicines_by_name_pattern("abcde") == []
+    inventory.update_medicine(hit["id"], "plain", 1, 1, 1, "2027-01-01")
+    assert inventory.filter_medicines_by_name_pattern("abcd") == []
+    assert inventory.medicine_names.trigrams.postings["bcd"] == {"abcxbcd"}  # "xabcdy" was dropped
+
+
+def test_trie_completion_prunes_removed_names(inventory):
+    for name in ("Ibuprofen 200mg", "ibuprofen 200MG", "Ibuprofen 1000mg", "Iron"):
+        inventory.add_medicine(name, 1, 1, 1, "2027-01-01")
+    assert inventory.suggest_medicine_names("IBU") == ["Ibuprofen 1000mg", "Ibuprofen 200mg"]
+    assert inventory.suggest_medicine_names("i", limit=1) == ["Ibuprofen 1000mg"]
+    assert inventory.suggest_medicine_names("x") == []
+    inventory.remove_medicine_by_name("Ibuprofen 1000mg")
+    assert inventory.suggest_medicine_names("ibuprofen 1") == []
+    inventory.remove_medicine_by_name("ibuprofen 200mg")
+    assert inventory.suggest_medicine_names("ibu") == ["Ibuprofen 200mg"]  # one row still has the name
+    inventory.remove_medicine_by_name("ibuprofen 200mg")
+    assert inventory.suggest_medicine_names("i") == ["Iron"]
+    assert list(inventory.medicine_names.prefixes.root.children["i"].children) == ["r"]  # dead branch pruned
+
+
+def test_fuzzy_lookup_builds_lazily_and_forgets_removed_names(inventory):
+    fuzzy = inventory.medicine_names.fuzzy
+    zinc = inventory.add_medicine("Zinc Sulfate", 1, 1, 1, "2027-01-01")
+    inventory.add_medicine("Paracetamol", 1, 1, 1, "2027-01-01")
+    assert fuzzy.tree is None  # nothing is inserted into the BK-tree on the write path
+    assert inventory.suggest_similar_medicine_names("paracetmol") == ["Paracetamol"]
+    assert inventory.find_medicine_by_name_fuzzy("zinc sulfat")["id"] == zinc["id"]
+    assert inventory.suggest_similar_medicine_names("sulfte") == ["Zinc Sulfate"]  # matched on one word
+    inventory.add_medicine("Cetirizine", 1, 1, 1, "2027-01-01")
+    assert fuzzy.pending and inventory.suggest_similar_medicine_names("cetirizin") == ["Cetirizine"]
+    inventory.remove_medicine_by_id(zinc["id"])
+    assert inventory.suggest_similar_medicine_names("zinc sulfate") == []
+    for k in range(5):  # dead terms outnumber live ones: the next search rebuilds the tree
+        record = inventory.add_medicine(f"Tmp{k}", 1, 1, 1, "2027-01-01")
+        inventory.suggest_similar_medicine_names("tmp")
+        inventory.remove_medicine_by_id(record["id"])
+    inventory.suggest_similar_medicine_names("x")
+    assert len(fuzzy.removed) <= len(fuzzy.names_by_term)
+    assert inventory.suggest_similar_medicine_names("paracetamol", max_distance=0) == ["Paracetamol"]
+
+
+def test_bulk_paths_keep_indexes_and_notify_after_the_lock(inventory):
+    inventory.BlockedList.LOAD = 4
+    lock = inventory.inventory_store.lock
+    seen = []
+    inventory.add_change_listener(lambda kind: seen.append((kind, lock._writer)))
+    meds = inventory.add_medicines_bulk([(f"Drug {k % 9}", k % 5, 2, k % 7, f"2027-01-{k % 28 + 1:02d}")
+                                         for k in range(300)])  # merged into the empty indexes at once
+    inventory.add_medicines_bulk([("Zinc", 1, 1, 1, "2026-01-01")] * 3)  # small batch: insorted
+    removed = inventory.remove_medicines_bulk([r["id"] for r in meds[::2]] + [10_000])  # one pass
+    assert [r["id"] for r in removed] == [r["id"] for r in meds[::2]]
+    assert [r["id"] for r in inventory.remove_medicines_bulk([meds[5]["id"], meds[1]["id"]])] == \
+        [meds[1]["id"], meds[5]["id"]]  # popped one by one, returned in array order
+    eqs = inventory.add_equipment_bulk([(f"Kit {k}", k % 6, ("In Use", "Broken")[k % 2]) for k in range(200)])
+    inventory.remove_equipment_bulk([r["id"] for r in eqs[:150]])
+    announced = len(seen)
+    with inventory.inventory_store.write():
+        inventory.add_equipment_bulk([("Kit", 1, "Broken")])
+        assert len(seen) == announced  # held back until the outer write section ends
+    check_indexes(inventory)
+    assert seen == [("medicines", None)] * 4 + [("equipment", None)] * 3  # never called under the lock
+    assert inventory.filter_equipment_by_status_pattern("broken")[-1]["name"] == "Kit"
+
+
+def test_planner_scans_unless_the_index_is_selective(inventory):
+    inventory.add_medicines_bulk([("Drug", 1, 1, k % 200, "2027-01-01") for k in range(2000)])
+    narrow = inventory.query_medicines().where(inventory.low_stock(0))  # 0.5% of rows
+    wide = inventory.query_medicines().where(inventory.low_stock(19))   # 10%: fetch + reorder lose to a scan
+    negated = inventory.query_medicines().where(~inventory.low_stock(19))  # nothing but a scan answers a not
+    assert narrow.explain().startswith("total_qty index")
+    assert wide.explain().startswith("total_qty column")
+    assert wide.unordered().explain().startswith("total_qty column")
+    assert negated.explain().startswith("full scan")
+    assert inventory.query_medicines().where(inventory.low_stock(1)).unordered().explain().startswith("total_qty index")
+    assert [r["total_qty"] for r in wide] == [k % 200 for k in range(2000) if k % 200 <= 19]
+    assert len(negated.to_list()) == 1800
+
+
+def test_value_index_matches_a_sorted_list(inventory):
+    inventory.BlockedList.LOAD = 4
+    index, rnd = inventory.ValueIndex(), random.Random(7)
+    entries = [(rnd.randint(0, 30), row_id) for row_id in range(300)]
+    index.add_many(entries[:250])  # merged into the empty index
+    index.add_many(entries[250:253] + [(None, 999)])  # small batch: insorted, None skipped
+    for value, row_id in entries[253:]:
+        index.add(value, row_id)
+    index.discard_many(entries[:100])  # filtered out in one pass
+    index.discard_many(entries[100:102])
+    index.discard(*entries[102])
+    index.discard(None, 5)
+    live = sorted(entries[103:])
+    assert index.keys[:] == live
+    for lo, hi in ((None, None), (None, 4), (10, None), (7, 7), (12, 3), (31, None)):
+        expected = [row_id for value, row_id in live if (lo is None or lo <= value) and (hi is None or value <= hi)]
+        assert index.range_ids(lo, hi) == expected
+        assert index.count_range(lo, hi) == len(expected)
+    assert index.first_ids(3) == [row_id for _, row_id in live[:3]]
+
+
+def test_equipment_bitmaps_shift_with_middle_edits(inventory):
+    bitmaps = inventory.equipment_bitmaps
+    kits = [inventory.add_equipment(f"Kit {k}", k % 5, ("In Use", "Broken")[k % 2]) for k in range(6)]
+    inventory.add_equipment_bulk([("Filler", 9, "Available")] * 200)  # enough rows for the bitmap path to pay
+    inventory.insert_equipment_at_position(2, "Spare", 1, "Broken")   # shifts every higher bit up
+    inventory.remove_equipment_by_id(kits[0]["id"])                   # and back down
+    inventory.update_equipment(kits[3]["id"], "Kit 3", 9, "In Use")   # drops both stock flags
+    inventory.update_equipment(kits[4]["id"], "Kit 4", 0, "Repair")   # new status code
+    assert inventory.move_equipment_before(kits[5]["id"], kits[1]["id"])
+    rows = inventory.fetch_equipment()
+    positions = lambda bits: [i for i in range(len(rows)) if bits >> i & 1]
+    for status in ("In Use", "Broken", "Repair", "Available"):
+        assert positions(bitmaps.status_bits[bitmaps.codes[status]]) == \
+            [i for i, r in enumerate(rows) if r[3] == status]
+    assert positions(bitmaps.flag_bits["critical"]) == [i for i, r in enumerate(rows) if r[2] <= 2]
+    assert bitmaps.flag_bits["low_stock"] >> len(rows) == 0  # nothing left above the last row
+    query = inventory.query_equipment().where(inventory.status_contains("broken"), inventory.stock_between(None, 3))
+    assert query.explain().startswith("bitmap")
+    assert [r["id"] for r in inventory.get_low_stock_equipment_by_status("broken")] == \
+        [r[0] for r in rows if r[3] == "Broken" and r[2] <= 3]
+    check_indexes(inventory)
+
+
+def test_medicine_columns_follow_edits_and_agree_with_a_scan(inventory):
+    inventory.SlicedColumn.CHUNK = 8  # chunks split on most inserts and empty on removals
+    rnd = random.Random(5)
+    item = lambda k: (f"Drug {k}", rnd.randint(-5, 40), 1, rnd.randint(-3, 60),
+                      rnd.choice([f"2027-01-{k % 28 + 1:02d}", "never"]))
+    meds = inventory.add_medicines_bulk([item(k) for k in range(300)])  # sliced through array.array
+    inventory.insert_medicine_at_position(7, "Huge", 2 ** 70, 1, -2 ** 70, "2026-05-05")  # sign-extends
+    inventory.add_medicines_bulk([item(k) for k in range(300, 340)])  # now too wide for a C long long
+    inventory.update_medicine(meds[3]["id"], "Drug 3", 0, 1, 59, "never")
+    inventory.remove_medicine_by_id(meds[10]["id"])
+    assert inventory.move_medicine_after(meds[0]["id"], meds[200]["id"])
+    inventory.remove_medicines_bulk([r["id"] for r in meds[100:103]])  # popped one by one
+    check_indexes(inventory)
+
+    rows = list(inventory.medicines)
+    day = lambda d: date(2027, 1, d).toordinal()
+    bounds = {"packs": [(None, 5), (3, 3), (-2.5, 10.5), (11, 2), (None, None), (-2 ** 71, 2 ** 71),
+                        (float("-inf"), 0), (2 ** 80, None), (1, 2 ** 70)],
+              "total_qty": [(None, -1), (0.5, 1.5), (60, None), (-2 ** 70, -2 ** 70), (None, 2 ** 69)],
+              "expiry": [(None, None), (None, day(10)), (day(5), day(5)), (day(20), None), (0, 1)]}
+    for field, ranges in bounds.items():
+        col = inventory.MedicineColumns.FIELDS[field]
+        for lo, hi in ranges:
+            expected = bytes(r[col] is not None and (lo is None or lo <= r[col]) and (hi is None or r[col] <= hi)
+                             for r in rows)
+            assert inventory.medicine_columns.selectors(field, lo, hi) == expected, (field, lo, hi)
+            assert inventory.medicines.order.compress(expected) == [r for r, hit in zip(rows, expected) if hit]
+
+    wide = inventory.query_medicines().where(inventory.expiry_between(None, "2027-01-20"))
+    assert wide.explain().startswith("expiry column")
+    assert [r["id"] for r in wide] == [r[0] for r in rows if r[6] is not None and r[6] <= day(20)]
+    assert [r["id"] for r in inventory.filter_medicines_by_packs_range(0, 20)] == \
+        [r[0] for r in rows if 0 <= r[2] <= 20]
+    inventory.remove_medicines_bulk([r[0] for r in rows[::2]])  # one pass: the columns are rebuilt
+    check_indexes(inventory)
+
+
+def test_blocked_list_matches_a_plain_list(inventory):
+    inventory.BlockedList.LOAD = 2  # chunks split and empty on almost every edit
+    rnd = random.Random(11)
+    blocked, plain = inventory.BlockedList(key=lambda item: item[0]), []
+    ordered, flat = inventory.BlockedList(), []
+    fresh = iter(range(1, 10_000))
+    for step in range(1500):
+        op = rnd.randrange(7)
+        if op == 0 or not plain:
+            item, index = (next(fresh),), rnd.randint(-3, len(plain) + 2)
+            blocked.insert(index, item)
+            plain.insert(index, item)
+        elif op == 1:
+            index = rnd.randrange(-len(plain), len(plain))
+            assert blocked.pop(index) == plain.pop(index)
+        elif op == 2:
+            item = rnd.choice(plain)
+            blocked.remove(item)
+            plain.remove(item)
+        elif op == 3:
+            index, item = rnd.randrange(len(plain)), (next(fresh),)
+            blocked[index] = plain[index] = item
+        elif op == 4:
+            items = [(next(fresh),) for _ in range(rnd.randint(0, 5))]
+            blocked.extend(items)
+            plain.extend(items)
+        elif op == 5:
+            value = rnd.randint(0, 50)
+            ordered.insort(value)
+            flat.insert(sum(v < value for v in flat), value)
+        else:
+            value = rnd.randint(0, 50)
+            assert ordered.remove_sorted(value) == (value in flat)
+            if value in flat:
+                flat.remove(value)
+        assert blocked[:] == plain and len(blocked) == len(plain)
+        assert ordered[:] == flat and ordered.bisect_left(25) == sum(v < 25 for v in flat)
+        if plain and step % 25 == 0:
+            assert [blocked.position(item) for item in plain] == list(range(len(plain)))
+            assert blocked.sorted_by_position(rnd.sample(plain, len(plain))) == plain
+            index = rnd.randrange(len(plain))
+            assert blocked[index] == plain[index] and blocked[-1] == plain[-1]
+            assert blocked[1::2] == plain[1::2]
+    assert len(blocked.where) == len(plain)
+    assert all(blocked.where[item[0]] is block for block in blocked.blocks for item in block)
+
+
+def test_ordered_limit_keeps_the_first_matches_in_array_order(inventory):
+    inventory.add_medicines_bulk([("Drug", 1, 1, 50, "2027-01-01")] * 2000)
+    for qty in (3, 1, 2, 0, 1):  # index order differs from array order
+        inventory.insert_medicine_at_position(250, "Low", 1, 1, qty, "2027-01-01")
+    query = inventory.query_medicines().where(inventory.low_stock(3))
+    assert query.explain().startswith("total_qty index")
+    assert [r["total_qty"] for r in query.limit(3)] == [1, 0, 2]
+    assert query.first()["total_qty"] == 1
+    assert sorted(r["total_qty"] for r in query.unordered().limit(5)) == [0, 1, 1, 2, 3]
+
+
+def test_query_cache_is_bounded_and_invalidated(inventory):
+    inventory.initialize_default_data()
+    inventory.add_medicines_bulk([["Zinc", 1, 10, 10, "2027-01-01"], ["Cetirizine", 2, 5, 3, "2026-02-01"]])
+    cache = inventory.query_cache
+    first = inventory.filter_medicines_by_low_stock(100)
+    first.clear()  # callers get copies, so this must not touch the cached entry
+    assert inventory.filter_medicines_by_low_stock(100)
+    assert cache.info()["hits"] == 1
+    record = inventory.add_medicine("Fresh", 1, 1, 0, "2027-01-01")
+    assert record["id"] in [r["id"] for r in inventory.filter_medicines_by_low_stock(100)]
+    assert cache.info()["entries"] == 1  # the entry of the older generation was dropped
+    inventory.roll_expiry_window(date.today() + timedelta(days=1))
+    assert inventory.filter_medicines_by_low_stock(100) and cache.info()["hits"] == 2  # a roll moves no rows
+
+    small = inventory.QueryCache(max_entries=3, max_rows=10)
+    for k in range(5):
+        small.get(("q", k), lambda: [0] * 3)
+    small.get(("too big",), lambda: [0] * 11)
+    info = small.info()
+    assert (info["entries"], info["rows"], info["evictions"]) == (3, 9, 2)
+
+
+def test_moves_leave_the_id_keyed_indexes_alone(inventory, monkeypatch):
+    first = inventory.add_medicine("Zinc", 1, 1, 1, "2027-01-01")
+    second = inventory.add_medicine("zinc", 1, 1, 2, "2026-01-01")
+    inventory.add_equipment("Kit", 1, "Broken")
+    kit = inventory.add_equipment("Kit", 5, "In Use")
+    calls = []
+    for index in (inventory.medicine_names, inventory.medicine_total_qty, inventory.equipment_stock):
+        monkeypatch.setattr(index, "add", lambda *args: calls.append(args))
+        monkeypatch.setattr(index, "discard", lambda *args: calls.append(args))
+    generation = inventory.inventory_store.generation
+    assert inventory.move_medicine_before(second["id"], first["id"])
+    assert inventory.move_equipment_before(kit["id"], kit["id"] - 1)
+    assert calls == [] and inventory.inventory_store.generation == generation + 2
+    assert inventory.find_medicine_by_name("ZINC")["id"] == second["id"]  # first in the new order
+    assert [r[0] for r in inventory.snapshot().medicines] == [second["id"], first["id"]]
+    monkeypatch.undo()
+    check_indexes(inventory)
+
+
+def test_fractional_range_bounds_agree_with_a_scan(inventory):
+    inventory.add_medicines_bulk([("Drug", i % 500, 1, i % 500, "2027-01-01") for i in range(5000)])
+    narrow = inventory.query_medicines().where(inventory.packs_between(1, 2.5))
+    assert narrow.explain().startswith("packs index")  # 0.4% of rows: the index path
+    assert sorted({r["packs"] for r in narrow}) == [1, 2]
+    assert sorted({r["total_qty"] for r in inventory.filter_medicines_by_low_stock(1.5)}) == [0, 1]
+    assert sorted({r["total_qty"] for r in inventory.filter_medicines_by_low_stock(0.5)}) == [0]
+    assert inventory.medicine_total_qty.count_range(0.5, 2) == 20
+
+
+def test_expiry_sort_keeps_undated_rows_last_in_both_directions(inventory):
+    undated = inventory.add_medicine("Undated", 1, 1, 1, "someday")
+    late = inventory.add_medicine("Late", 1, 1, 1, "2028-01-01")
+    early = inventory.add_medicine("Early", 1, 1, 1, "2025-01-01")
+    also_undated = inventory.add_medicine("Blank", 1, 1, 1, "")
+    ids = lambda records: [r["id"] for r in records]
+    assert ids(inventory.sort_medicines_by_expiry()) == [early["id"], late["id"], undated["id"], also_undated["id"]]
+    assert ids(inventory.sort_medicines_by_expiry(ascending=False)) == \
+        [late["id"], early["id"], undated["id"], also_undated["id"]]
+
+
+def test_rejected_rows_use_no_id(inventory):
+    first = inventory.add_medicine("Zinc", 1, 1, 1, "2027-01-01")
+    for bad in (lambda: inventory.add_medicine("Zinc", "many", 1, 1, "2027-01-01"),
+                lambda: inventory.insert_medicine_at_position(0, "Zinc", 1, 1.5, 1, "2027-01-01")):
+        with pytest.raises(ValueError):
+            bad()
+    assert inventory.add_medicine("Zinc", 1, 1, 1, "2027-01-01")["id"] == first["id"] + 1
+    kit = inventory.add_equipment("Kit", 1, "In Use")
+    for bad in (lambda: inventory.add_equipment("Kit", None, "In Use"),
+                lambda: inventory.insert_equipment_at_position(0, "Kit", "x", "In Use")):
+        with pytest.raises(ValueError):
+            bad()
+    assert inventory.add_equipment("Kit", "2", "In Use")["id"] == kit["id"] + 1
+    check_indexes(inventory)